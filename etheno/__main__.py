@@ -1,20 +1,34 @@
 import argparse
+import functools
 import json
 import os
 import shlex
 import sys
 from threading import Thread
 
+from .admission import AdmissionController
+from .capture import CaptureExportPlugin
 from .client import RpcProxyClient
+from .datadir import DatadirCache
 from .differentials import DifferentialTester
-from .etheno import app, EthenoView, GETH_DEFAULT_RPC_PORT, ETHENO, VERSION_NAME
+from .dispatcher import AfterPostDispatcher
+from .etheno import (
+    GETH_DEFAULT_RPC_PORT,
+    ETHENO,
+    VERSION_NAME,
+)
 from .genesis import Account, make_accounts, make_genesis
 from .jsonrpc import EventSummaryExportPlugin, JSONRPCExportPlugin
 from .synchronization import AddressSynchronizingClient, RawTransactionClient
+from .profiler import SamplingProfiler
+from .receipts import ReceiptTracker
+from .slowrequests import SlowRequestJournal
+from .startup import StartupOrchestrator
+from .tracing import Tracer
 from .utils import (
+    PORTS,
     clear_directory,
     decode_value,
-    find_open_port,
     format_hex_address,
     ynprompt,
 )
@@ -29,8 +43,17 @@ ETHER = 1e18
 
 
 def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+
+    if len(argv) > 1 and argv[1] == "replay":
+        from . import replay
+
+        sys.exit(replay.main(argv[1:]))
+
     parser = argparse.ArgumentParser(
-        description="An Ethereum JSON RPC multiplexer, differential fuzzer, and test framework integration tool."
+        description="An Ethereum JSON RPC multiplexer, differential fuzzer, and test framework integration tool.",
+        epilog="Run `etheno replay --help` for replaying a JSON RPC capture.",
     )
     parser.add_argument(
         "--debug",
@@ -154,6 +177,14 @@ def main(argv=None):
         help="Port on which to run Parity (defaults to the closest available port to the port "
         "specified with --port plus one)",
     )
+    parser.add_argument(
+        "--datadir-cache",
+        type=str,
+        default=None,
+        help="Path to a directory in which to cache the initialized Geth and Parity datadirs for each genesis and set "
+        "of accounts, so that later runs with the same genesis and accounts copy them rather than initializing them "
+        "again",
+    )
     parser.add_argument(
         "-j",
         "--genesis",
@@ -217,6 +248,14 @@ def main(argv=None):
         help="Path to a JSON file in which to dump all raw JSON RPC calls; if `--log-dir` is provided, "
         "the raw JSON RPC calls will additionally be dumped to `rpc.json` in the log directory.",
     )
+    parser.add_argument(
+        "--capture",
+        type=str,
+        default=None,
+        help="Path to an indexed binary capture in which to record all raw JSON RPC calls; unlike "
+        "`--dump-jsonrpc`, calls can be looked up by sequence number, method, or transaction hash without "
+        "parsing the whole capture (see `etheno.capture.CaptureReader`)",
+    )
     parser.add_argument(
         "-x",
         "--export-summary",
@@ -224,6 +263,136 @@ def main(argv=None):
         default=None,
         help="Path to a JSON file in which to export an event summary",
     )
+    parser.add_argument(
+        "--export-format",
+        type=str,
+        choices=("json", "jsonl"),
+        default=None,
+        help="Format of the raw JSON RPC dumps and the event summary: a single JSON array (json) or one JSON entry "
+        "per line (jsonl); defaults to jsonl for paths ending in `.jsonl` or `.ndjson` and json otherwise",
+    )
+    parser.add_argument(
+        "--export-compression",
+        type=str,
+        choices=("none", "gzip", "zstd"),
+        default=None,
+        help="Compression of the raw JSON RPC dumps and the event summary; defaults to gzip for paths ending in "
+        "`.gz`, zstd for paths ending in `.zst`, and no compression otherwise",
+    )
+    parser.add_argument(
+        "--server",
+        type=str,
+        choices=("threaded", "asyncio"),
+        default="threaded",
+        help="Server implementation: a thread per connection (threaded), or a single asyncio event loop that "
+        "posts to JSON RPC clients without blocking and scales to thousands of concurrent requests (asyncio) "
+        "(default=threaded)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=32,
+        help="With `--server asyncio`, the number of threads used for client calls that can only be made by "
+        "blocking, such as Geth and Parity clients, raw clients, and Etheno's other HTTP routes (default=32)",
+    )
+    parser.add_argument(
+        "--non-blocking-receipts",
+        action="store_true",
+        default=False,
+        help="Respond to eth_getTransactionReceipt immediately, with a null receipt until the master client and all "
+        "other clients have mined the transaction, rather than blocking until they have",
+    )
+    parser.add_argument(
+        "--receipt-poll-interval",
+        type=float,
+        default=1.0,
+        help="With `--non-blocking-receipts`, the number of seconds between checks of whether clients have mined "
+        "pending transactions (default=1)",
+    )
+    parser.add_argument(
+        "--background-after-post",
+        action="store_true",
+        default=False,
+        help="Call plugins' after_post hooks (e.g., for exports and differential tests) on background threads, in "
+        "order for each plugin, rather than before responding to each request",
+    )
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        default=None,
+        help="Maximum number of JSON RPC requests to handle at once; further requests wait in a queue (see "
+        "`--max-queued-requests`) or are shed. By default, the number of concurrent requests is not limited",
+    )
+    parser.add_argument(
+        "--max-queued-requests",
+        type=int,
+        default=None,
+        help="With `--max-concurrent-requests`, the maximum number of requests that wait for one to finish; "
+        "requests that arrive when the queue is full are shed (default=4 times the concurrency limit)",
+    )
+    parser.add_argument(
+        "--queue-timeout",
+        type=float,
+        default=None,
+        help="With `--max-concurrent-requests`, the number of seconds after which a queued request is shed "
+        "(default=no timeout)",
+    )
+    parser.add_argument(
+        "--shed-response",
+        type=str,
+        choices=("503", "jsonrpc"),
+        default="503",
+        help="How to respond to requests shed by `--max-concurrent-requests`: with HTTP status 503 (503), or with "
+        'a JSON RPC "limit exceeded" error, code -32005 (jsonrpc) (default=503)',
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Path to a file in which to save a timed trace of each JSON RPC request (its master and client calls, "
+        "receipt waits, and plugin hooks) in the Chrome trace event format, which can be opened in chrome://tracing "
+        "or https://ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Sample the stacks of all of Etheno's threads while it runs and save them to this path on shutdown, in "
+        "the folded stack format used by flamegraph.pl and speedscope",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=10.0,
+        help="Milliseconds between samples taken by `--profile` (default=10)",
+    )
+    parser.add_argument(
+        "--slow-request-threshold",
+        type=float,
+        default=None,
+        help="Keep the slowest requests that take at least this many milliseconds, each with its full request, "
+        "per-client timings, and result sizes, and save them to the `SlowRequestJournal` directory in `--log-dir`",
+    )
+    parser.add_argument(
+        "--slow-request-count",
+        type=int,
+        default=20,
+        help="Number of slow requests to keep with `--slow-request-threshold` (default=20)",
+    )
+    parser.add_argument(
+        "--slow-request-window",
+        type=float,
+        default=300.0,
+        help="Seconds after which a slow request is no longer kept with `--slow-request-threshold` (default=300)",
+    )
+    parser.add_argument(
+        "--no-metrics",
+        action="store_false",
+        dest="metrics",
+        default=True,
+        help="Do not record request counts, errors, and latencies or serve them in the Prometheus text format on "
+        "`/metrics`, which is done by default",
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -256,9 +425,6 @@ def main(argv=None):
         "transactions, and only use eth_sendRawTransaction",
     )
 
-    if argv is None:
-        argv = sys.argv
-
     args = parser.parse_args(argv[1:])
 
     if args.version:
@@ -311,13 +477,79 @@ def main(argv=None):
             # Also create a unified log in the log dir:
             ETHENO.logger.save_to_file(os.path.join(args.log_dir, "Complete.log"))
 
-        ETHENO.add_plugin(JSONRPCExportPlugin(os.path.join(args.log_dir, "rpc.json")))
+        rpc_filename = "rpc.jsonl" if args.export_format == "jsonl" else "rpc.json"
+        rpc_filename += {"gzip": ".gz", "zstd": ".zst"}.get(args.export_compression, "")
+        ETHENO.add_plugin(
+            JSONRPCExportPlugin(
+                os.path.join(args.log_dir, rpc_filename),
+                export_format=args.export_format,
+                compression=args.export_compression,
+            )
+        )
 
     if args.dump_jsonrpc is not None:
-        ETHENO.add_plugin(JSONRPCExportPlugin(args.dump_jsonrpc))
+        ETHENO.add_plugin(
+            JSONRPCExportPlugin(
+                args.dump_jsonrpc,
+                export_format=args.export_format,
+                compression=args.export_compression,
+            )
+        )
+
+    if not args.metrics:
+        ETHENO.metrics = None
+
+    if args.background_after_post:
+        ETHENO.after_post_dispatcher = AfterPostDispatcher(log=ETHENO.logger)
+
+    if args.non_blocking_receipts:
+        ETHENO.receipt_tracker = ReceiptTracker(
+            ETHENO, interval=args.receipt_poll_interval
+        )
+
+    if args.max_concurrent_requests is not None:
+        if args.max_concurrent_requests < 1:
+            parser.print_help()
+            sys.stderr.write("\nError: --max-concurrent-requests must be at least 1\n")
+            sys.exit(1)
+        if args.max_queued_requests is None:
+            args.max_queued_requests = 4 * args.max_concurrent_requests
+        ETHENO.admission = AdmissionController(
+            max_concurrent=args.max_concurrent_requests,
+            max_queued=args.max_queued_requests,
+            queue_timeout=args.queue_timeout,
+            metrics=ETHENO.metrics,
+            jsonrpc_errors=args.shed_response == "jsonrpc",
+        )
+
+    if args.trace is not None:
+        ETHENO.tracer = Tracer(args.trace)
+
+    if args.profile is not None:
+        ETHENO.profiler = SamplingProfiler(interval=args.profile_interval / 1000.0)
+        ETHENO.profile_path = args.profile
+        ETHENO.profiler.start()
+
+    if args.capture is not None:
+        ETHENO.add_plugin(CaptureExportPlugin(args.capture))
+
+    if args.slow_request_threshold is not None:
+        ETHENO.add_plugin(
+            SlowRequestJournal(
+                threshold=args.slow_request_threshold / 1000.0,
+                capacity=args.slow_request_count,
+                window=args.slow_request_window,
+            )
+        )
 
     if args.export_summary is not None:
-        ETHENO.add_plugin(EventSummaryExportPlugin(args.export_summary))
+        ETHENO.add_plugin(
+            EventSummaryExportPlugin(
+                args.export_summary,
+                export_format=args.export_format,
+                compression=args.export_compression,
+            )
+        )
 
     if args.genesis is None:
         # Set defaults since no genesis was supplied
@@ -375,6 +607,11 @@ def main(argv=None):
     else:
         args.raw = [r[0] for r in args.raw]
 
+    # Ganache, Geth, and Parity are all started at once, after they have been configured
+    startup = StartupOrchestrator(ETHENO.logger)
+    ganache_client = None
+    ganache_reservations = []
+
     # TODO: This if/elif/else logic is flawed - needs rework
     if args.ganache and args.master:
         parser.print_help()
@@ -384,7 +621,9 @@ def main(argv=None):
         sys.exit(1)
     elif args.ganache:
         if args.ganache_port is None:
-            args.ganache_port = find_open_port(args.port + 1)
+            ganache_port = PORTS.reserve(args.port + 1)
+            ganache_reservations.append(ganache_port)
+            args.ganache_port = ganache_port.port
 
         if args.network_id is None:
             args.network_id = 0x657468656E6F  # 'etheno' in hex
@@ -408,9 +647,14 @@ def main(argv=None):
         # Removed cmd argument
         ganache_instance = ganache.Ganache(args=ganache_args, port=args.ganache_port)
 
-        ETHENO.master_client = ganache.GanacheClient(ganache_instance)
-
-        ganache_instance.start()
+        ganache_client = ganache.GanacheClient(ganache_instance)
+        # Ganache is started along with Geth and Parity below; it becomes the master client once it is running
+        ganache_client.etheno = ETHENO
+        startup.add(
+            ganache_client,
+            launch=ganache_instance.launch,
+            reservations=ganache_reservations,
+        )
     elif args.master:
         ETHENO.master_client = AddressSynchronizingClient(RpcProxyClient(args.master))
     elif args.client and not args.geth and not args.parity:
@@ -450,41 +694,63 @@ def main(argv=None):
             f.write(json.dumps(genesis).encode("utf-8"))
             ETHENO.logger.info("Saved genesis to %s" % args.save_genesis)
 
+    if args.datadir_cache is not None and (args.geth or args.parity):
+        datadir_cache = DatadirCache(args.datadir_cache)
+    else:
+        datadir_cache = None
+
+    private_keys = [account.private_key for account in accounts]
+    geth_instance = None
+    parity_instance = None
+
     if args.geth:
+        geth_reservations = []
         if args.geth_port is None:
-            args.geth_port = find_open_port(args.port + 1)
+            geth_port = PORTS.reserve(args.port + 1)
+            geth_reservations.append(geth_port)
+            args.geth_port = geth_port.port
 
-        geth_instance = geth.GethClient(genesis=genesis, port=args.geth_port)
+        geth_instance = geth.GethClient(
+            genesis=genesis, port=args.geth_port, datadir_cache=datadir_cache
+        )
         geth_instance.etheno = ETHENO
-        for account in accounts:
-            # TODO: Make some sort of progress bar here
-            geth_instance.logger.info(
-                "Unlocking Geth account %s" % format_hex_address(account.address, True)
-            )
-            geth_instance.import_account(account.private_key)
-        geth_instance.start(unlock_accounts=True)
-        if ETHENO.master_client is None:
-            ETHENO.master_client = geth_instance
-        else:
-            ETHENO.add_client(AddressSynchronizingClient(geth_instance))
+        startup.add(
+            geth_instance,
+            prepare=functools.partial(geth_instance.prepare_datadir, private_keys),
+            launch=geth_instance.launch,
+            reservations=geth_reservations,
+        )
 
     if args.parity:
+        parity_reservations = []
         if args.parity_port is None:
-            if args.geth_port is not None:
-                args.parity_port = find_open_port(args.geth_port + 1)
-            else:
-                args.parity_port = find_open_port(args.port + 1)
+            parity_port = PORTS.reserve(args.port + 1)
+            parity_reservations.append(parity_port)
+            args.parity_port = parity_port.port
 
-        parity_instance = parity.ParityClient(genesis=genesis, port=args.parity_port)
+        parity_instance = parity.ParityClient(
+            genesis=genesis, port=args.parity_port, datadir_cache=datadir_cache
+        )
         parity_instance.etheno = ETHENO
-        for account in accounts:
-            # TODO: Make some sort of progress bar here
-            parity_instance.import_account(account.private_key)
-        parity_instance.start(unlock_accounts=True)
+        startup.add(
+            parity_instance,
+            prepare=functools.partial(parity_instance.prepare_datadir, private_keys),
+            launch=parity_instance.launch,
+            reservations=parity_reservations,
+        )
+
+    startup.start()
+
+    if ganache_client is not None:
+        ETHENO.master_client = ganache_client
+
+    for instance in (geth_instance, parity_instance):
+        if instance is None:
+            continue
         if ETHENO.master_client is None:
-            ETHENO.master_client = parity_instance
+            ETHENO.master_client = instance
         else:
-            ETHENO.add_client(AddressSynchronizingClient(parity_instance))
+            ETHENO.add_client(AddressSynchronizingClient(instance))
 
     for client in args.client:
         ETHENO.add_client(AddressSynchronizingClient(RpcProxyClient(client)))
@@ -507,8 +773,7 @@ def main(argv=None):
                 ETHENO.shutdown()
                 # TODO: Propagate the error code elsewhere so Etheno doesn't exit with code 0
 
-            for plugin in ETHENO.plugins:
-                plugin.finalize()
+            ETHENO.finalize_plugins()
 
             if not ETHENO.clients and not ETHENO.plugins:
                 ETHENO.logger.info("No clients or plugins running; exiting...")
@@ -539,10 +804,15 @@ def main(argv=None):
         # else: this can also happen if there were plugins but they uninstalled themselves after running
         return
 
-    etheno = EthenoView()
-    app.add_url_rule("/", view_func=etheno.as_view("etheno"))
+    ETHENO.register_views()
 
-    ETHENO.run(debug=args.debug, run_publicly=args.run_publicly, port=args.port)
+    ETHENO.run(
+        debug=args.debug,
+        run_publicly=args.run_publicly,
+        port=args.port,
+        server_type=args.server,
+        workers=args.workers,
+    )
     if args.truffle:
         truffle_controller.terminate()
 
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .metrics import Metrics
+
+# The JSON RPC error code for requests that exceed a rate or concurrency limit ("Limit exceeded" in EIP-1474)
+LIMIT_EXCEEDED = -32005
+
+
+class Overloaded(Exception):
+    """A request was rejected by admission control"""
+
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(f"Etheno is overloaded: {reason}")
+        self.reason: str = reason
+        self.retry_after: int = retry_after
+
+    def jsonrpc_error(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the JSON RPC error response for the shed request `data`"""
+        return {
+            "jsonrpc": "2.0",
+            "id": data.get("id", None),
+            "error": {"code": LIMIT_EXCEEDED, "message": str(self)},
+        }
+
+
+class _Waiter:
+    """A queued request, which is woken when a running request hands its slot over to it"""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.admitted: bool = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = loop
+        if loop is None:
+            self.event: Optional[threading.Event] = threading.Event()
+            self.future: Optional[asyncio.Future] = None
+        else:
+            self.event = None
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            # the slot may be released from a worker thread rather than from the event loop
+            self.loop.call_soon_threadsafe(self._set_result)
+
+    def _set_result(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    """Limits the number of JSON RPC requests that Etheno handles at once.
+
+    At most `max_concurrent` requests are handled at a time. Requests beyond that wait, first come first served, in a
+    queue of at most `max_queued` requests; a request is shed (by raising `Overloaded`) if the queue is full when it
+    arrives, or if it has waited for more than `queue_timeout` seconds. The same controller works for requests handled
+    on their own threads (`acquire`) and for requests handled as tasks on an event loop (`aacquire`); either way,
+    `release` must be called once an admitted request has been handled.
+
+    Shed requests get an HTTP 503 response, or a JSON RPC "limit exceeded" error if `jsonrpc_errors` is True.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queued: int = 0,
+        queue_timeout: Optional[float] = None,
+        metrics: Optional[Metrics] = None,
+        jsonrpc_errors: bool = False,
+    ):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent: int = max_concurrent
+        self.max_queued: int = max(max_queued, 0)
+        self.queue_timeout: Optional[float] = queue_timeout
+        self.metrics: Optional[Metrics] = metrics
+        self.jsonrpc_errors: bool = jsonrpc_errors
+        self.in_flight: int = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _update_gauges(self):
+        if self.metrics is not None:
+            self.metrics.requests_in_flight.set(self.in_flight)
+            self.metrics.requests_queued.set(len(self._waiters))
+
+    def _shed(self, reason: str) -> Overloaded:
+        if self.metrics is not None:
+            self.metrics.requests_shed.inc((reason,))
+        return Overloaded(reason)
+
+    def _try_acquire(
+        self, loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Optional[_Waiter]:
+        """Takes a slot if one is free and returns None, or otherwise returns a new waiter that has been queued"""
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not self._waiters:
+                self.in_flight += 1
+                self._update_gauges()
+                return None
+            if len(self._waiters) >= self.max_queued:
+                raise self._shed("queue_full")
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            self._update_gauges()
+            return waiter
+
+    def _finish_waiting(self, waiter: _Waiter, queued_at: float):
+        with self._lock:
+            if not waiter.admitted:
+                self._waiters.remove(waiter)
+                self._update_gauges()
+                raise self._shed("queue_timeout")
+        if self.metrics is not None:
+            self.metrics.queue_duration.observe((), time.monotonic() - queued_at)
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # hand the slot directly to the next waiter, so that a newly arrived request cannot take it first
+                waiter = self._waiters.popleft()
+                waiter.admitted = True
+                waiter.wake()
+            else:
+                self.in_flight -= 1
+            self._update_gauges()
+
+    def acquire(self):
+        """Blocks until the current thread's request may be handled, or raises `Overloaded` if it is shed"""
+        queued_at = time.monotonic()
+        waiter = self._try_acquire()
+        if waiter is None:
+            if self.metrics is not None:
+                self.metrics.queue_duration.observe((), 0.0)
+            return
+        waiter.event.wait(self.queue_timeout)
+        self._finish_waiting(waiter, queued_at)
+
+    async def aacquire(self):
+        """The coroutine equivalent of `acquire`"""
+        queued_at = time.monotonic()
+        waiter = self._try_acquire(asyncio.get_running_loop())
+        if waiter is None:
+            if self.metrics is not None:
+                self.metrics.queue_duration.observe((), 0.0)
+            return
+        try:
+            await asyncio.wait((waiter.future,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.admitted:
+                    self._waiters.remove(waiter)
+                    self._update_gauges()
+                    raise
+            self.release()
+            raise
+        self._finish_waiting(waiter, queued_at)
+
+    def shed_response(
+        self, error: Overloaded, data: Dict[str, Any], was_list: bool
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """Returns the HTTP status, headers, and body of the response to a request that was shed"""
+        headers = [("Retry-After", str(error.retry_after))]
+        if not self.jsonrpc_errors:
+            headers.append(("Content-Type", "text/plain"))
+            return 503, headers, str(error).encode("utf-8")
+        ret = error.jsonrpc_error(data)
+        if was_list:
+            ret = [ret]
+        headers.append(("Content-Type", "application/json"))
+        return 200, headers, json.dumps(ret).encode("utf-8")
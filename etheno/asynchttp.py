@@ -0,0 +1,273 @@
+import asyncio
+import json
+import ssl
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# A minimal HTTP/1.1 implementation over asyncio streams, which the asyncio server mode uses to talk to both its own
+# clients and the JSON RPC backends without a thread per connection
+
+MAX_HEADER_LINES = 100
+MAX_LINE_LENGTH = 65536
+# The default maximum size of a request body that the asyncio server reads into memory; larger requests get a 413
+MAX_BODY_SIZE = 64 << 20
+
+
+class HTTPError(Exception):
+    """An HTTP message was malformed, or the connection closed before a complete message was received"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status: int = status
+
+
+class ConnectionClosed(HTTPError):
+    """The connection was closed before any part of a response was received"""
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    try:
+        line = await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            raise EOFError()
+        raise HTTPError("Connection closed in the middle of a line")
+    except asyncio.LimitOverrunError:
+        raise HTTPError("Line too long", status=431)
+    if len(line) > MAX_LINE_LENGTH:
+        raise HTTPError("Line too long", status=431)
+    return line.rstrip(b"\r\n")
+
+
+async def read_line(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Reads a line without its line ending, returning None if the connection closed before the line began"""
+    try:
+        return await _read_line(reader)
+    except EOFError:
+        return None
+
+
+async def read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+    """Reads HTTP headers up to and including the blank line that ends them; header names are lowercased"""
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        try:
+            line = await _read_line(reader)
+        except EOFError:
+            raise HTTPError("Connection closed while reading headers")
+        if not line:
+            return headers
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep:
+            raise HTTPError(f"Malformed header line: {line!r}")
+        name = name.strip().lower()
+        value = value.strip()
+        if name in headers:
+            headers[name] = f"{headers[name]}, {value}"
+        else:
+            headers[name] = value
+    raise HTTPError("Too many headers", status=431)
+
+
+def has_framing(headers: Dict[str, str]) -> bool:
+    """Whether a message's body is delimited by its length or by chunked encoding, rather than by closing the
+    connection"""
+    return (
+        "content-length" in headers
+        or "chunked" in headers.get("transfer-encoding", "").lower()
+    )
+
+
+def _too_large(max_size: int) -> HTTPError:
+    return HTTPError(f"Message body exceeds {max_size} bytes", status=413)
+
+
+async def read_body(
+    reader: asyncio.StreamReader,
+    headers: Dict[str, str],
+    max_size: Optional[int] = MAX_BODY_SIZE,
+    until_eof: bool = False,
+) -> bytes:
+    """Reads a message body of at most `max_size` bytes (if it is not None), raising an `HTTPError` with status 413 if
+    it is larger.
+
+    A body without a Content-Length or chunked encoding is empty, unless `until_eof` is True, in which case it is the
+    rest of the stream (as for a response that ends when the server closes the connection).
+    """
+    try:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            chunks: List[bytes] = []
+            total = 0
+            while True:
+                size_line = await _read_line(reader)
+                size = int(size_line.split(b";", 1)[0], 16)
+                if size == 0:
+                    # skip any trailers
+                    while await _read_line(reader):
+                        pass
+                    return b"".join(chunks)
+                total += size
+                if max_size is not None and total > max_size:
+                    raise _too_large(max_size)
+                chunks.append(await reader.readexactly(size))
+                await _read_line(reader)
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length < 0:
+                raise ValueError(length)
+            if max_size is not None and length > max_size:
+                raise _too_large(max_size)
+            return await reader.readexactly(length)
+        elif until_eof:
+            chunks = []
+            total = 0
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    return b"".join(chunks)
+                total += len(chunk)
+                if max_size is not None and total > max_size:
+                    raise _too_large(max_size)
+                chunks.append(chunk)
+        else:
+            return b""
+    except (ValueError, EOFError) as e:
+        raise HTTPError(f"Invalid message body: {e}")
+    except asyncio.IncompleteReadError:
+        raise HTTPError("Connection closed while reading the message body")
+
+
+def keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return "keep-alive" in connection
+    return "close" not in connection
+
+
+def encode_response(
+    status: int,
+    reason: str,
+    headers: List[Tuple[str, str]],
+    body: bytes,
+    close: bool = False,
+) -> bytes:
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines.extend(
+        f"{name}: {value}"
+        for name, value in headers
+        if name.lower() not in ("content-length", "connection")
+    )
+    lines.append(f"Content-Length: {len(body)}")
+    if close:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+class AsyncRpcHttpProxy:
+    """Posts JSON RPC requests to an HTTP(S) endpoint over a pool of keep-alive connections.
+
+    This is the asyncio counterpart of `RpcHttpProxy.post`; at most `max_connections` requests are in flight at once
+    and the rest wait for a free connection.
+    """
+
+    def __init__(self, urlstring: str, max_connections: int = 64):
+        self.urlstring: str = urlstring
+        url = urlsplit(urlstring)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme for {urlstring}")
+        self._ssl: Optional[ssl.SSLContext] = (
+            ssl.create_default_context() if url.scheme == "https" else None
+        )
+        self._host: str = url.hostname or "localhost"
+        self._port: int = url.port or (443 if url.scheme == "https" else 80)
+        self._path: str = url.path or "/"
+        if url.query:
+            self._path = f"{self._path}?{url.query}"
+        self._host_header: str = url.netloc.rsplit("@", 1)[-1]
+        self.max_connections: int = max_connections
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def post(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if self._semaphore is None:
+            # created lazily so that it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        body = json.dumps(data).encode("utf-8")
+        request = (
+            f"POST {self._path} HTTP/1.1\r\n"
+            f"Host: {self._host_header}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1") + body
+        async with self._semaphore:
+            while True:
+                reused = bool(self._idle)
+                if reused:
+                    reader, writer = self._idle.pop()
+                else:
+                    reader, writer = await asyncio.open_connection(
+                        self._host, self._port, ssl=self._ssl
+                    )
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    status, headers, response = await self._read_response(reader)
+                except (ConnectionClosed, ConnectionError):
+                    writer.close()
+                    if reused:
+                        # the server closed the idle connection before it received the request, so retry on a new one
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive("HTTP/1.1", headers) and has_framing(headers):
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                if status >= 400 and not response:
+                    raise HTTPError(
+                        f"{self.urlstring} responded with HTTP status {status}",
+                        status=status,
+                    )
+                return json.loads(response)
+
+    @staticmethod
+    async def _read_response(
+        reader: asyncio.StreamReader,
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        while True:
+            try:
+                status_line = await _read_line(reader)
+            except EOFError:
+                raise ConnectionClosed(
+                    "Connection closed before a response was received"
+                )
+            parts = status_line.decode("latin-1").split(" ", 2)
+            if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+                raise HTTPError(f"Malformed status line: {status_line!r}")
+            status = int(parts[1])
+            headers = await read_headers(reader)
+            if status == 100:
+                continue
+            if status in (204, 304):
+                return status, headers, b""
+            # responses come from the clients Etheno was configured with, so their size is not limited, and one
+            # without a Content-Length or chunked encoding ends when the client closes the connection
+            return (
+                status,
+                headers,
+                await read_body(reader, headers, max_size=None, until_eof=True),
+            )
+
+    def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    def __str__(self):
+        return f"{self.__class__.__name__}<{self.urlstring}>"
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.urlstring})"
@@ -0,0 +1,294 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .admission import Overloaded
+from .asynchttp import (
+    MAX_BODY_SIZE,
+    HTTPError,
+    encode_response,
+    keep_alive,
+    read_body,
+    read_headers,
+    read_line,
+)
+from .client import JSONRPCError
+from .etheno import Etheno, InvalidRequest, parse_request
+
+# How long to keep reading from a client after responding to a malformed request, before closing the connection
+LINGER_SECONDS = 2.0
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    411: "Length Required",
+    413: "Payload Too Large",
+    426: "Upgrade Required",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+def _content_length(headers: Dict[str, str]) -> int:
+    try:
+        return int(headers.get("content-length", "0"))
+    except ValueError:
+        # read_body reports the malformed header
+        return 0
+
+
+class AsyncEthenoServer:
+    """Serves Etheno's JSON RPC endpoint from an asyncio event loop.
+
+    Every connection is handled on the event loop thread, and JSON RPC requests are passed to `Etheno.apost`, so
+    thousands of requests can be in flight with a fixed number of threads: clients that support it are posted to
+    asynchronously, and everything else that might block (client functions, clients wrapped without an `apost`
+    equivalent, and requests to any path other than `/`, which are passed to the Flask `wsgi_app`) runs on a pool of
+    `workers` threads. Request bodies larger than `max_body_size` bytes are rejected with a 413 without being read.
+    This has the same `serve_forever`/`shutdown` interface as a werkzeug server.
+    """
+
+    def __init__(
+        self,
+        etheno: Etheno,
+        host: str,
+        port: int,
+        wsgi_app,
+        workers: int = 32,
+        max_body_size: int = MAX_BODY_SIZE,
+    ):
+        self.etheno: Etheno = etheno
+        self.host: str = host
+        self.port: int = port
+        self.wsgi_app = wsgi_app
+        # requests with a larger body get a 413 rather than being read into memory
+        self.max_body_size: int = max_body_size
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="EthenoWorker"
+        )
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self._stopped: Optional[asyncio.Event] = None
+        self._started = threading.Event()
+        # bind immediately, like werkzeug's make_server, so that the port is in use once the server is created
+        self._server: asyncio.AbstractServer = self.loop.run_until_complete(
+            asyncio.start_server(
+                self._handle_connection, host=host, port=port, limit=1 << 20
+            )
+        )
+
+    def serve_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self._stopped = asyncio.Event()
+        self._started.set()
+        try:
+            self.loop.run_until_complete(self._stopped.wait())
+            self._server.close()
+            # cancel connections that are still open (e.g., idle keep-alive connections, or ones lingering after an
+            # error) so that their handlers finish before the loop is closed, rather than being destroyed while pending
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(
+                asyncio.gather(*pending, return_exceptions=True)
+            )
+            self.loop.run_until_complete(self._server.wait_closed())
+        finally:
+            self.executor.shutdown(wait=False)
+            self.loop.close()
+
+    def shutdown(self):
+        self._started.wait()
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                try:
+                    # unlike StreamReader.readline, this raises an HTTPError for a request line that is too long
+                    request_line = await read_line(reader)
+                    if request_line is None:
+                        break
+                    if not request_line:
+                        # tolerate blank lines between requests
+                        continue
+                    parts = request_line.decode("latin-1").split()
+                    if len(parts) != 3:
+                        raise HTTPError(f"Malformed request line: {request_line!r}")
+                    method, target, version = parts
+                    headers = await read_headers(reader)
+                    if headers.get("expect", "").lower() == "100-continue":
+                        # a body that is too large is rejected before the client sends it
+                        if _content_length(headers) <= self.max_body_size:
+                            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    body = await read_body(reader, headers, max_size=self.max_body_size)
+                except HTTPError as e:
+                    writer.write(
+                        encode_response(
+                            e.status,
+                            REASONS.get(e.status, ""),
+                            [],
+                            str(e).encode("utf-8"),
+                            close=True,
+                        )
+                    )
+                    await self._linger(reader, writer)
+                    break
+                close = not keep_alive(version, headers)
+                if method == "POST" and urlsplit(target).path == "/":
+                    status, response_headers, response = await self._handle_jsonrpc(
+                        body
+                    )
+                else:
+                    status, response_headers, response = await self._handle_wsgi(
+                        method, target, version, headers, body
+                    )
+                writer.write(
+                    encode_response(
+                        status,
+                        REASONS.get(status, ""),
+                        response_headers,
+                        response,
+                        close=close,
+                    )
+                )
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _linger(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Sends the response written so far and discards the rest of the client's request before closing.
+
+        Closing a socket that still has unread input resets the connection, which can discard the response (e.g., to
+        a request line that is too long) before the client reads it.
+        """
+        try:
+            await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+
+            async def discard():
+                while await reader.read(1 << 16):
+                    pass
+
+            await asyncio.wait_for(discard(), LINGER_SECONDS)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+
+    async def _handle_jsonrpc(
+        self, body: bytes
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        try:
+            data, was_list = parse_request(json.loads(body), self.etheno.logger)
+        except ValueError as e:
+            status = e.status if isinstance(e, InvalidRequest) else 400
+            return status, [("Content-Type", "text/plain")], REASONS[status].encode()
+
+        admission = self.etheno.admission
+        if admission is None:
+            return await self._post(data, was_list)
+        try:
+            await admission.aacquire()
+        except Overloaded as e:
+            self.etheno.logger.debug(f"Shedding JSON RPC request {data}: {e}")
+            return admission.shed_response(e, data, was_list)
+        try:
+            return await self._post(data, was_list)
+        finally:
+            admission.release()
+
+    async def _post(
+        self, data, was_list: bool
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        tracer = self.etheno.tracer
+        headers = [("Content-Type", "application/json")]
+        try:
+            if tracer is None:
+                ret = await self.etheno.apost(data)
+            else:
+                with tracer.trace(
+                    "request", own_track=True, method=data["method"]
+                ) as trace:
+                    headers.append(("X-Etheno-Trace-Id", str(trace.trace_id)))
+                    ret = await self.etheno.apost(data)
+        except Exception:
+            self.etheno.logger.exception(f"Error handling JSON RPC request {data}")
+            return 500, [("Content-Type", "text/plain")], REASONS[500].encode()
+
+        self.etheno.logger.debug(f"Returning {ret}")
+
+        if ret is None:
+            # like the Flask view, which cannot return None
+            return 500, [("Content-Type", "text/plain")], REASONS[500].encode()
+
+        if isinstance(ret, JSONRPCError):
+            ret = ret.result
+
+        if was_list:
+            ret = [ret]
+        return 200, headers, json.dumps(ret).encode("utf-8")
+
+    async def _handle_wsgi(
+        self,
+        method: str,
+        target: str,
+        version: str,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        url = urlsplit(target)
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(url.path, "latin-1"),
+            "QUERY_STRING": url.query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": str(self.port),
+            "SERVER_PROTOCOL": version,
+            "REMOTE_ADDR": "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "CONTENT_LENGTH": str(len(body)),
+        }
+        for name, value in headers.items():
+            if name == "content-type":
+                environ["CONTENT_TYPE"] = value
+            elif name != "content-length":
+                environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+
+        def call_app():
+            response: Dict[str, object] = {}
+
+            def start_response(status, response_headers, exc_info=None):
+                response["status"] = int(status.split(" ", 1)[0])
+                response["headers"] = response_headers
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                content = b"".join(result)
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+            return response["status"], response["headers"], content
+
+        return await asyncio.get_running_loop().run_in_executor(None, call_app)
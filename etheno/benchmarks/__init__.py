@@ -0,0 +1,2 @@
+from .load import LoadGenerator, LoadResult
+from .mockserver import MockChain, MockJSONRPCServer
@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import platform
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils import find_open_port, webserver_is_up
+from .load import WORKLOAD_MIXES, LoadGenerator
+from .mockserver import MockJSONRPCServer
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """Returns the user plus system CPU time consumed so far by process `pid`, or None if it cannot be determined"""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # the command name is in parentheses and may contain spaces, so split after it:
+    fields = stat[stat.rindex(")") + 2 :].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+# Maps each configuration to a function that returns the Etheno arguments for a list of mock client URLs
+CONFIGURATIONS: Dict[str, Callable[[List[str]], List[str]]] = {
+    "master-only": lambda urls: [urls[0], "--no-differential-testing"],
+    "secondaries": lambda urls: urls + ["--no-differential-testing"],
+    "differential": lambda urls: urls[:2],
+    "raw-client": lambda urls: [urls[0], "--raw", urls[1], "--no-differential-testing"],
+}
+
+
+def backends_for(configuration: str, secondaries: int) -> int:
+    if configuration == "direct" or configuration == "master-only":
+        return 1
+    elif configuration == "secondaries":
+        return 1 + secondaries
+    return 2
+
+
+class EthenoProcess:
+    """Runs the Etheno command line interface in a subprocess"""
+
+    def __init__(self, etheno_args: List[str], port: int, log_level: str = "WARNING"):
+        self.port: int = port
+        self.url: str = f"http://127.0.0.1:{port}/"
+        package_root = os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        )
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            p for p in (package_root, env.get("PYTHONPATH", "")) if p
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "etheno", "-p", str(port), "-l", log_level]
+            + etheno_args,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
+    def wait_until_running(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while not webserver_is_up(self.url):
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"Etheno exited with status {self.process.returncode}:\n"
+                    + self.process.stderr.read().decode("utf-8", "replace")
+                )
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Etheno did not start listening on {self.url}")
+            time.sleep(0.05)
+
+    @property
+    def cpu_seconds(self) -> Optional[float]:
+        return process_cpu_seconds(self.process.pid)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                self.process.wait(15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+def run_configuration(configuration: str, args) -> Dict[str, Any]:
+    backends = [
+        MockJSONRPCServer(latency=args.latency / 1000.0).start()
+        for _ in range(backends_for(configuration, args.secondaries))
+    ]
+    etheno: Optional[EthenoProcess] = None
+    try:
+        if configuration == "direct":
+            url = backends[0].url
+        else:
+            etheno = EthenoProcess(
+                CONFIGURATIONS[configuration]([b.url for b in backends])
+                + ["--server", args.server]
+                + shlex.split(args.etheno_args),
+                port=find_open_port(args.port),
+                log_level=args.log_level,
+            )
+            etheno.wait_until_running()
+            url = etheno.url
+        # warm up so that connection setup and lazy initialization are not measured
+        LoadGenerator(
+            url, concurrency=1, requests=min(50, args.requests), mix=args.mix
+        ).run()
+        cpu_before = None if etheno is None else etheno.cpu_seconds
+        result = LoadGenerator(
+            url, concurrency=args.concurrency, requests=args.requests, mix=args.mix
+        ).run()
+        cpu_after = None if etheno is None else etheno.cpu_seconds
+        ret = {"configuration": configuration, "backends": len(backends)}
+        ret.update(result.to_dict())
+        if cpu_before is not None and cpu_after is not None and result.requests:
+            ret["cpu_ms_per_request"] = (
+                (cpu_after - cpu_before) * 1000.0 / result.requests
+            )
+        else:
+            ret["cpu_ms_per_request"] = None
+        ret["backend_requests"] = sum(b.request_count for b in backends)
+        return ret
+    finally:
+        if etheno is not None:
+            etheno.stop()
+        for backend in backends:
+            backend.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m etheno.benchmarks",
+        description="Measures Etheno's own overhead by proxying a generated workload to mock JSON RPC clients",
+    )
+    parser.add_argument(
+        "--configurations",
+        type=str,
+        nargs="+",
+        choices=["direct"] + list(CONFIGURATIONS),
+        default=["direct"] + list(CONFIGURATIONS),
+        help="Configurations to benchmark; `direct` sends the workload straight to a mock client, without Etheno, "
+        "as a baseline (default=all)",
+    )
+    parser.add_argument(
+        "--secondaries",
+        type=int,
+        default=2,
+        help="Number of secondary clients in the `secondaries` configuration (default=2)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=2000,
+        help="Requests per configuration (default=2000)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Concurrent connections (default=8)"
+    )
+    parser.add_argument(
+        "--mix",
+        type=str,
+        choices=WORKLOAD_MIXES,
+        default="mixed",
+        help="Workload: only read calls, only transactions, or one transaction per four read calls (default=mixed)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Milliseconds that each mock client waits before answering (default=0)",
+    )
+    parser.add_argument(
+        "--server",
+        type=str,
+        choices=("threaded", "asyncio"),
+        default="threaded",
+        help="Etheno's server implementation (default=threaded)",
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=18545,
+        help="First port to try for Etheno (default=18545)",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-level",
+        type=str.upper,
+        choices={"CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"},
+        default="WARNING",
+        help="Etheno's log level during the benchmark (default=WARNING)",
+    )
+    parser.add_argument(
+        "--etheno-args",
+        type=str,
+        default="",
+        help="Additional arguments for Etheno, e.g. --etheno-args='--background-after-post'",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Path to which to save the results as JSON",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for configuration in args.configurations:
+        result = run_configuration(configuration, args)
+        results.append(result)
+        cpu = result["cpu_ms_per_request"]
+        print(
+            "%-14s %9.1f req/s   p50 %8.3f ms   p99 %8.3f ms   cpu %s   errors %d"
+            % (
+                configuration,
+                result["requests_per_second"],
+                result["p50_ms"] or 0.0,
+                result["p99_ms"] or 0.0,
+                "   n/a   " if cpu is None else "%6.3f ms/req" % cpu,
+                result["errors"],
+            ),
+            flush=True,
+        )
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "latency_ms": args.latency,
+            "secondaries": args.secondaries,
+            "log_level": args.log_level,
+        },
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
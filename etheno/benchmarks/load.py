@@ -0,0 +1,207 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from ..utils import percentile
+
+READ_CALLS = (
+    ("eth_blockNumber", lambda accounts: []),
+    ("eth_getBalance", lambda accounts: [accounts[0], "latest"]),
+    (
+        "eth_call",
+        lambda accounts: [
+            {"from": accounts[0], "to": accounts[-1], "data": "0x70a08231" + "00" * 32},
+            "latest",
+        ],
+    ),
+)
+
+WORKLOAD_MIXES = ("read", "write", "mixed")
+
+
+class LoadResult:
+    def __init__(self, latencies: List[float], errors: int, elapsed: float):
+        self.latencies: List[float] = sorted(latencies)
+        self.errors: int = errors
+        self.elapsed: float = elapsed
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def requests_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.requests / self.elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else seconds * 1000.0
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_seconds": self.elapsed,
+            "requests_per_second": self.requests_per_second,
+            "p50_ms": ms(percentile(self.latencies, 50)),
+            "p99_ms": ms(percentile(self.latencies, 99)),
+            "max_ms": ms(self.latencies[-1] if self.latencies else None),
+        }
+
+
+class LoadGenerator:
+    """Drives a JSON RPC endpoint (usually Etheno's `EthenoView`) over HTTP from a pool of worker threads"""
+
+    def __init__(
+        self,
+        url: str,
+        concurrency: int = 8,
+        requests: int = 2000,
+        mix: str = "mixed",
+        timeout: float = 60.0,
+    ):
+        """
+        :param url: the JSON RPC endpoint to drive
+        :param concurrency: the number of concurrent connections
+        :param requests: the total number of requests to send; in the write and mixed workloads, each transaction
+        counts as two requests: its eth_sendTransaction and its eth_getTransactionReceipt
+        :param mix: "read" for only read calls, "write" for only transactions, or "mixed" for one transaction for
+        every four read calls
+        """
+        if mix not in WORKLOAD_MIXES:
+            raise ValueError(
+                f"Unknown workload mix {mix!r}; expected one of {WORKLOAD_MIXES}"
+            )
+        parsed = urlparse(url)
+        self.host: str = parsed.hostname or "127.0.0.1"
+        self.port: int = parsed.port or 80
+        self.path: str = parsed.path or "/"
+        self.concurrency: int = concurrency
+        self.requests: int = requests
+        self.mix: str = mix
+        self.timeout: float = timeout
+        self._ids = itertools.count(1)
+        self._remaining = itertools.count()
+        self.accounts: List[str] = []
+
+    def _post(
+        self, connection: http.client.HTTPConnection, method: str, params
+    ) -> Dict[str, Any]:
+        body = json.dumps(
+            {
+                "id": next(self._ids),
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params,
+            }
+        )
+        connection.request(
+            "POST", self.path, body=body, headers={"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            return {
+                "error": {
+                    "code": response.status,
+                    "message": data.decode("utf-8", "replace"),
+                }
+            }
+        return json.loads(data)
+
+    def _take(self, count: int) -> bool:
+        for _ in range(count):
+            if next(self._remaining) >= self.requests:
+                return False
+        return True
+
+    def _timed_post(
+        self, connection, method, params, latencies: List[float]
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            ret = self._post(connection, method, params)
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            ret = {"error": {"code": -1, "message": str(e)}}
+        latencies.append(time.perf_counter() - start)
+        return ret
+
+    def _worker(self, worker_id: int, latencies: List[float], errors: List[int]):
+        connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout
+        )
+        try:
+            for i in itertools.count(worker_id):
+                if self.mix == "write" or (self.mix == "mixed" and i % 5 == 4):
+                    if not self._take(2):
+                        break
+                    sender = self.accounts[i % len(self.accounts)]
+                    ret = self._timed_post(
+                        connection,
+                        "eth_sendTransaction",
+                        [
+                            {
+                                "from": sender,
+                                "to": self.accounts[-1],
+                                "value": "0x1",
+                                "gas": "0x5208",
+                                "gasPrice": "0x4a817c800",
+                            }
+                        ],
+                        latencies,
+                    )
+                    if "error" in ret or not ret.get("result", None):
+                        errors[worker_id] += 1
+                        continue
+                    ret = self._timed_post(
+                        connection,
+                        "eth_getTransactionReceipt",
+                        [ret["result"]],
+                        latencies,
+                    )
+                else:
+                    if not self._take(1):
+                        break
+                    method, params = READ_CALLS[i % len(READ_CALLS)]
+                    ret = self._timed_post(
+                        connection, method, params(self.accounts), latencies
+                    )
+                if "error" in ret:
+                    errors[worker_id] += 1
+        finally:
+            connection.close()
+
+    def run(self) -> LoadResult:
+        connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout
+        )
+        try:
+            self.accounts = self._post(connection, "eth_accounts", [])["result"]
+        finally:
+            connection.close()
+        self._remaining = itertools.count()
+        latencies: List[List[float]] = [[] for _ in range(self.concurrency)]
+        errors = [0] * self.concurrency
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(i, latencies[i], errors), daemon=True
+            )
+            for i in range(self.concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return LoadResult(
+            [latency for worker in latencies for latency in worker],
+            sum(errors),
+            elapsed,
+        )
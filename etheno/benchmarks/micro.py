@@ -0,0 +1,418 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BASELINE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "baselines", "micro.json"
+)
+
+# Maps the name of each micro-benchmark to a function that performs its (possibly expensive) setup and returns
+# the zero-argument callable to be timed
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+def _address(i: int) -> str:
+    return "0x%040x" % (0xE7E5 << 140 | i)
+
+
+LARGE_CALLDATA = "0xa9059cbb" + "".join(
+    "%064x" % (0xE7E5 << 140 | i) for i in range(1024)
+)  # 32 KiB of ABI-encoded words, many of which are addresses
+
+
+class _QuietClient:
+    """Stands in for the client whose logger `_remap_params` reports conversions to"""
+
+    logger = logging.getLogger("etheno.benchmarks.micro")
+    logger.disabled = True
+
+
+@benchmark("format_hex_address[int]")
+def _format_hex_address_int():
+    from ..utils import format_hex_address
+
+    address = int(_address(1337), 16)
+    return lambda: format_hex_address(address, True)
+
+
+@benchmark("format_hex_address[str]")
+def _format_hex_address_str():
+    from ..utils import format_hex_address
+
+    address = _address(1337)
+    return lambda: format_hex_address(address)
+
+
+@benchmark("decode_value[hex]")
+def _decode_value_hex():
+    from ..utils import decode_value
+
+    return lambda: decode_value("0de0b6b3a7640000")
+
+
+@benchmark("decode_value[decimal]")
+def _decode_value_decimal():
+    from ..utils import decode_value
+
+    return lambda: decode_value("100000000000000000000")
+
+
+@benchmark("synchronization._decode_value")
+def _sync_decode_value():
+    from ..synchronization import _decode_value
+
+    values = ["0x5208", _address(7), "latest", 1234, LARGE_CALLDATA]
+    return lambda: [_decode_value(v) for v in values]
+
+
+@benchmark("synchronization._remap_params[large calldata, 1000 mappings]")
+def _remap_params_large():
+    from ..synchronization import _remap_params
+
+    mapping = {int(_address(i), 16): int(_address(i + 5000), 16) for i in range(1000)}
+    transaction = {
+        "from": _address(1),
+        "to": _address(2),
+        "gas": "0x5208",
+        "gasPrice": "0x4a817c800",
+        "value": "0x0",
+        "data": LARGE_CALLDATA,
+    }
+    return lambda: _remap_params(
+        _QuietClient, dict(transaction), mapping, "eth_sendTransaction", remap_data=True
+    )
+
+
+@benchmark("synchronization._remap_params[eth_call, 1000 mappings]")
+def _remap_params_call():
+    from ..synchronization import _remap_params
+
+    mapping = {int(_address(i), 16): int(_address(i + 5000), 16) for i in range(1000)}
+    call = {"to": _address(3), "data": "0x70a08231" + "%064x" % 5}
+    return lambda: _remap_params(
+        _QuietClient, [dict(call), "latest"], mapping, "eth_call"
+    )
+
+
+@benchmark("transaction_receipt_succeeded[500 logs]")
+def _receipt_succeeded():
+    from ..client import transaction_receipt_succeeded
+
+    receipt = {
+        "id": 1,
+        "jsonrpc": "2.0",
+        "result": {
+            "transactionHash": "0x" + "ab" * 32,
+            "blockHash": None,
+            "blockNumber": "0x10",
+            "contractAddress": None,
+            "gasUsed": "0x5208",
+            "status": "0x1",
+            "logs": [
+                {
+                    "address": _address(i),
+                    "topics": ["0x" + "%064x" % i] * 3,
+                    "data": "0x" + "00" * 64,
+                }
+                for i in range(500)
+            ],
+        },
+    }
+    return lambda: transaction_receipt_succeeded(receipt)
+
+
+@benchmark("decode_raw_tx[large calldata]")
+def _decode_raw_tx():
+    from web3.auto import w3
+
+    from ..genesis import DEFAULT_PRIVATE_KEYS
+    from ..jsonrpc import decode_raw_tx
+
+    signed = w3.eth.account.sign_transaction(
+        {
+            "nonce": 0,
+            "gasPrice": 20000000000,
+            "gas": 6000000,
+            "to": w3.toChecksumAddress(_address(2)),
+            "value": 0,
+            "data": LARGE_CALLDATA,
+            "chainId": 0x657468656E6F,
+        },
+        DEFAULT_PRIVATE_KEYS[0],
+    )
+    raw_tx = signed.rawTransaction.hex()
+    return lambda: decode_raw_tx(raw_tx)
+
+
+@benchmark("jsonrpc wrapper[eth_sendTransaction kwargs]")
+def _jsonrpc_wrapper():
+    from ..client import DATA, QUANTITY, jsonrpc
+
+    class Client:
+        @jsonrpc(
+            from_addr=QUANTITY,
+            to=QUANTITY,
+            gas=QUANTITY,
+            gasPrice=QUANTITY,
+            value=QUANTITY,
+            data=DATA,
+            RETURN=DATA,
+        )
+        def eth_sendTransaction(
+            self,
+            from_addr,
+            to=None,
+            gas=90000,
+            gasPrice=None,
+            value=0,
+            data=None,
+            nonce=None,
+            rpc_client_result=None,
+        ):
+            return data
+
+    client = Client()
+    kwargs = {
+        "from_addr": _address(1),
+        "to": _address(2),
+        "gas": "0x5208",
+        "gasPrice": "0x4a817c800",
+        "value": "0x0",
+        "data": LARGE_CALLDATA,
+        "rpc_client_result": {"result": "0x" + "ab" * 32},
+    }
+    return lambda: client.eth_sendTransaction(**kwargs)
+
+
+def _json_exporter(**options):
+    import tempfile
+
+    from ..jsonrpc import JSONExporter
+
+    # a real file, since the cost being measured is mostly that of writing and flushing it
+    exporter = JSONExporter(tempfile.TemporaryFile("w"), flush_interval=None, **options)
+    entry = [
+        {
+            "id": 1,
+            "jsonrpc": "2.0",
+            "method": "eth_getBalance",
+            "params": [_address(1), "latest"],
+        },
+        [{"id": 1, "jsonrpc": "2.0", "result": "0xde0b6b3a7640000"}],
+    ]
+    return lambda: exporter.write_entry(entry)
+
+
+@benchmark("JSONExporter.write_entry[buffered]")
+def _json_exporter_buffered():
+    return _json_exporter()
+
+
+@benchmark("JSONExporter.write_entry[flush per entry]")
+def _json_exporter_unbuffered():
+    # the behavior before exports were buffered
+    return _json_exporter(max_buffered_entries=1)
+
+
+def _calibration_loop():
+    # a fixed mix of the operations the benchmarks spend their time on (integer and string conversions, formatting,
+    # and dict lookups), so that its time scales with the machine and interpreter in the same way as theirs
+    table = {i: str(i) for i in range(64)}
+    total = 0
+    for i in range(32):
+        word = "%064x" % (i * 0x9E3779B97F4A7C15)
+        total += int(word[-16:], 16) & 0xFF
+        total += len(table[i & 63])
+    return total
+
+
+def measure(function: Callable[[], object], repeat: int = 5) -> float:
+    """Returns the best observed time per call of `function`, in nanoseconds"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Returns the time per call of a fixed calibration loop on this machine, in nanoseconds.
+
+    Baselines store each benchmark's time relative to this, so that they can be compared across machines.
+    """
+    return measure(_calibration_loop, repeat=repeat)
+
+
+def run(
+    names: Optional[List[str]] = None, repeat: int = 5
+) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Runs the selected micro-benchmarks, returning the nanoseconds per call of each and the ones that were skipped"""
+    results: Dict[str, float] = {}
+    skipped: Dict[str, str] = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(n in name for n in names):
+            continue
+        try:
+            function = setup()
+        except ImportError as e:
+            skipped[name] = str(e)
+            continue
+        results[name] = measure(function, repeat=repeat)
+    return results, skipped
+
+
+def relative(results: Dict[str, float], calibration_ns: float) -> Dict[str, float]:
+    """Returns the time of each benchmark as a multiple of the calibration loop's time"""
+    return {name: ns / calibration_ns for name, ns in results.items()}
+
+
+def load_baseline(path: str) -> Dict[str, float]:
+    """Returns the time of each benchmark in the baseline at `path`, relative to the calibration loop"""
+    with open(path, "r") as f:
+        baseline = json.load(f)
+    if "relative" not in baseline:
+        raise ValueError(
+            f"{path} holds absolute timings from an older version; run with --save-baseline to replace it"
+        )
+    return baseline["relative"]
+
+
+def save_baseline(path: str, ratios: Dict[str, float]):
+    """Saves benchmark times relative to the calibration loop (see `relative`) as a baseline.
+
+    Absolute times are not saved, since they only apply to the machine that measured them.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "relative": {
+                    name: float("%.4g" % ratio) for name, ratio in ratios.items()
+                },
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+
+def compare(
+    ratios: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> Tuple[str, List[str]]:
+    """Returns a comparison report and the names of the benchmarks that regressed by more than `threshold`.
+
+    Both `ratios` and `baseline` are times relative to the calibration loop.
+    """
+    regressions = []
+    report = "%-62s %14s %14s %8s\n" % (
+        "benchmark",
+        "baseline x cal",
+        "current x cal",
+        "change",
+    )
+    for name, current in ratios.items():
+        if name in baseline:
+            change = current / baseline[name] - 1.0
+            if change > threshold:
+                regressions.append(name)
+                flag = "  REGRESSED"
+            elif change < -threshold:
+                flag = "  improved"
+            else:
+                flag = ""
+            report += "%-62s %14.4g %14.4g %+7.1f%%%s\n" % (
+                name,
+                baseline[name],
+                current,
+                change * 100.0,
+                flag,
+            )
+        else:
+            report += "%-62s %14s %14.4g %8s\n" % (name, "-", current, "new")
+    return report, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m etheno.benchmarks.micro",
+        description="Micro-benchmarks for the functions Etheno runs on every request or transaction",
+    )
+    parser.add_argument(
+        "benchmarks",
+        type=str,
+        nargs="*",
+        help="Only run the benchmarks whose names contain one of these substrings",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timing runs per benchmark; the best is reported (default=5)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=DEFAULT_BASELINE,
+        help="Baseline to compare against (default=the baseline stored with Etheno)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        default=False,
+        help="Save the results as the new baseline instead of comparing against it",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=25.0,
+        help="Percentage slowdown relative to the baseline that counts as a regression (default=25)",
+    )
+    args = parser.parse_args(argv)
+
+    calibration_ns = calibrate(repeat=args.repeat)
+    results, skipped = run(args.benchmarks, repeat=args.repeat)
+    for name, reason in skipped.items():
+        sys.stderr.write(f"Skipping {name}: {reason}\n")
+    print(f"Calibration loop: {calibration_ns:.1f}ns per call")
+    ratios = relative(results, calibration_ns)
+
+    if args.save_baseline:
+        if args.benchmarks and os.path.exists(args.baseline):
+            # only update the benchmarks that were run
+            baseline = load_baseline(args.baseline)
+            baseline.update(ratios)
+            ratios = baseline
+        save_baseline(args.baseline, ratios)
+        print(f"Saved baseline for {len(ratios)} benchmarks to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        baseline = load_baseline(args.baseline)
+    else:
+        sys.stderr.write(f"No baseline found at {args.baseline}\n")
+        baseline = {}
+    report, regressions = compare(ratios, baseline, args.threshold / 100.0)
+    print(report, end="")
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) regressed by more than {args.threshold}%"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
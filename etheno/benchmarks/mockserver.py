@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CHAIN_ID = 0x657468656E6F  # 'etheno' in hex
+DEFAULT_GAS_PRICE = 20000000000
+
+
+def _hash(*parts: Any) -> str:
+    return "0x" + hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class MockChain:
+    """A minimal, instantly-mining stand-in for the state of a JSON RPC client such as Ganache, Geth, or Parity"""
+
+    def __init__(self, num_accounts: int = 10, chain_id: int = DEFAULT_CHAIN_ID):
+        self.chain_id: int = chain_id
+        self.accounts: List[str] = [
+            "0x" + hashlib.sha256(b"account%d" % i).hexdigest()[:40]
+            for i in range(num_accounts)
+        ]
+        self.block_number: int = 0
+        self.receipts: Dict[str, Dict[str, Any]] = {}
+        self.nonces: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _mine(
+        self, tx_hash: str, from_address: Optional[str], to_address: Optional[str]
+    ):
+        self.block_number += 1
+        receipt = {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockHash": _hash("block", self.block_number),
+            "blockNumber": hex(self.block_number),
+            "from": from_address,
+            "to": to_address,
+            "cumulativeGasUsed": "0x5208",
+            "gasUsed": "0x5208",
+            "effectiveGasPrice": hex(DEFAULT_GAS_PRICE),
+            "contractAddress": None,
+            "logs": [],
+            "status": "0x1",
+        }
+        if to_address is None:
+            receipt["contractAddress"] = "0x" + tx_hash[-40:]
+        self.receipts[tx_hash] = receipt
+
+    def send_transaction(self, transaction: Dict[str, Any]) -> str:
+        with self._lock:
+            from_address = transaction.get("from", self.accounts[0]).lower()
+            nonce = self.nonces.get(from_address, 0)
+            self.nonces[from_address] = nonce + 1
+            tx_hash = _hash(self.chain_id, from_address, nonce)
+            self._mine(tx_hash, from_address, transaction.get("to", None))
+            return tx_hash
+
+    def send_raw_transaction(self, raw_transaction: str) -> str:
+        with self._lock:
+            tx_hash = _hash(self.chain_id, raw_transaction)
+            self._mine(tx_hash, None, "0x" + tx_hash[2:42])
+            return tx_hash
+
+    def handle(self, method: str, params: List[Any]) -> Any:
+        """Returns the result for a JSON RPC call, raising KeyError for unsupported methods"""
+        if method == "eth_accounts":
+            return list(self.accounts)
+        elif method == "net_version":
+            return hex(self.chain_id)
+        elif method == "eth_chainId":
+            return hex(self.chain_id)
+        elif method == "eth_blockNumber":
+            return hex(self.block_number)
+        elif method == "eth_gasPrice":
+            return hex(DEFAULT_GAS_PRICE)
+        elif method == "eth_estimateGas":
+            return "0x5208"
+        elif method == "eth_getBalance":
+            return hex(1000 * 10**18)
+        elif method == "eth_getTransactionCount":
+            return hex(self.nonces.get(params[0].lower(), 0))
+        elif method == "eth_getCode":
+            return "0x"
+        elif method == "eth_call":
+            return "0x" + "00" * 32
+        elif method == "eth_sendTransaction":
+            return self.send_transaction(params[0])
+        elif method == "eth_sendRawTransaction":
+            return self.send_raw_transaction(params[0])
+        elif method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0].lower(), None)
+        elif method == "evm_mine":
+            with self._lock:
+                self.block_number += 1
+            return "0x0"
+        elif method == "evm_increaseTime":
+            return params[0] if params else 0
+        raise KeyError(method)
+
+
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_MockHTTPServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(200, b"{}")
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        mock = self.server.mock
+        if mock.latency > 0:
+            time.sleep(mock.latency)
+        response = {"jsonrpc": "2.0", "id": data.get("id", None)}
+        try:
+            response["result"] = mock.chain.handle(
+                data["method"], data.get("params", [])
+            )
+        except KeyError:
+            response["error"] = {
+                "code": -32601,
+                "message": f"Method {data.get('method', None)} not found",
+            }
+        mock.count_request()
+        self._respond(200, json.dumps(response).encode("utf-8"))
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 resets connections from load generators that open many at once
+    request_queue_size = 128
+    mock: "MockJSONRPCServer"
+
+
+class MockJSONRPCServer:
+    """An in-process JSON RPC server with configurable latency that can stand in for a real client"""
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        chain: Optional[MockChain] = None,
+    ):
+        """
+        :param port: the port on which to listen, or 0 to pick a free port
+        :param latency: the number of seconds to sleep before answering each request
+        """
+        self.latency: float = latency
+        if chain is None:
+            chain = MockChain()
+        self.chain: MockChain = chain
+        self._request_count: int = 0
+        self._request_count_lock = threading.Lock()
+        self._server = _MockHTTPServer((host, port), _MockRequestHandler)
+        self._server.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    def count_request(self):
+        # requests are handled on a thread each, and `+=` is not atomic
+        with self._request_count_lock:
+            self._request_count += 1
+
+    @property
+    def request_count(self) -> int:
+        """The number of JSON RPC requests this server has answered"""
+        with self._request_count_lock:
+            return self._request_count
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._server.server_address[0]}:{self.port}/"
+
+    def start(self) -> "MockJSONRPCServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=f"Mock@{self.port}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __str__(self):
+        return f"{self.__class__.__name__}<{self.url}>"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Runs a mock JSON RPC client that can stand in for Ganache, Geth, or Parity"
+    )
+    parser.add_argument("-p", "--port", type=int, default=8546)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="Milliseconds to wait before answering each request (default=0)",
+    )
+    parser.add_argument("-a", "--accounts", type=int, default=10)
+    args = parser.parse_args(argv)
+    server = MockJSONRPCServer(
+        port=args.port,
+        latency=args.latency / 1000.0,
+        chain=MockChain(num_accounts=args.accounts),
+    )
+    print(f"Mock JSON RPC client listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
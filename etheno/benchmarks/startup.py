@@ -0,0 +1,164 @@
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from ..utils import percentile
+
+DEFAULT_MODULE = "etheno.__main__"
+
+# The default maximum median time to import `DEFAULT_MODULE`, in milliseconds
+DEFAULT_TARGET_MS = 250.0
+
+# Modules that should only be imported once they are used (e.g., to sign or decode raw transactions, or to write a
+# keyfile), and never just by starting Etheno
+LAZY_MODULES = (
+    "Crypto",
+    "eth_account",
+    "eth_keys",
+    "eth_utils",
+    "pkg_resources",
+    "rlp",
+    "web3",
+)
+
+# Run in a fresh interpreter for each sample, so that every import is a cold start. Only the modules that importing
+# the module under test loads are reported, since the interpreter may import some of them itself (e.g., from a .pth
+# file).
+_CHILD = """
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "ms": elapsed * 1000.0,
+    "modules": sorted(name for name in sys.modules if name not in before),
+}}))
+"""
+
+
+def sample(module: str = DEFAULT_MODULE) -> Tuple[float, List[str]]:
+    """Imports `module` in a new interpreter, returning the milliseconds it took and the modules it imported"""
+    output = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(module=module)],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    result = json.loads(output.decode("utf-8").splitlines()[-1])
+    return result["ms"], result["modules"]
+
+
+def slowest_imports(
+    module: str = DEFAULT_MODULE, count: int = 10
+) -> List[Tuple[str, float]]:
+    """Returns the `count` top-level imports with the longest cumulative time in a `-X importtime` run, in ms"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        stderr=subprocess.PIPE,
+    ).stderr
+    times: Dict[str, float] = {}
+    for line in stderr.decode("utf-8").splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            # the header
+            continue
+        name = fields[2].strip()
+        times[name] = max(times.get(name, 0.0), cumulative / 1000.0)
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+def lazy_modules_imported(modules: List[str]) -> List[str]:
+    return sorted(
+        {name.split(".")[0] for name in modules if name.split(".")[0] in LAZY_MODULES}
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m etheno.benchmarks.startup",
+        description="Measures how long it takes to import Etheno in a new interpreter, which bounds how quickly it "
+        "can start",
+    )
+    parser.add_argument(
+        "--module",
+        type=str,
+        default=DEFAULT_MODULE,
+        help=f"Module to import (default={DEFAULT_MODULE})",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="Number of interpreters to start; the median import time is compared to the target (default=10)",
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        default=DEFAULT_TARGET_MS,
+        help=f"Maximum median import time in milliseconds (default={DEFAULT_TARGET_MS:g})",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=0,
+        help="Also list this many of the slowest imports, according to `python -X importtime`",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default=None,
+        help="Save the results to this file as JSON",
+    )
+    args = parser.parse_args(argv)
+
+    times: List[float] = []
+    modules: Optional[List[str]] = None
+    for _ in range(args.runs):
+        ms, modules = sample(args.module)
+        times.append(ms)
+    times.sort()
+    median = percentile(times, 50)
+    lazy = lazy_modules_imported(modules or [])
+
+    print(
+        f"import {args.module}: median {median:.1f}ms, min {times[0]:.1f}ms, max {times[-1]:.1f}ms over "
+        f"{len(times)} runs (target {args.target:g}ms)"
+    )
+    if args.top > 0:
+        for name, ms in slowest_imports(args.module, args.top):
+            print(f"{ms:10.1f}ms  {name}")
+    if lazy:
+        print(
+            f"Modules that should be imported lazily were imported: {', '.join(lazy)}"
+        )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "module": args.module,
+                    "target_ms": args.target,
+                    "median_ms": median,
+                    "times_ms": times,
+                    "lazy_modules_imported": lazy,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    if median > args.target or lazy:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .etheno import EthenoPlugin
+from .jsonrpc import json_default
+
+MAGIC = b"ETHENOCAP\x01"
+RECORD_HEADER = struct.Struct("<I")
+INDEX_VERSION = 1
+TRANSACTION_METHODS = frozenset(("eth_sendTransaction", "eth_sendRawTransaction"))
+TRANSACTION_HASH_METHODS = frozenset(
+    (
+        "eth_getTransactionReceipt",
+        "eth_getTransactionByHash",
+        "debug_traceTransaction",
+        "trace_transaction",
+    )
+)
+
+
+def index_path(path: str) -> str:
+    return f"{path}.idx"
+
+
+def _method(request: Dict[str, Any]) -> str:
+    # clients choose the method, which may not be a string (or even hashable), but the index is keyed by it
+    method = request.get("method", "")
+    return method if isinstance(method, str) else str(method)
+
+
+def transaction_hash(request: Dict[str, Any], results: List[Any]) -> Optional[str]:
+    """Returns the transaction hash that a captured request refers to, or None if it does not refer to one"""
+    method = _method(request)
+    if method in TRANSACTION_METHODS:
+        if results and isinstance(results[0], dict):
+            tx_hash = results[0].get("result", None)
+            if isinstance(tx_hash, str):
+                return tx_hash.lower()
+    elif method in TRANSACTION_HASH_METHODS:
+        params = request.get("params", None)
+        if params and isinstance(params[0], str):
+            return params[0].lower()
+    return None
+
+
+class CaptureIndex:
+    def __init__(self):
+        self.offsets: List[int] = []
+        self.methods: Dict[str, List[int]] = {}
+        self.tx_hashes: Dict[str, List[int]] = {}
+        self.data_size: int = len(MAGIC)
+
+    def add(self, offset: int, size: int, request: Dict[str, Any], results: List[Any]):
+        seq = len(self.offsets)
+        self.offsets.append(offset)
+        self.methods.setdefault(_method(request), []).append(seq)
+        tx_hash = transaction_hash(request, results)
+        if tx_hash is not None:
+            self.tx_hashes.setdefault(tx_hash, []).append(seq)
+        self.data_size = offset + RECORD_HEADER.size + size
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "version": INDEX_VERSION,
+                    "data_size": self.data_size,
+                    "offsets": self.offsets,
+                    "methods": self.methods,
+                    "tx_hashes": self.tx_hashes,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> "CaptureIndex":
+        with open(path, "r", encoding="utf8") as f:
+            data = json.load(f)
+        if data.get("version", None) != INDEX_VERSION:
+            raise ValueError(f"Unsupported capture index version in {path}")
+        index = CaptureIndex()
+        index.offsets = data["offsets"]
+        index.methods = data["methods"]
+        index.tx_hashes = data["tx_hashes"]
+        index.data_size = data["data_size"]
+        return index
+
+
+class CaptureWriter:
+    """Writes an indexed binary capture of JSON RPC calls.
+
+    A capture consists of a data file of length-prefixed records and a sidecar index (the data file's path plus
+    `.idx`). Each record is a four byte little-endian length followed by a UTF-8 JSON object with the keys `seq`,
+    `timestamp`, `request`, and `results`. The index maps sequence numbers to record offsets and lists the sequence
+    numbers for each JSON RPC method and transaction hash, so that a `CaptureReader` can jump straight to the records it
+    needs without parsing the whole capture. The index is written when the capture is finalized; if it is missing or
+    stale (e.g., because Etheno was killed), the reader rebuilds it from the data file.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self._output = open(path, "wb")
+        self._output.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._index = CaptureIndex()
+        self._lock = threading.Lock()
+        self._finalized = False
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._index.offsets)
+
+    def write(self, request: Dict[str, Any], results: List[Any]):
+        record = {
+            "seq": None,
+            "timestamp": time.time(),
+            "request": request,
+            "results": results,
+        }
+        with self._lock:
+            if self._finalized:
+                return
+            record["seq"] = len(self._index.offsets)
+            payload = json.dumps(record, default=json_default).encode("utf-8")
+            self._output.write(RECORD_HEADER.pack(len(payload)))
+            self._output.write(payload)
+            self._index.add(self._offset, len(payload), request, results)
+            self._offset += RECORD_HEADER.size + len(payload)
+
+    def flush(self):
+        with self._lock:
+            if not self._finalized:
+                self._output.flush()
+
+    def finalize(self):
+        with self._lock:
+            if self._finalized:
+                return
+            self._finalized = True
+            self._output.close()
+            self._index.save(index_path(self.path))
+        atexit.unregister(self.flush)
+
+
+class CaptureReader:
+    """Random access to a capture written by a `CaptureWriter`, backed by a memory map of its data file"""
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not an Etheno capture")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an Etheno capture")
+        self.index: CaptureIndex = self._load_index()
+
+    def _load_index(self) -> CaptureIndex:
+        try:
+            index = CaptureIndex.load(index_path(self.path))
+            if index.data_size == len(self._data):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        return self.rebuild_index()
+
+    def rebuild_index(self) -> CaptureIndex:
+        """Scans the data file to reconstruct its index, ignoring a truncated final record"""
+        index = CaptureIndex()
+        offset = len(MAGIC)
+        end = len(self._data)
+        while offset + RECORD_HEADER.size <= end:
+            (size,) = RECORD_HEADER.unpack_from(self._data, offset)
+            start = offset + RECORD_HEADER.size
+            if start + size > end:
+                break
+            try:
+                record = json.loads(self._data[start : start + size])
+            except ValueError:
+                break
+            index.add(offset, size, record["request"], record["results"])
+            offset = start + size
+        return index
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.index.offsets)
+
+    def __getitem__(self, seq: int) -> Dict[str, Any]:
+        offset = self.index.offsets[seq]
+        (size,) = RECORD_HEADER.unpack_from(self._data, offset)
+        start = offset + RECORD_HEADER.size
+        return json.loads(self._data[start : start + size])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for seq in range(len(self)):
+            yield self[seq]
+
+    @property
+    def methods(self) -> List[str]:
+        return list(self.index.methods)
+
+    def by_method(self, method: str) -> Iterator[Dict[str, Any]]:
+        for seq in self.index.methods.get(method, ()):
+            yield self[seq]
+
+    def by_tx_hash(self, tx_hash: str) -> Iterator[Dict[str, Any]]:
+        for seq in self.index.tx_hashes.get(tx_hash.lower(), ()):
+            yield self[seq]
+
+
+class CaptureExportPlugin(EthenoPlugin):
+    def __init__(self, path: str):
+        self._writer = CaptureWriter(path)
+
+    def after_post(self, post_data, client_results):
+        self._writer.write(post_data, client_results)
+
+    def finalize(self):
+        self._writer.finalize()
+        self.logger.info(
+            f"Indexed JSON RPC capture of {len(self._writer)} calls saved to {self._writer.path}"
+        )
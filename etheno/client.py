@@ -1,11 +1,17 @@
+import asyncio
 import http
 import inspect
 import json
 import time
+from time import perf_counter
 from typing import Any, Dict, List, Optional, Set, Union
+from urllib.parse import urlsplit
 from urllib.request import Request, urlopen
 
 from . import logger
+from . import tracing
+from .asynchttp import AsyncRpcHttpProxy, ConnectionClosed
+from .readiness import ReadinessMonitor
 from .utils import decode_hex, format_hex_address, webserver_is_up
 
 
@@ -37,12 +43,46 @@ def jsonrpc(**types):
     return decorator
 
 
+def _defining_class(cls: type, name: str) -> Optional[type]:
+    for base in cls.__mro__:
+        if name in base.__dict__:
+            return base
+    return None
+
+
+def async_method(obj, name: str, async_name: str):
+    """Returns `obj`'s coroutine method `async_name` if it is an equivalent of its method `name`, or None.
+
+    The coroutine is only considered equivalent if it was defined by the same class as `name` or a subclass of it,
+    and, if `name` was replaced on the instance (as `AddressSynchronizingClient` does to `post`), if `async_name`
+    was replaced along with it. Otherwise, calling it would skip the behavior of the more specific `name`.
+    """
+    function = getattr(obj, async_name, None)
+    if function is None:
+        return None
+    instance_attributes = getattr(obj, "__dict__", {})
+    if name in instance_attributes:
+        return function if async_name in instance_attributes else None
+    elif async_name in instance_attributes:
+        return function
+    sync_owner = _defining_class(type(obj), name)
+    async_owner = _defining_class(type(obj), async_name)
+    if (
+        sync_owner is not None
+        and async_owner is not None
+        and not issubclass(async_owner, sync_owner)
+    ):
+        return None
+    return function
+
+
 class RpcHttpProxy:
     def __init__(self, urlstring):
         self.urlstring = urlstring
         self.rpc_id = 0
+        self._async_proxy: Optional[AsyncRpcHttpProxy] = None
 
-    def post(self, data) -> Dict[str, Union[int, str, Dict[str, Any]]]:
+    def _prepare(self, data):
         data = dict(data)
         self.rpc_id += 1
         return_id = None
@@ -51,6 +91,10 @@ class RpcHttpProxy:
         if "id" in data:
             return_id = data["id"]
             data["id"] = self.rpc_id
+        return data, return_id
+
+    def post(self, data) -> Dict[str, Union[int, str, Dict[str, Any]]]:
+        data, return_id = self._prepare(data)
         request = Request(
             self.urlstring,
             data=bytearray(json.dumps(data), "utf8"),
@@ -61,6 +105,15 @@ class RpcHttpProxy:
             ret["id"] = return_id
         return ret
 
+    async def apost(self, data) -> Dict[str, Union[int, str, Dict[str, Any]]]:
+        if self._async_proxy is None:
+            self._async_proxy = AsyncRpcHttpProxy(self.urlstring)
+        data, return_id = self._prepare(data)
+        ret = await self._async_proxy.post(data)
+        if return_id is not None and "id" in ret:
+            ret["id"] = return_id
+        return ret
+
     def __str__(self):
         return f"{self.__class__.__name__}<{self.urlstring}>"
 
@@ -188,7 +241,53 @@ class SelfPostingClient(EthenoClient):
 
     # TODO: need to ensure that JSON RPC calls match latest API spec
     def post(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        ret = self.client.post(data)
+        metrics = None if self.etheno is None else self.etheno.metrics
+        with tracing.span("rpc", client=self, method=data.get("method", None)):
+            if metrics is None:
+                ret = self.client.post(data)
+            else:
+                start = perf_counter()
+                ret = None
+                try:
+                    ret = self.client.post(data)
+                finally:
+                    metrics.observe_client(
+                        self.short_name,
+                        str(data.get("method", "")),
+                        perf_counter() - start,
+                        error=ret is None or "error" in ret,
+                    )
+        return self._check_result(data, ret)
+
+    async def apost(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The coroutine equivalent of `post`, for clients whose underlying client has an `apost` coroutine"""
+        metrics = None if self.etheno is None else self.etheno.metrics
+        with tracing.span("rpc", client=self, method=data.get("method", None)):
+            start = perf_counter()
+            ret = None
+            try:
+                ret = await self.client.apost(data)
+            finally:
+                if metrics is not None:
+                    metrics.observe_client(
+                        self.short_name,
+                        str(data.get("method", "")),
+                        perf_counter() - start,
+                        error=ret is None or "error" in ret,
+                    )
+        return self._check_result(data, ret)
+
+    @property
+    def supports_async(self) -> bool:
+        """Whether `apost` can be used in place of `post`"""
+        return (
+            hasattr(self.client, "apost")
+            and async_method(self, "post", "apost") is not None
+        )
+
+    def _check_result(
+        self, data: Dict[str, Any], ret: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
         if ret is not None and "error" in ret:
             if "method" in data and (
                 data["method"] == "eth_sendTransaction"
@@ -254,21 +353,55 @@ class SelfPostingClient(EthenoClient):
             16,
         )
 
+    def transaction_mined(self, tx_hash) -> Optional[Dict[str, Any]]:
+        """Checks whether the given transaction has been mined, without waiting
+        :param tx_hash: the transaction hash for the transaction to check
+        :return: The transaction receipt, or None if the transaction has not been mined yet
+        """
+        request_object = self.etheno.get_transaction_receipt_request(tx_hash)
+        receipt = self.post(request_object)
+        if (
+            tx_hash in self._failed_transactions
+            or transaction_receipt_succeeded(receipt) is not None
+        ):
+            return receipt
+        return None
+
+    async def atransaction_mined(self, tx_hash) -> Optional[Dict[str, Any]]:
+        """The coroutine equivalent of `transaction_mined`, which can only be used if `supports_async` is True"""
+        request_object = self.etheno.get_transaction_receipt_request(tx_hash)
+        receipt = await self.apost(request_object)
+        if (
+            tx_hash in self._failed_transactions
+            or transaction_receipt_succeeded(receipt) is not None
+        ):
+            return receipt
+        return None
+
     def wait_for_transaction(self, tx_hash):
         """Blocks until the given transaction has been mined
         :param tx_hash: the transaction hash for the transaction to monitor
         :return: The transaction receipt
         """
-        while True:
-            request_object = self.etheno.get_transaction_receipt_request(tx_hash)
-            receipt = self.post(request_object)
-            if (
-                tx_hash in self._failed_transactions
-                or transaction_receipt_succeeded(receipt) is not None
-            ):
-                return receipt
-            self.logger.info("Waiting to mine transaction %s..." % tx_hash)
-            time.sleep(5.0)
+        with tracing.span("wait_for_transaction", client=self, tx_hash=tx_hash):
+            while True:
+                receipt = self.transaction_mined(tx_hash)
+                if receipt is not None:
+                    return receipt
+                self.logger.info("Waiting to mine transaction %s..." % tx_hash)
+                with tracing.span("sleep", seconds=5.0):
+                    time.sleep(5.0)
+
+    async def await_transaction(self, tx_hash):
+        """The coroutine equivalent of `wait_for_transaction`, which can only be used if `supports_async` is True"""
+        with tracing.span("wait_for_transaction", client=self, tx_hash=tx_hash):
+            while True:
+                receipt = await self.atransaction_mined(tx_hash)
+                if receipt is not None:
+                    return receipt
+                self.logger.info("Waiting to mine transaction %s..." % tx_hash)
+                with tracing.span("sleep", seconds=5.0):
+                    await asyncio.sleep(5.0)
 
     def __str__(self):
         return f"{self.__class__.__name__}[{self.client!s}]"
@@ -277,9 +410,16 @@ class SelfPostingClient(EthenoClient):
         return f"{self.__class__.__name__}[{self.client!r}]"
 
 
+# How long to wait for a client at a URL to start accepting connections before giving up, in seconds
+DEFAULT_STARTUP_TIMEOUT = 120.0
+
+
 class RpcProxyClient(SelfPostingClient):
-    def __init__(self, rpcurl):
+    def __init__(
+        self, rpcurl, startup_timeout: Optional[float] = DEFAULT_STARTUP_TIMEOUT
+    ):
         super().__init__(RpcHttpProxy(rpcurl))
+        self.startup_timeout: Optional[float] = startup_timeout
 
     def post(self, data):
         while True:
@@ -290,16 +430,32 @@ class RpcProxyClient(SelfPostingClient):
                 time.sleep(1.0)
                 self.logger.info(f"Retrying JSON RPC call to {self.client.urlstring}")
 
+    async def apost(self, data):
+        while True:
+            try:
+                return await super().apost(data)
+            except ConnectionClosed as e:
+                self.logger.warning(str(e))
+                await asyncio.sleep(1.0)
+                self.logger.info(f"Retrying JSON RPC call to {self.client.urlstring}")
+
     def is_running(self) -> bool:
         return webserver_is_up(self.client.urlstring)
 
     def wait_until_running(self):
-        slept = 0.0
-        while not self.is_running():
-            time.sleep(0.25)
-            slept += 0.25
-            if slept % 5 == 0:
-                self.logger.info("Waiting for the client to start...")
+        url = urlsplit(self.client.urlstring)
+        port = url.port
+        if port is None:
+            port = 443 if url.scheme == "https" else 80
+        # probing the port is much cheaper than the HTTP request that `is_running` makes
+        if not ReadinessMonitor(port, host=url.hostname or "127.0.0.1").wait(
+            timeout=self.startup_timeout,
+            on_waiting=lambda _: self.logger.info("Waiting for the client to start..."),
+        ):
+            raise TimeoutError(
+                f"{self.client.urlstring} did not start accepting connections within {self.startup_timeout:g} "
+                "seconds"
+            )
 
 
 def QUANTITY(to_convert: Optional[str]) -> Optional[int]:
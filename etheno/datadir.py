@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+# The Linux ioctl that makes `dst` a copy-on-write clone of `src` ("reflink"), on filesystems that support it (e.g.,
+# btrfs and XFS)
+FICLONE = 0x40049409
+
+
+class DatadirCache:
+    """A directory of initialized client datadirs, keyed by the client, its genesis, and its accounts.
+
+    The first run of a client with a given genesis and set of accounts stores its datadir in the cache once the client
+    has initialized it (e.g., with `geth init`) and imported its accounts, but before it is started; later runs copy it
+    instead of repeating that work. Files are cloned with a reflink where the filesystem supports it and copied
+    otherwise, except for files under any of the `immutable` directories passed to `restore`, which clients never
+    modify, and so are hardlinked.
+    """
+
+    def __init__(self, directory: str):
+        self.directory: str = os.path.realpath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self._reflink: bool = fcntl is not None
+
+    @staticmethod
+    def key(
+        client: str,
+        genesis: Dict[str, Any],
+        private_keys: Iterable[int],
+        executable: Optional[str] = None,
+    ) -> str:
+        """Returns the cache key for a datadir.
+
+        If provided, `executable` is the client's executable, whose path and modification time are included in the key
+        so that the template is recreated when the client is upgraded.
+        """
+        fingerprint = {
+            "client": client,
+            "genesis": genesis,
+            "accounts": sorted(map(hex, private_keys)),
+        }
+        if executable is not None:
+            path = shutil.which(executable)
+            if path is not None:
+                path = os.path.realpath(path)
+                fingerprint["executable"] = [path, os.stat(path).st_mtime_ns]
+        encoded = json.dumps(fingerprint, sort_keys=True).encode("utf-8")
+        return f"{client.lower()}-{hashlib.sha256(encoded).hexdigest()}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isdir(self.path(key))
+
+    def _clone(self, src: str, dst: str) -> bool:
+        if not self._reflink:
+            return False
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            # this filesystem does not support reflinks, so do not try again
+            self._reflink = False
+            os.unlink(dst)
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    def _copy_tree(self, src: str, dst: str, immutable: Sequence[str] = ()):
+        for dirpath, _, filenames in os.walk(src):
+            relative = os.path.relpath(dirpath, src)
+            link = relative != "." and relative.split(os.sep)[0] in immutable
+            os.makedirs(os.path.join(dst, relative), exist_ok=True)
+            for filename in filenames:
+                source = os.path.join(dirpath, filename)
+                destination = os.path.join(dst, relative, filename)
+                if link:
+                    try:
+                        os.link(source, destination)
+                        continue
+                    except OSError:
+                        # e.g., the cache is on a different filesystem
+                        pass
+                if not self._clone(source, destination):
+                    shutil.copy2(source, destination)
+
+    def restore(self, key: str, datadir: str, immutable: Sequence[str] = ()) -> bool:
+        """Copies the template datadir for `key` into `datadir`, returning False if it is not cached"""
+        if key not in self:
+            return False
+        self._copy_tree(self.path(key), datadir, immutable)
+        return True
+
+    def store(self, key: str, datadir: str, immutable: Sequence[str] = ()):
+        """Saves a copy of `datadir` as the template for `key`"""
+        if key in self:
+            return
+        # copy to a temporary directory first, so that a concurrent run never sees a partial template
+        tmpdir = os.path.join(self.directory, f".{key}-{uuid.uuid4().hex}")
+        try:
+            self._copy_tree(datadir, tmpdir, immutable)
+            os.rename(tmpdir, self.path(key))
+        except OSError:
+            if key not in self:
+                raise
+            # another run stored the same template first
+        finally:
+            if os.path.exists(tmpdir):
+                shutil.rmtree(tmpdir)
@@ -1,5 +1,6 @@
 from enum import Enum
 import os
+import time
 
 from .client import JSONRPCError, SelfPostingClient
 from .etheno import EthenoPlugin
@@ -220,7 +221,12 @@ while mining this transaction:
                 if "result" in receipt and receipt["result"]:
                     break
                 # The transaction is still pending
-                time.sleep(3.0)
+                tracker = self.etheno.receipt_tracker
+                if tracker is not None and tracker.pending(tx_hash):
+                    # some clients have not mined it yet, and the tracker is already polling them
+                    tracker.wait(tx_hash, timeout=3.0)
+                else:
+                    time.sleep(3.0)
 
     def shutdown(self):
         # super().shutdown() should automatically call self.finalize()
@@ -0,0 +1,131 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from . import logger
+
+DEFAULT_MAX_QUEUED = 10000
+
+# queued in place of a call to make a plugin's worker thread exit
+_STOP = object()
+
+
+class AfterPostDispatcher:
+    """Calls plugins' `after_post` hooks on background threads, so that they do not delay the response to a request.
+
+    Each plugin has its own queue and worker thread: a plugin's hooks are called one at a time, in the order in which
+    they were submitted, and a slow plugin does not hold up the others. A plugin's queue holds at most `max_queued`
+    calls, after which submitting another blocks until the plugin catches up, so that observations are never dropped.
+
+    While `synchronous()` is active, submitting a call also waits for the plugin's worker to make it, so that the hook
+    has been called when `submit` returns without overtaking calls that are still queued. After `stop()`, calls are
+    made immediately on the submitting thread instead.
+    """
+
+    def __init__(
+        self,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        log: Optional[logger.EthenoLogger] = None,
+    ):
+        self.max_queued: int = max_queued
+        self.logger: Optional[logger.EthenoLogger] = log
+        self._queues: Dict[object, queue.Queue] = {}
+        self._threads: Dict[object, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._synchronous: int = 0
+        self._stopped: bool = False
+
+    def _queue_for(self, plugin) -> queue.Queue:
+        q = self._queues.get(plugin, None)
+        if q is not None:
+            return q
+        with self._lock:
+            q = self._queues.get(plugin, None)
+            if q is None:
+                q = queue.Queue(maxsize=self.max_queued)
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(plugin, q),
+                    name=f"EthenoAfterPost({plugin.__class__.__name__})",
+                    daemon=True,
+                )
+                self._threads[plugin] = thread
+                self._queues[plugin] = q
+                thread.start()
+            return q
+
+    def _call(self, plugin, call: Callable[[], None]):
+        try:
+            call()
+        except Exception:
+            log = getattr(plugin, "logger", None) or self.logger
+            if log is not None:
+                log.exception(f"Error in the after_post hook of {plugin!r}")
+
+    def _run(self, plugin, q: queue.Queue):
+        while True:
+            call = q.get()
+            try:
+                if call is _STOP:
+                    return
+                self._call(plugin, call)
+            finally:
+                q.task_done()
+
+    def submit(self, plugin, call: Callable[[], None]):
+        """Calls `call`, which should call `plugin`'s `after_post` hook, on the plugin's worker thread"""
+        if self._stopped:
+            self._call(plugin, call)
+        elif self._synchronous:
+            if threading.current_thread() is self._threads.get(plugin, None):
+                # a hook that posts a request itself; waiting for its own worker would deadlock, and calls made from
+                # the worker are already in order
+                self._call(plugin, call)
+            else:
+                q = self._queue_for(plugin)
+                q.put(call)
+                q.join()
+        else:
+            self._queue_for(plugin).put(call)
+
+    def drain(self, plugin=None):
+        """Blocks until all calls submitted so far (for `plugin`, or for all plugins if it is None) have been made"""
+        with self._lock:
+            if plugin is None:
+                queues = list(self._queues.values())
+            elif plugin in self._queues:
+                queues = [self._queues[plugin]]
+            else:
+                queues = []
+        for q in queues:
+            q.join()
+
+    @contextmanager
+    def synchronous(self):
+        """Drains the queues and then waits for each call submitted to be made until the context exits.
+
+        This is used around finalizing plugins, which may post requests themselves and expect their hooks to have
+        been called by the time the post returns.
+        """
+        with self._lock:
+            self._synchronous += 1
+        try:
+            self.drain()
+            yield
+        finally:
+            with self._lock:
+                self._synchronous -= 1
+
+    def stop(self):
+        """Drains the queues and stops the worker threads; calls submitted afterward are made immediately"""
+        with self._lock:
+            self._stopped = True
+            threads = list(self._threads.items())
+            self._threads = {}
+        for plugin, thread in threads:
+            self._queues[plugin].put(_STOP)
+        for _, thread in threads:
+            thread.join()
+        with self._lock:
+            self._queues = {}
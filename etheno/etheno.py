@@ -1,48 +1,167 @@
-import pkg_resources
+import asyncio
+import functools
+import itertools
 import os
-from threading import Thread
-from typing import Any, Dict, List, Optional
+import time
+from contextvars import ContextVar, copy_context
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from werkzeug.serving import make_server
 
-from flask import Flask, jsonify, request, abort
+from flask import Flask, Response, jsonify, request, abort
 from flask.views import MethodView
 
 from . import logger
+from .admission import AdmissionController, Overloaded
 from . import threadwrapper
-from .client import EthenoClient, JSONRPCError, SelfPostingClient
+from . import tracing
+from .client import EthenoClient, JSONRPCError, SelfPostingClient, async_method
+from .dispatcher import AfterPostDispatcher
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from .profiler import SamplingProfiler
+from .receipts import ReceiptTracker
 from .utils import format_hex_address
 
-VERSION: str = pkg_resources.require("etheno")[0].version
+try:
+    from importlib.metadata import version as _package_version
+except ImportError:
+    # Python 3.7; pkg_resources scans every installed distribution, so it is only used when it has to be
+    import pkg_resources
+
+    def _package_version(name: str) -> str:
+        return pkg_resources.require(name)[0].version
+
+
+VERSION: str = _package_version("etheno")
 VERSION_NAME = f"ToB/v{VERSION}/source/Etheno"
 JSONRPC_VERSION = "2.0"
 VERSION_ID = 67
 
-app = Flask(__name__)
-
 GETH_DEFAULT_RPC_PORT = 8545
 ETH_DEFAULT_RPC_PORT = 8545
 PARITY_DEFAULT_RPC_PORT = 8545
 PYETHAPP_DEFAULT_RPC_PORT = 4000
 
+# Runs calls that have to be made on the main thread (e.g., Manticore's); created when this module is imported, which
+# must be on the main thread, and run by `Etheno.run`
+_CONTROLLER = threadwrapper.MainThreadController()
+
 
 def to_account_address(raw_address: int) -> str:
     addr = "%x" % raw_address
     return "0x%s%s" % ("0" * (40 - len(addr)), addr)
 
 
-_CONTROLLER = threadwrapper.MainThreadController()
+# numbers the namespaces of Etheno instances created after the first
+_INSTANCE_IDS = itertools.count(2)
+
+
+async def _run_blocking(function, *args, **kwargs):
+    """Runs a blocking call in the event loop's default executor, in the current context"""
+    context = copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(context.run, function, *args, **kwargs)
+    )
+
+
+def _async_client_method(client, name: str, async_name: str):
+    if isinstance(client, SelfPostingClient) and client.supports_async:
+        return async_method(client, name, async_name)
+    return None
+
+
+async def _apost(client, data):
+    apost = _async_client_method(client, "post", "apost")
+    if apost is None:
+        return await _run_blocking(client.post, data)
+    return await apost(data)
+
+
+async def _transaction_mined(client, tx_hash):
+    transaction_mined = _async_client_method(
+        client, "transaction_mined", "atransaction_mined"
+    )
+    if transaction_mined is None:
+        return await _run_blocking(client.transaction_mined, tx_hash)
+    return await transaction_mined(tx_hash)
+
+
+async def _await_transaction(client, tx_hash):
+    await_transaction = _async_client_method(
+        client, "wait_for_transaction", "await_transaction"
+    )
+    if await_transaction is None:
+        return await _run_blocking(client.wait_for_transaction, tx_hash)
+    return await await_transaction(tx_hash)
 
 
 class DropPost(RuntimeError):
     pass
 
 
+# Client functions with names in these JSON RPC namespaces (e.g., `eth_sendTransaction`) implement the method
+JSONRPC_NAMESPACES = frozenset(
+    (
+        "admin",
+        "db",
+        "debug",
+        "eth",
+        "evm",
+        "ganache",
+        "miner",
+        "net",
+        "parity",
+        "personal",
+        "shh",
+        "trace",
+        "txpool",
+        "web3",
+    )
+)
+
+
+class ClientHandlers:
+    """How Etheno handles each JSON RPC method for a client, which is resolved once when the client is added.
+
+    A client can implement a JSON RPC method in one of the `JSONRPC_NAMESPACES` with a function of the same name,
+    which Etheno calls with the request's parameters (and the master client's result as `rpc_client_result`). Any
+    other method is posted to the client if it is a `SelfPostingClient` (`FORWARD`), and otherwise ignored (`IGNORE`).
+    """
+
+    FORWARD = object()
+    IGNORE = object()
+
+    def __init__(self, client: EthenoClient):
+        self.functions: Dict[str, Any] = {}
+        for name in dir(client):
+            if name.partition("_")[0] not in JSONRPC_NAMESPACES:
+                continue
+            function = getattr(client, name, None)
+            if function is None or callable(function):
+                self.functions[name] = function
+        self.default = (
+            ClientHandlers.FORWARD
+            if isinstance(client, SelfPostingClient)
+            else ClientHandlers.IGNORE
+        )
+
+    def resolve(self, method: str):
+        """Returns the client's function for `method` (or None if it was set to None), `FORWARD`, or `IGNORE`"""
+        if not self.functions:
+            # the common case: the client does not implement any methods itself
+            return self.default
+        return self.functions.get(method, self.default)
+
+
 OptionalLogger = Optional[logger.EthenoLogger]
 
 
 class EthenoPlugin:
     _etheno: Optional["Etheno"] = None
     logger: OptionalLogger = None
+    # The JSON RPC methods for which `before_post` and `after_post` are called, or None to call them for all methods
+    methods: Optional[FrozenSet[str]] = None
 
     @property
     def etheno(self) -> "Etheno":
@@ -114,8 +233,49 @@ class EthenoPlugin:
         self.finalize()
 
 
+def _implements_hook(plugin: EthenoPlugin, hook: str) -> bool:
+    """Returns whether `plugin` implements `hook` rather than inheriting the default, which does nothing"""
+    return hook in getattr(plugin, "__dict__", {}) or getattr(
+        type(plugin), hook
+    ) is not getattr(EthenoPlugin, hook)
+
+
+# The maximum number of methods for which the plugins to call are cached, in case clients send arbitrary method names
+MAX_PLUGIN_DISPATCH_METHODS = 1024
+
+
 class Etheno:
-    def __init__(self, master_client: Optional[SelfPostingClient] = None):
+    """A JSON RPC multiplexer, with its own clients, plugins, Flask app, server, and logger.
+
+    Any number of instances can run in one process, each on its own port. Each instance's loggers are registered in
+    their own `namespace` so that their clients and plugins may share names with other instances'; if `namespace` is
+    None, the first instance uses the default namespace and later ones get a unique namespace of their own.
+    """
+
+    def __init__(
+        self,
+        master_client: Optional[SelfPostingClient] = None,
+        namespace: Optional[str] = None,
+        app: Optional[Flask] = None,
+    ):
+        if namespace is None and "Etheno" in logger.ETHENO_LOGGERS:
+            namespace = f"etheno{next(_INSTANCE_IDS)}"
+        self.namespace: Optional[str] = namespace
+        self.logger: logger.EthenoLogger = logger.EthenoLogger(
+            "Etheno",
+            logger.INFO,
+            namespace=namespace,
+            displayname="Etheno" if namespace is None else f"Etheno:{namespace}",
+        )
+        if app is None:
+            app = Flask(__name__)
+        self.app: Flask = app
+        self._views_registered: bool = False
+        self.controller: threadwrapper.MainThreadController = _CONTROLLER
+        # whether this instance is running the controller in the main thread with `run`
+        self._running_controller: bool = False
+        self._server = None
+        self._server_thread: Optional[Thread] = None
         self.accounts = []
         self._master_client: Optional[SelfPostingClient] = None
         if master_client is None:
@@ -123,10 +283,46 @@ class Etheno:
         else:
             self.master_client = master_client
         self.clients: List[EthenoClient] = []
-        self.rpc_client_result = None
+        self._client_handlers: Dict[EthenoClient, ClientHandlers] = {}
+        # the master client's result for the request being handled, which is tracked per request thread (or per
+        # request task in the asyncio server):
+        self._rpc_client_result: ContextVar = ContextVar(
+            "rpc_client_result", default=None
+        )
         self.plugins: List[EthenoPlugin] = []
+        # maps JSON RPC methods to the plugins whose before_post and after_post hooks are called for them; this is
+        # cleared whenever a plugin is added or removed
+        self._plugin_dispatch: Dict[
+            str, Tuple[Tuple[EthenoPlugin, ...], Tuple[EthenoPlugin, ...]]
+        ] = {}
+        # request, error, and latency metrics served on /metrics; set to None to disable them
+        self.metrics: Optional[Metrics] = Metrics()
+        # records a trace of each request handled by EthenoView if set
+        self.tracer: Optional[tracing.Tracer] = None
+        # samples the stacks of all threads if set; its output is written on shutdown
+        self.profiler: Optional[SamplingProfiler] = None
+        self.profile_path: Optional[str] = None
+        # held while /profile samples on demand, so that only one such profile runs at a time
+        self.on_demand_profile_lock = Lock()
+        # if set, eth_getTransactionReceipt returns immediately rather than blocking until all clients have mined the
+        # transaction, and this tracks the clients that have not
+        self.receipt_tracker: Optional[ReceiptTracker] = None
+        # if set, plugins' after_post hooks are called on background threads rather than before responding
+        self.after_post_dispatcher: Optional[AfterPostDispatcher] = None
+        # limits the number of requests handled at once if set
+        self.admission: Optional[AdmissionController] = None
+        # set by a SlowRequestJournal plugin when it is added
+        self.slow_requests = None
         self._shutting_down: bool = False
-        self.logger: logger.EthenoLogger = logger.EthenoLogger("Etheno", logger.INFO)
+
+    @property
+    def rpc_client_result(self):
+        """The master client's result for the JSON RPC request that the current thread is handling"""
+        return self._rpc_client_result.get()
+
+    @rpc_client_result.setter
+    def rpc_client_result(self, result):
+        self._rpc_client_result.set(result)
 
     @property
     def log_level(self) -> int:
@@ -181,11 +377,83 @@ class Etheno:
         return None
 
     def post(self, data):
+        metrics = self.metrics
+        slow_requests = self.slow_requests
+        if metrics is None and slow_requests is None:
+            return self._post(data)
+        timings = None if slow_requests is None else []
+        start = perf_counter()
+        failed = True
+        try:
+            ret = self._post(data, timings)
+            failed = isinstance(ret, JSONRPCError)
+            return ret
+        finally:
+            self._observe_request(data, perf_counter() - start, failed, timings)
+
+    async def apost(self, data):
+        """The coroutine equivalent of `post`, used by the asyncio server.
+
+        Clients that support it (see `SelfPostingClient.supports_async`) are posted to without blocking; all other
+        client calls, and plugin hooks, are run in the event loop's default executor.
+        """
+        metrics = self.metrics
+        slow_requests = self.slow_requests
+        if metrics is None and slow_requests is None:
+            return await self._apost(data)
+        timings = None if slow_requests is None else []
+        start = perf_counter()
+        failed = True
+        try:
+            ret = await self._apost(data, timings)
+            failed = isinstance(ret, JSONRPCError)
+            return ret
+        finally:
+            self._observe_request(data, perf_counter() - start, failed, timings)
+
+    def _observe_request(self, data, seconds: float, failed: bool, timings):
+        if self.metrics is not None:
+            self.metrics.observe_request(
+                str(data.get("method", "")), seconds, error=failed
+            )
+        if self.slow_requests is not None:
+            self.slow_requests.observe(data, seconds, timings)
+
+    def _plugins_for(
+        self, method
+    ) -> Tuple[Tuple[EthenoPlugin, ...], Tuple[EthenoPlugin, ...]]:
+        """Returns the plugins whose `before_post` and `after_post` hooks should be called for `method`"""
+        dispatch = self._plugin_dispatch.get(method, None)
+        if dispatch is None:
+            interested = [
+                plugin
+                for plugin in self.plugins
+                if plugin.methods is None or method in plugin.methods
+            ]
+            dispatch = (
+                tuple(p for p in interested if _implements_hook(p, "before_post")),
+                tuple(p for p in interested if _implements_hook(p, "after_post")),
+            )
+            if len(self._plugin_dispatch) < MAX_PLUGIN_DISPATCH_METHODS:
+                self._plugin_dispatch[method] = dispatch
+        return dispatch
+
+    def _before_post(self, data):
         self.logger.debug(f"Handling JSON RPC request {data}")
+        metrics = self.metrics
 
-        for plugin in self.plugins:
+        for plugin in self._plugins_for(data.get("method", None))[0]:
             try:
-                new_data = plugin.before_post(dict(data))
+                if metrics is not None:
+                    start = perf_counter()
+                with tracing.span("before_post", plugin=plugin.__class__.__name__):
+                    new_data = plugin.before_post(dict(data))
+                if metrics is not None:
+                    metrics.observe_plugin(
+                        plugin.__class__.__name__,
+                        "before_post",
+                        perf_counter() - start,
+                    )
                 if new_data is not None and new_data != data:
                     self.logger.debug(
                         f"Incoming JSON RPC request {data} changed by plugin {plugin!r} to {new_data}"
@@ -196,7 +464,11 @@ class Etheno:
                     f"Incoming JSON RPC request {data} dropped by plugin {plugin!r}"
                 )
 
-        method = data["method"]
+        return data
+
+    @staticmethod
+    def _split_params(data):
+        """Returns the positional and keyword arguments of a JSON RPC request for client functions"""
         args = ()
         kwargs = {}
         if "params" in data:
@@ -209,21 +481,182 @@ class Etheno:
                     del kwargs["from"]
             else:
                 args = data["params"]
+        return args, kwargs
+
+    def _after_post(self, data, results):
+        plugins = self._plugins_for(data.get("method", None))[1]
+        dispatcher = self.after_post_dispatcher
+        if dispatcher is None:
+            for plugin in plugins:
+                self._call_after_post(plugin, data, results)
+            return
+        if not plugins:
+            return
+        # run the hooks in this request's context, so that they see its rpc_client_result and trace
+        context = copy_context()
+        for plugin in plugins:
+            dispatcher.submit(
+                plugin,
+                functools.partial(
+                    context.run, self._call_after_post, plugin, data, results
+                ),
+            )
+
+    def _call_after_post(self, plugin: EthenoPlugin, data, results):
+        metrics = self.metrics
+        with tracing.span("after_post", plugin=plugin.__class__.__name__):
+            if metrics is None:
+                plugin.after_post(data, results)
+            else:
+                start = perf_counter()
+                plugin.after_post(data, results)
+                metrics.observe_plugin(
+                    plugin.__class__.__name__, "after_post", perf_counter() - start
+                )
+
+    @staticmethod
+    def _mined_by_master(ret) -> bool:
+        return (
+            ret is not None
+            and not isinstance(ret, JSONRPCError)
+            and bool(ret.get("result", None))
+        )
+
+    def _poll_receipt(self, client, tx_hash, ret):
+        """Returns `client`'s receipt for a transaction the master client has mined, or None if it has not mined it yet"""
+        if not self._mined_by_master(ret):
+            return None
+        tracked, receipt = self.receipt_tracker.get(tx_hash, client)
+        if not tracked:
+            receipt = client.transaction_mined(tx_hash)
+            self.receipt_tracker.track(tx_hash, client, ret, receipt)
+        return receipt
+
+    async def _apoll_receipt(self, client, tx_hash, ret):
+        if not self._mined_by_master(ret):
+            return None
+        tracked, receipt = self.receipt_tracker.get(tx_hash, client)
+        if not tracked:
+            receipt = await _transaction_mined(client, tx_hash)
+            self.receipt_tracker.track(tx_hash, client, ret, receipt)
+        return receipt
+
+    def _settle_receipt(self, data, ret):
+        """With a receipt tracker, returns a null receipt until all clients have mined the transaction"""
+        if not self._mined_by_master(ret):
+            return ret
+        tx_hash = data["params"][0]
+        if self.receipt_tracker.pending(tx_hash):
+            return dict(ret, result=None)
+        self.receipt_tracker.forget(tx_hash)
+        return ret
+
+    def _post_to_master(self, data, method):
+        if method == "eth_getTransactionReceipt" and self.receipt_tracker is None:
+            # for eth_getTransactionReceipt, make sure we block until all clients have mined the transaction
+            ret = self.master_client.wait_for_transaction(data["params"][0])
+            if "id" in data and "id" in ret:
+                ret["id"] = data["id"]
+            return ret
+        try:
+            return self.master_client.post(data)
+        except JSONRPCError as e:
+            self.logger.error(e)
+            return e
+
+    async def _apost_to_master(self, data, method):
+        if method == "eth_getTransactionReceipt" and self.receipt_tracker is None:
+            ret = await _await_transaction(self.master_client, data["params"][0])
+            if "id" in data and "id" in ret:
+                ret["id"] = data["id"]
+            return ret
+        try:
+            return await _apost(self.master_client, data)
+        except JSONRPCError as e:
+            self.logger.error(e)
+            return e
+
+    def _client_handler(self, client, method):
+        handlers = self._client_handlers.get(client, None)
+        if handlers is None:
+            # the client was added to `clients` directly rather than with `add_client`
+            handlers = ClientHandlers(client)
+            self._client_handlers[client] = handlers
+        return handlers.resolve(method)
+
+    def _post_to_client(self, client, handler, data, method, arguments, ret):
+        try:
+            if handler is ClientHandlers.FORWARD:
+                if method == "eth_getTransactionReceipt":
+                    if self.receipt_tracker is not None:
+                        return self._poll_receipt(client, data["params"][0], ret)
+                    # for eth_getTransactionReceipt, make sure we block until all clients have mined the transaction
+                    return client.wait_for_transaction(data["params"][0])
+                else:
+                    return client.post(data)
+            elif handler is ClientHandlers.IGNORE:
+                return None
+            self.logger.info("Enrobing JSON RPC call to %s.%s" % (client, method))
+            if handler is None:
+                self.logger.warn(f"Function {method} of {client} is None!")
+                return None
+            args, kwargs = arguments
+            return handler(*args, **dict(kwargs, rpc_client_result=ret))
+        except JSONRPCError as e:
+            self.logger.error(e)
+            return e
+
+    async def _apost_to_client(self, client, handler, data, method, arguments, ret):
+        try:
+            if handler is ClientHandlers.FORWARD:
+                if method == "eth_getTransactionReceipt":
+                    if self.receipt_tracker is not None:
+                        return await self._apoll_receipt(client, data["params"][0], ret)
+                    return await _await_transaction(client, data["params"][0])
+                else:
+                    return await _apost(client, data)
+            elif handler is ClientHandlers.IGNORE:
+                return None
+            self.logger.info("Enrobing JSON RPC call to %s.%s" % (client, method))
+            if handler is None:
+                self.logger.warn(f"Function {method} of {client} is None!")
+                return None
+            args, kwargs = arguments
+            return await _run_blocking(
+                handler, *args, **dict(kwargs, rpc_client_result=ret)
+            )
+        except JSONRPCError as e:
+            self.logger.error(e)
+            return e
+
+    def _resolve_clients(self, data, method):
+        """Returns each client's handler for a request, and the arguments for the clients that implement the method
+        with a function (which are only converted from the request's parameters if there are any)"""
+        handlers = [self._client_handler(client, method) for client in self.clients]
+        arguments = None
+        for handler in handlers:
+            if (
+                handler is not ClientHandlers.FORWARD
+                and handler is not ClientHandlers.IGNORE
+            ):
+                arguments = self._split_params(data)
+                break
+        return handlers, arguments
+
+    def _post(self, data, timings: Optional[list] = None):
+        """Handles a JSON RPC request; if `timings` is not None, (client, seconds, result) is appended to it for
+        the master client and each other client"""
+        data = self._before_post(data)
+        method = data["method"]
 
         if self.master_client is None:
             ret = None
         else:
-            if method == "eth_getTransactionReceipt":
-                # for eth_getTransactionReceipt, make sure we block until all clients have mined the transaction
-                ret = self.master_client.wait_for_transaction(data["params"][0])
-                if "id" in data and "id" in ret:
-                    ret["id"] = data["id"]
-            else:
-                try:
-                    ret = self.master_client.post(data)
-                except JSONRPCError as e:
-                    self.logger.error(e)
-                    ret = e
+            client_start = perf_counter()
+            with tracing.span("master", client=self.master_client, method=method):
+                ret = self._post_to_master(data, method)
+            if timings is not None:
+                timings.append((self.master_client, perf_counter() - client_start, ret))
 
         self.rpc_client_result = ret
         self.logger.debug(
@@ -231,45 +664,93 @@ class Etheno:
         )
 
         results = []
+        handlers, arguments = self._resolve_clients(data, method)
 
-        for client in self.clients:
-            try:
-                if hasattr(client, method):
-                    self.logger.info(
-                        "Enrobing JSON RPC call to %s.%s" % (client, method)
-                    )
-                    function = getattr(client, method)
-                    if function is not None:
-                        kwargs["rpc_client_result"] = ret
-                        results.append(function(*args, **kwargs))
-                    else:
-                        self.logger.warn(f"Function {method} of {client} is None!")
-                        results.append(None)
-                elif isinstance(client, SelfPostingClient):
-                    if method == "eth_getTransactionReceipt":
-                        # for eth_getTransactionReceipt, make sure we block until all clients have mined the transaction
-                        results.append(client.wait_for_transaction(data["params"][0]))
-                    else:
-                        results.append(client.post(data))
-                else:
-                    results.append(None)
-            except JSONRPCError as e:
-                self.logger.error(e)
-                results.append(e)
+        for client, handler in zip(self.clients, handlers):
+            client_start = perf_counter()
+            with tracing.span("client", client=client, method=method):
+                results.append(
+                    self._post_to_client(client, handler, data, method, arguments, ret)
+                )
+            if timings is not None:
+                timings.append((client, perf_counter() - client_start, results[-1]))
             self.logger.debug(f"Result from client {client}: {results[-1]}")
 
         if ret is None:
             return None
 
-        results = [ret] + results
-        for plugin in self.plugins:
-            plugin.after_post(data, results)
+        if method == "eth_getTransactionReceipt" and self.receipt_tracker is not None:
+            ret = self._settle_receipt(data, ret)
+
+        self._after_post(data, [ret] + results)
+
+        return ret
+
+    async def _apost(self, data, timings: Optional[list] = None):
+        # plugin hooks may block (e.g., to write exports or to post requests themselves), so they are run in the
+        # executor rather than stalling every other connection on the event loop
+        if self._plugins_for(data.get("method", None))[0]:
+            data = await _run_blocking(self._before_post, data)
+        else:
+            data = self._before_post(data)
+        method = data["method"]
+
+        if self.master_client is None:
+            ret = None
+        else:
+            client_start = perf_counter()
+            with tracing.span("master", client=self.master_client, method=method):
+                ret = await self._apost_to_master(data, method)
+            if timings is not None:
+                timings.append((self.master_client, perf_counter() - client_start, ret))
+
+        self.rpc_client_result = ret
+        self.logger.debug(
+            f"Result from the master client ({self.master_client}): {ret}"
+        )
+
+        handlers, arguments = self._resolve_clients(data, method)
+
+        async def post_to_client(client, handler):
+            client_start = perf_counter()
+            with tracing.span("client", client=client, method=method):
+                result = await self._apost_to_client(
+                    client, handler, data, method, arguments, ret
+                )
+            self.logger.debug(f"Result from client {client}: {result}")
+            return result, perf_counter() - client_start
+
+        # unlike `_post`, the other clients are all posted to at once, so a request takes as long as the slowest client
+        # rather than the sum of all of them
+        outcomes = await asyncio.gather(
+            *(
+                post_to_client(client, handler)
+                for client, handler in zip(self.clients, handlers)
+            )
+        )
+        results = [result for result, _ in outcomes]
+        if timings is not None:
+            timings.extend(
+                (client, seconds, result)
+                for client, (result, seconds) in zip(self.clients, outcomes)
+            )
+
+        if ret is None:
+            return None
+
+        if method == "eth_getTransactionReceipt" and self.receipt_tracker is not None:
+            ret = self._settle_receipt(data, ret)
+
+        if self._plugins_for(method)[1]:
+            # this also keeps a full AfterPostDispatcher queue from blocking the event loop
+            await _run_blocking(self._after_post, data, [ret] + results)
 
         return ret
 
     def add_plugin(self, plugin: EthenoPlugin):
         plugin.etheno = self
         self.plugins.append(plugin)
+        self._plugin_dispatch = {}
         plugin.added()
 
     def remove_plugin(self, plugin: EthenoPlugin):
@@ -278,9 +759,22 @@ class Etheno:
         :param plugin: The plugin to remove
         """
         self.plugins.remove(plugin)
+        self._plugin_dispatch = {}
+        if self.after_post_dispatcher is not None:
+            self.after_post_dispatcher.drain(plugin)
         plugin.shutdown()
         plugin.etheno = None
 
+    def finalize_plugins(self):
+        """Calls `finalize()` on each plugin once it has handled all of the requests so far"""
+        if self.after_post_dispatcher is None:
+            for plugin in self.plugins:
+                plugin.finalize()
+            return
+        with self.after_post_dispatcher.synchronous():
+            for plugin in self.plugins:
+                plugin.finalize()
+
     def _create_accounts(self, client):
         for account in self.accounts:
             # TODO: Actually get the correct balance from the JSON RPC client instead of using hard-coded 100.0 ETH
@@ -288,6 +782,7 @@ class Etheno:
 
     def add_client(self, client: EthenoClient):
         client.etheno = self
+        self._client_handlers[client] = ClientHandlers(client)
         self.clients.append(client)
         self._create_accounts(client)
 
@@ -342,6 +837,9 @@ class Etheno:
         if self._shutting_down:
             return
         self._shutting_down = True
+        if self.after_post_dispatcher is not None:
+            # plugins may post requests when they shut down, so call the hooks for those immediately
+            self.after_post_dispatcher.stop()
         for plugin in self.plugins:
             plugin.shutdown()
         # Send a web request to the server to shut down:
@@ -349,69 +847,201 @@ class Etheno:
             self.master_client.shutdown()
         for client in self.clients:
             client.shutdown()
+        if self.receipt_tracker is not None:
+            self.receipt_tracker.stop()
+        if self.tracer is not None:
+            self.tracer.finalize()
+            self.logger.info(f"Request traces saved to {self.tracer.path}")
+        if self.profiler is not None:
+            self.profiler.stop()
+            if self.profile_path is not None:
+                self.profiler.write(self.profile_path)
+                self.logger.info(
+                    f"Profile of {self.profiler.samples} samples saved to {self.profile_path}"
+                )
         self.logger.close()
-        _CONTROLLER.quit()
+        if self._running_controller:
+            self.controller.quit()
 
-    def run(self, debug=True, run_publicly=False, port=GETH_DEFAULT_RPC_PORT):
-        # Manticore only works in the main thread, so use a threadsafe wrapper:
-        def server_thread():
-            IS_DOCKER = os.environ.get("DOCKER", 0)
-            if run_publicly or IS_DOCKER:
-                host = "0.0.0.0"
-            else:
-                host = "127.0.0.1"
-            # Do not use the reloader, because Flask needs to run in the main thread to use the reloader
-            server = make_server(host=host, port=port, app=app, threaded=True)
-            return server
-            # app.run(debug=debug, host=host, port=port, use_reloader=False)
+    def register_views(self):
+        """Adds Etheno's routes to this instance's Flask app: the JSON RPC endpoint, `/metrics` (unless metrics are
+        disabled), and `/profile` (if `profiler` is set)
+        """
+        if self._views_registered:
+            return
+        self._views_registered = True
+        self.app.add_url_rule("/", view_func=EthenoView.as_view("etheno", self))
+        if self.metrics is not None:
+            self.app.add_url_rule(
+                "/metrics", view_func=MetricsView.as_view("metrics", self)
+            )
+        if self.profiler is not None:
+            # sampling on demand costs a server thread for the duration, so it is only exposed when profiling
+            self.app.add_url_rule(
+                "/profile", view_func=ProfilerView.as_view("profile", self)
+            )
+
+    def start(
+        self,
+        run_publicly=False,
+        port=GETH_DEFAULT_RPC_PORT,
+        server_type: str = "threaded",
+        workers: int = 32,
+    ):
+        """Starts serving JSON RPC requests on a background thread and runs the plugins, without blocking.
+
+        Unlike `run`, this does not need the main thread, so it can be used to run several instances in one process;
+        call `stop` to shut the instance down.
 
-        server = server_thread()
-        thread = Thread(target=server.serve_forever)
-        thread.start()
+        :param server_type: "threaded" for a werkzeug server with a thread per connection, or "asyncio" for an
+        asyncio server that handles all connections on one thread and runs blocking client calls on `workers` threads
+        """
+        if self._server is not None:
+            raise RuntimeError("This Etheno instance is already running")
+        IS_DOCKER = os.environ.get("DOCKER", 0)
+        if run_publicly or IS_DOCKER:
+            host = "0.0.0.0"
+        else:
+            host = "127.0.0.1"
+        if server_type == "asyncio":
+            from .asyncserver import AsyncEthenoServer
+
+            server = AsyncEthenoServer(
+                self, host=host, port=port, wsgi_app=self.app, workers=workers
+            )
+        elif server_type == "threaded":
+            # Do not use the reloader, because Flask needs to run in the main thread to use the reloader
+            server = make_server(host=host, port=port, app=self.app, threaded=True)
+        else:
+            raise ValueError(f"Unknown server type: {server_type}")
+        self._server = server
+        self._server_thread = Thread(
+            target=server.serve_forever, name=f"EthenoServer({port})"
+        )
+        self._server_thread.start()
         self.logger.info("Etheno v%s" % VERSION)
 
         for plugin in self.plugins:
             plugin.run()
 
-        _CONTROLLER.run()
+    def stop(self):
+        """Shuts the instance down and stops its server"""
         self.shutdown()
         self.logger.info("Shutting Etheno down")
-        server.shutdown()
-        thread.join()
+        server, thread = self._server, self._server_thread
+        self._server = self._server_thread = None
+        if server is not None:
+            server.shutdown()
+            thread.join()
+
+    def run(
+        self,
+        debug=True,
+        run_publicly=False,
+        port=GETH_DEFAULT_RPC_PORT,
+        server_type: str = "threaded",
+        workers: int = 32,
+    ):
+        """Serves JSON RPC requests until Etheno is shut down
+
+        :param server_type: "threaded" for a werkzeug server with a thread per connection, or "asyncio" for an
+        asyncio server that handles all connections on one thread and runs blocking client calls on `workers` threads
+        """
+        # Manticore only works in the main thread, so use a threadsafe wrapper:
+        self._running_controller = True
+        self.start(
+            run_publicly=run_publicly,
+            port=port,
+            server_type=server_type,
+            workers=workers,
+        )
+        self.controller.run()
+        self.stop()
+
 
+app = Flask(__name__)
+ETHENO = Etheno(app=app)
 
-ETHENO = Etheno()
 
+class InvalidRequest(ValueError):
+    def __init__(self, status: int):
+        super().__init__(f"Invalid JSON RPC request (HTTP status {status})")
+        self.status: int = status
 
-class EthenoView(MethodView):
-    def post(self):
-        data = request.get_json()
-        was_list = False
 
-        if isinstance(data, list):
-            if len(data) == 1:
-                was_list = True
-                data = data[0]
-            else:
-                ETHENO.logger.error("Unexpected POST data: %s" % data)
-                abort(400)
+def parse_request(
+    data, log: Optional[logger.EthenoLogger] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """Validates the body of a JSON RPC POST
 
-        if "jsonrpc" not in data or "method" not in data:
-            abort(400)
+    :param log: the logger to which to report problems with the request (by default, that of `ETHENO`)
+    :return: the JSON RPC request and whether it was wrapped in a list (in which case the response should be, too)
+    :raises InvalidRequest: with the HTTP status with which to respond if the request is invalid
+    """
+    was_list = False
+
+    if isinstance(data, list):
+        if len(data) == 1:
+            was_list = True
+            data = data[0]
+        else:
+            (log or ETHENO.logger).error("Unexpected POST data: %s" % data)
+            raise InvalidRequest(400)
+
+    if not isinstance(data, dict) or "jsonrpc" not in data or "method" not in data:
+        raise InvalidRequest(400)
+    try:
+        jsonrpc_version = float(data["jsonrpc"])
+    except ValueError:
+        raise InvalidRequest(400)
+    if jsonrpc_version < 2.0:
+        raise InvalidRequest(426)
+    elif jsonrpc_version > 2.0:
+        (log or ETHENO.logger).warning(
+            f"Client is using a newer version of the JSONRPC protocol! Expected 2.0, but got {jsonrpc_version}"
+        )
+
+    return data, was_list
+
+
+class EthenoView(MethodView):
+    def __init__(self, etheno: Optional[Etheno] = None):
+        super().__init__()
+        if etheno is None:
+            etheno = ETHENO
+        self.etheno: Etheno = etheno
+
+    def post(self):
         try:
-            jsonrpc_version = float(data["jsonrpc"])
-        except ValueError:
-            abort(400)
-        if jsonrpc_version < 2.0:
-            abort(426)
-        elif jsonrpc_version > 2.0:
-            ETHENO.logger.warn(
-                f"Client is using a newer version of the JSONRPC protocol! Expected 2.0, but got {jsonrpc_version}"
-            )
+            data, was_list = parse_request(request.get_json(), self.etheno.logger)
+        except InvalidRequest as e:
+            abort(e.status)
 
-        ret = ETHENO.post(data)
+        admission = self.etheno.admission
+        if admission is None:
+            return self._post(data, was_list)
+        try:
+            admission.acquire()
+        except Overloaded as e:
+            self.etheno.logger.debug(f"Shedding JSON RPC request {data}: {e}")
+            status, headers, body = admission.shed_response(e, data, was_list)
+            return Response(body, status=status, headers=headers)
+        try:
+            return self._post(data, was_list)
+        finally:
+            admission.release()
+
+    def _post(self, data, was_list: bool):
+        tracer = self.etheno.tracer
+        if tracer is None:
+            trace_id = None
+            ret = self.etheno.post(data)
+        else:
+            with tracer.trace("request", method=data["method"]) as trace:
+                trace_id = trace.trace_id
+                ret = self.etheno.post(data)
 
-        ETHENO.logger.debug(f"Returning {ret}")
+        self.etheno.logger.debug(f"Returning {ret}")
 
         if ret is None:
             return None
@@ -422,5 +1052,69 @@ class EthenoView(MethodView):
         if was_list:
             ret = [ret]
         ret = jsonify(ret)
+        if trace_id is not None:
+            ret.headers["X-Etheno-Trace-Id"] = str(trace_id)
 
         return ret
+
+
+class MetricsView(MethodView):
+    def __init__(self, etheno: Optional[Etheno] = None):
+        super().__init__()
+        if etheno is None:
+            etheno = ETHENO
+        self.etheno: Etheno = etheno
+
+    def get(self):
+        if self.etheno.metrics is None:
+            abort(404)
+        return Response(self.etheno.metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+# The longest that /profile samples on demand, holding a server thread
+MAX_ON_DEMAND_PROFILE_SECONDS = 30.0
+
+
+class ProfilerView(MethodView):
+    """Returns folded stacks of Etheno's threads, which can be rendered as a flame graph.
+
+    With a `seconds` query parameter, all threads are sampled for that many seconds (at most
+    `MAX_ON_DEMAND_PROFILE_SECONDS`) and the result is returned; only one such profile can run at a time. Otherwise,
+    the samples collected by the profiler started with `--profile` are returned (and cleared if the `reset` query
+    parameter is set). This view is only registered if Etheno is run with `--profile`.
+    """
+
+    def __init__(self, etheno: Optional[Etheno] = None):
+        super().__init__()
+        if etheno is None:
+            etheno = ETHENO
+        self.etheno: Etheno = etheno
+
+    def get(self):
+        seconds = request.args.get("seconds", None)
+        if seconds is not None:
+            try:
+                seconds = float(seconds)
+            except ValueError:
+                abort(400)
+            if not seconds > 0:
+                abort(400)
+            seconds = min(seconds, MAX_ON_DEMAND_PROFILE_SECONDS)
+            if not self.etheno.on_demand_profile_lock.acquire(blocking=False):
+                # another request is already sampling
+                abort(409)
+            try:
+                profiler = SamplingProfiler()
+                profiler.start()
+                time.sleep(seconds)
+                profiler.stop()
+            finally:
+                self.etheno.on_demand_profile_lock.release()
+        elif self.etheno.profiler is None:
+            abort(404)
+        else:
+            profiler = self.etheno.profiler
+        folded = profiler.folded()
+        if seconds is None and request.args.get("reset", None):
+            profiler.reset()
+        return Response(folded, content_type="text/plain; charset=utf-8")
@@ -4,13 +4,15 @@ import atexit
 import shlex
 import shutil
 import subprocess
-import time
 
 from .client import RpcHttpProxy, SelfPostingClient
 from .logger import PtyLogger
-from .utils import is_port_free
+from .readiness import ReadinessMonitor
 from .etheno import ETHENO
 
+# Ganache prints "RPC Listening on 127.0.0.1:8545" once it is accepting requests
+READY_PATTERNS = (r"Listening on",)
+
 
 class Ganache(RpcHttpProxy):
     def __init__(self, cmd=None, args=None, port=8546):
@@ -26,9 +28,15 @@ class Ganache(RpcHttpProxy):
             cmd + ["-d", "-p", str(port), "--chain.allowUnlimitedContractSize"] + args
         )
         self.ganache = None
+        self.readiness = None
         self._client = None
 
     def start(self):
+        self.launch()
+        self.wait_until_running()
+
+    def launch(self):
+        """Starts Ganache without waiting for it to start listening"""
         if self.ganache:
             return
         if shutil.which("ganache") is None:
@@ -37,33 +45,35 @@ class Ganache(RpcHttpProxy):
             )
         if self._client:
             self.ganache = PtyLogger(self._client.logger, self.args)
+            self.readiness = ReadinessMonitor(
+                self.port, patterns=READY_PATTERNS, instance=self.ganache
+            )
             self.ganache.start()
-
-            def ganache_errored() -> int:
-                if self.ganache.is_done():
-                    return self.ganache.exitstatus
-                return 0
-
         else:
             ETHENO.logger.debug(f"Running ganache: {self.args}")
             self.ganache = subprocess.Popen(
                 self.args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1
             )
+            self.readiness = ReadinessMonitor(
+                self.port, is_done=lambda: self.ganache.poll() is not None
+            )
+        atexit.register(Ganache.stop.__get__(self, Ganache))
 
-            def ganache_errored():
-                try:
-                    return self.ganache.wait(0.5)
-                except TimeoutError:
-                    return 0
+    def _exit_status(self):
+        """Returns Ganache's exit status, or None if it is still running"""
+        if isinstance(self.ganache, PtyLogger):
+            if self.ganache.is_done():
+                return self.ganache.exitstatus
+            return None
+        return self.ganache.poll()
 
-        atexit.register(Ganache.stop.__get__(self, Ganache))
-        # wait until Ganache has started listening:
-        while is_port_free(self.port) and not self.ganache.is_done():
-            time.sleep(0.25)
-        retcode = ganache_errored()
-        if retcode != 0:
+    def wait_until_running(self):
+        """Blocks until Ganache has started listening, raising a RuntimeError if it exits first"""
+        if self.ganache is None:
+            self.launch()
+        if not self.readiness.wait():
             raise RuntimeError(
-                f"{' '.join(self.args)} exited with non-zero status {retcode}"
+                f"{' '.join(self.args)} exited with status {self._exit_status()} before it started listening"
             )
 
     def post(self, data):
@@ -75,6 +85,7 @@ class Ganache(RpcHttpProxy):
         if self.ganache is not None:
             ganache = self.ganache
             self.ganache = None
+            self.readiness = None
             ganache.terminate()
             ganache.wait()
             if isinstance(ganache, PtyLogger):
@@ -93,8 +104,7 @@ class GanacheClient(SelfPostingClient):
         self.short_name = "Ganache@%d" % ganache_instance.port
 
     def wait_until_running(self):
-        while is_port_free(self.client.port):
-            time.sleep(0.25)
+        self.client.wait_until_running()
 
     def shutdown(self):
         self.client.stop()
@@ -1,5 +1,3 @@
-from web3.auto import w3
-
 from .utils import format_hex_address
 
 
@@ -138,17 +136,31 @@ DEFAULT_PRIVATE_KEYS = [
     0x23CB7121166B9A2F93AE0B7C05BDE02EAE50D64449B2CBB42BC84E9D38D6CC89,
 ]
 
+# The addresses of DEFAULT_PRIVATE_KEYS, so that they do not have to be derived (and the signing libraries imported)
+# every time Etheno starts
+DEFAULT_ADDRESSES = [
+    0x5409ED021D9299BF6814279A6A1411A7E866A631,
+    0x6ECBE1DB9EF729CBE972C83FB886247691FB6BEB,
+    0xE36EA790BC9D7AB70C55260C66D52B1ECA985F84,
+    0xE834EC434DABA538CD1B9FE1582052B880BD7E63,
+    0x78DC5D2D739606D31509C31D654056A45185ECB6,
+    0xA8DDA8D7F5310E4A9E24F8EBA77E091AC264F872,
+    0x06CEF8E666768CC40CC78CF93D9611019DDCB628,
+    0x4404AC8BD8F9618D27AD2F1485AA1B2CFD82482D,
+    0x7457D5E02197480DB681D3FDF256C7ACA21BDC12,
+    0x91C987BF62D25945DB517BDAA840A6C661374402,
+]
+
 
 def make_accounts(num_accounts, default_balance=None):
     ret = []
     if num_accounts > len(DEFAULT_PRIVATE_KEYS):
         raise Exception("TODO: Too many accounts")
     for i in range(num_accounts):
-        acct = w3.eth.account.from_key(DEFAULT_PRIVATE_KEYS[i])
         ret.append(
             Account(
-                address=int(acct.address, 16),
-                private_key=int(acct.privateKey.hex(), 16),
+                address=DEFAULT_ADDRESSES[i],
+                private_key=DEFAULT_PRIVATE_KEYS[i],
                 balance=default_balance,
             )
         )
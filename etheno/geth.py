@@ -1,13 +1,20 @@
 import atexit
+import json
 import os
 import subprocess
-import time
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
 
 from . import logger
 from .client import JSONRPCError
+from .datadir import DatadirCache
 from .jsonrpcclient import JSONRPCClient
 from .utils import format_hex_address
 
+# The keys are only used for testing, and geth has to run scrypt again to unlock each of them when it starts
+KEYSTORE_KDF_PROFILE = "testing"
+
 
 def ltrim_ansi(text):
     if text.startswith(logger.ANSI_RESET):
@@ -26,8 +33,18 @@ def ltrim_ansi(text):
 
 
 class GethClient(JSONRPCClient):
-    def __init__(self, genesis, port=8546):
-        super().__init__("Geth", genesis, port)
+    executable = "geth"
+    immutable_datadir_directories = ("keystore",)
+    # "HTTP endpoint opened" is printed by geth versions before 1.9
+    ready_patterns = (r"HTTP (server started|endpoint opened)",)
+
+    def __init__(
+        self, genesis, port=8546, datadir_cache: Optional[DatadirCache] = None
+    ):
+        super().__init__("Geth", genesis, port, datadir_cache=datadir_cache)
+        # set once geth has printed that it unlocked all of the accounts passed to `--unlock`
+        self.accounts_unlocked = threading.Event()
+        self._accounts_to_unlock = 0
         atexit.register(GethClient.shutdown.__get__(self, GethClient))
 
     def initialized(self):
@@ -47,9 +64,20 @@ class GethClient(JSONRPCClient):
                 logger.info(message)
 
         self.instance.log = log
+        self.accounts_unlocked.clear()
+        if self._accounts_to_unlock:
+            self.instance.add_line_listener(self._count_unlocked_accounts)
+        else:
+            self.accounts_unlocked.set()
 
-    def etheno_set(self):
-        super().etheno_set()
+    def _count_unlocked_accounts(self, line):
+        if line is not None and "Unlocked account" in line:
+            self._accounts_to_unlock -= 1
+            if self._accounts_to_unlock <= 0:
+                self.accounts_unlocked.set()
+                self.instance.remove_line_listener(self._count_unlocked_accounts)
+
+    def initialize_datadir(self):
         try:
             args = [
                 "/usr/bin/env",
@@ -71,33 +99,26 @@ class GethClient(JSONRPCClient):
             raise e
 
     def import_account(self, private_key):
-        content = format_hex_address(private_key).encode("utf-8") + bytes([ord("\n")])
-        import_dir = os.path.join(self.log_directory, "private_keys")
-        keyfile = self.logger.make_constant_logged_file(
-            content, prefix="private", suffix=".key", dir=import_dir
+        self.import_accounts((private_key,))
+
+    def import_accounts(self, private_keys: Iterable[int]):
+        """Writes a keystore file for each private key directly into the datadir.
+
+        This is equivalent to `geth account import`, without starting a geth process for every account.
+        """
+        # keyfiles need the crypto libraries, which are only imported once there are accounts to import
+        from .keyfile import create_keyfiles_json
+
+        keystore = os.path.join(self.datadir, "keystore")
+        os.makedirs(keystore, exist_ok=True)
+        keyfiles = create_keyfiles_json(
+            [private_key.to_bytes(32, byteorder="big") for private_key in private_keys],
+            b"etheno",
+            kdf="scrypt",
+            profile=KEYSTORE_KDF_PROFILE,
         )
-        while True:
-            args = [
-                "/usr/bin/env",
-                "geth",
-                "account",
-                "import",
-                "--datadir",
-                self.logger.to_log_path(self.datadir),
-                "--password",
-                self.logger.to_log_path(self.passwords),
-                self.logger.to_log_path(keyfile),
-            ]
-            self.add_to_run_script(args)
-            geth = subprocess.Popen(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=self.log_directory,
-            )
-            if geth.wait() == 0:
-                return
-            # This sometimes happens with geth, I have no idea why, so just try again
+        for keyfile in keyfiles:
+            write_keystore_file(keystore, keyfile)
 
     def post(self, data):
         # geth takes a while to unlock all of the accounts, so check to see if that caused an error and just wait a bit
@@ -109,10 +130,13 @@ class GethClient(JSONRPCClient):
                     e.result["error"]["code"] == -32000
                     and "authentication needed" in e.result["error"]["message"]
                 ):
+                    if self.accounts_unlocked.is_set():
+                        raise e
                     self.logger.info(
                         "Waiting for Geth to finish unlocking our accounts..."
                     )
-                    time.sleep(3.0)
+                    # geth only reports unlocked accounts at the INFO verbosity or higher, so retry periodically
+                    self.accounts_unlocked.wait(3.0)
                 else:
                     raise e
 
@@ -131,6 +155,9 @@ class GethClient(JSONRPCClient):
             "/usr/bin/env",
             "geth",
             "--nodiscover",
+            # let geth choose a free P2P port, so that concurrent instances do not collide on the default 30303
+            "--port",
+            "0",
             "--rpc",
             "--rpcport",
             "%d" % self.port,
@@ -145,10 +172,13 @@ class GethClient(JSONRPCClient):
             "--minerthreads=1",
         ]
         if unlock_accounts:
-            addresses = filter(
-                lambda a: a != format_hex_address(self.miner_account.address),
-                map(format_hex_address, self.genesis["alloc"]),
+            addresses = list(
+                filter(
+                    lambda a: a != format_hex_address(self.miner_account.address),
+                    map(format_hex_address, self.genesis["alloc"]),
+                )
             )
+            self._accounts_to_unlock = len(addresses)
             unlock_args = [
                 "--unlock",
                 ",".join(addresses),
@@ -156,5 +186,16 @@ class GethClient(JSONRPCClient):
                 self.passwords,
             ]
         else:
+            self._accounts_to_unlock = 0
             unlock_args = []
         return base_args + unlock_args
+
+
+def write_keystore_file(keystore: str, keyfile: Dict[str, Any]) -> str:
+    """Writes a V3 keyfile to the `keystore` directory, named as geth names them"""
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S.%f000Z")
+    path = os.path.join(keystore, f"UTC--{timestamp}--{keyfile['address']}")
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(keyfile, f)
+    return path
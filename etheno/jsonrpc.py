@@ -1,40 +1,58 @@
+import atexit
+import functools
+import gzip
 import json
-from typing import Dict, TextIO, Union
+import os
+import threading
+import time
+import weakref
+from typing import Dict, Iterator, List, Optional, TextIO, Union
 
+from . import signals
 from .etheno import EthenoPlugin
+from .threadwrapper import is_main_thread
 from .utils import format_hex_address
 from .client import JSONRPCError
 
-# source: https://ethereum.stackexchange.com/a/83855
-import rlp
-from eth_typing import HexStr
-from eth_utils import keccak, to_bytes
-from rlp.sedes import Binary, big_endian_int, binary
-from web3 import Web3
-from web3.auto import w3
-
-
-class Transaction(rlp.Serializable):
-    fields = [
-        ("nonce", big_endian_int),
-        ("gas_price", big_endian_int),
-        ("gas", big_endian_int),
-        ("to", Binary.fixed_length(20, allow_empty=True)),
-        ("value", big_endian_int),
-        ("data", binary),
-        ("v", big_endian_int),
-        ("r", big_endian_int),
-        ("s", big_endian_int),
-    ]
+
+@functools.lru_cache(maxsize=None)
+def _transaction_sedes():
+    # rlp and web3 are only needed to decode raw transactions, so they are not imported until one is logged
+    # source: https://ethereum.stackexchange.com/a/83855
+    import rlp
+    from rlp.sedes import Binary, big_endian_int, binary
+
+    class Transaction(rlp.Serializable):
+        fields = [
+            ("nonce", big_endian_int),
+            ("gas_price", big_endian_int),
+            ("gas", big_endian_int),
+            ("to", Binary.fixed_length(20, allow_empty=True)),
+            ("value", big_endian_int),
+            ("data", binary),
+            ("v", big_endian_int),
+            ("r", big_endian_int),
+            ("s", big_endian_int),
+        ]
+
+    return Transaction
 
 
 def hex_to_bytes(data: str) -> bytes:
+    from eth_typing import HexStr
+    from eth_utils import to_bytes
+
     return to_bytes(hexstr=HexStr(data))
 
 
 def decode_raw_tx(raw_tx: str):
+    import rlp
+    from eth_utils import keccak
+    from web3 import Web3
+    from web3.auto import w3
+
     tx_bytes = hex_to_bytes(raw_tx)
-    tx = rlp.decode(tx_bytes, Transaction)
+    tx = rlp.decode(tx_bytes, _transaction_sedes())
     hash_tx = Web3.toHex(keccak(tx_bytes))
     from_ = w3.eth.account.recover_transaction(raw_tx)
     to = w3.toChecksumAddress(tx.to) if tx.to else None
@@ -58,55 +76,320 @@ def decode_raw_tx(raw_tx: str):
     }
 
 
+def json_default(obj):
+    """A `default` for `json.dumps` that serializes JSON RPC errors as the error response that the client returned"""
+    if isinstance(obj, JSONRPCError):
+        return obj.result
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+
+def compression_from_path(path: str) -> Optional[str]:
+    """Returns the compression implied by the extension of `path`, or None if it is not compressed"""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower(), None)
+
+
+def open_text_stream(path: str, mode: str, compression: Optional[str] = None) -> TextIO:
+    """Opens `path` as a text stream, transparently (de)compressing it.
+
+    :param path: the file to open
+    :param mode: either "r" or "w"
+    :param compression: "gzip", "zstd", "none", or None to infer it from the file extension
+    """
+    if compression is None:
+        compression = compression_from_path(path)
+    if compression is None or compression == "none":
+        return open(path, mode, encoding="utf8")
+    elif compression == "gzip":
+        return gzip.open(path, f"{mode}t", encoding="utf8")  # type: ignore
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError(
+                "zstd compression requires the `zstandard` package; install it by running `pip3 install zstandard`"
+            )
+        return zstandard.open(path, f"{mode}t", encoding="utf8")
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+
+# Exporters that have not been finalized, which are all flushed at interpreter exit and on SIGTERM/SIGHUP by handlers
+# that are only installed once, rather than once per exporter. The lock is reentrant because the signal handler runs
+# on the main thread, which may already hold it.
+_LIVE_EXPORTERS: "weakref.WeakSet[JSONExporter]" = weakref.WeakSet()
+_LIVE_EXPORTERS_LOCK = threading.RLock()
+_exit_handler_installed = False
+_termination_handler_installed = False
+
+
+def _flush_live_exporters(*_):
+    with _LIVE_EXPORTERS_LOCK:
+        exporters = list(_LIVE_EXPORTERS)
+    for exporter in exporters:
+        exporter.flush()
+
+
+def _register_exporter(exporter: "JSONExporter"):
+    global _exit_handler_installed, _termination_handler_installed
+    with _LIVE_EXPORTERS_LOCK:
+        _LIVE_EXPORTERS.add(exporter)
+        if not _exit_handler_installed:
+            atexit.register(_flush_live_exporters)
+            _exit_handler_installed = True
+        # signal handlers can only be installed from the main thread, so this waits for an exporter created there
+        if not _termination_handler_installed and is_main_thread():
+            signals.add_termination_handler(_flush_live_exporters)
+            _termination_handler_installed = True
+
+
+def _unregister_exporter(exporter: "JSONExporter"):
+    with _LIVE_EXPORTERS_LOCK:
+        _LIVE_EXPORTERS.discard(exporter)
+
+
 class JSONExporter:
-    def __init__(self, out_stream: Union[str, TextIO]):
+    """Writes a JSON array of entries to a file or stream.
+
+    Entries are serialized eagerly but written in batches: the buffer is flushed once it holds
+    `max_buffered_entries` entries or `max_buffered_bytes` characters, or once `flush_interval` seconds have passed
+    since the last flush. If `background` is True, a writer thread performs the time-based flushes so that slow or
+    idle periods are still persisted. Passing `max_buffered_entries=1` restores the old flush-per-entry behavior.
+    Any buffered entries are always written by `finalize()`, at interpreter exit, and on SIGTERM/SIGHUP.
+    If `out_stream` is a path, the output is compressed according to `compression` (see `open_text_stream`).
+    """
+
+    def __init__(
+        self,
+        out_stream: Union[str, TextIO],
+        flush_interval: Optional[float] = 1.0,
+        max_buffered_entries: Optional[int] = 1024,
+        max_buffered_bytes: Optional[int] = 1 << 20,
+        background: bool = False,
+        compression: Optional[str] = None,
+    ):
         self._was_path = isinstance(out_stream, str)
         if self._was_path:
-            self.output = open(out_stream, "w", encoding="utf8")
+            self.path: Optional[str] = out_stream  # type: ignore
+            self.output = open_text_stream(out_stream, "w", compression)  # type: ignore
         else:
+            self.path = getattr(out_stream, "name", None)
             self.output = out_stream
-        self.output.write("[")
+        self.flush_interval: Optional[float] = flush_interval
+        self.max_buffered_entries: Optional[int] = max_buffered_entries
+        self.max_buffered_bytes: Optional[int] = max_buffered_bytes
+        self._lock = threading.RLock()
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
         self._count = 0
         self._finalized = False
+        self._buffer.append(self._header())
+        self._flush_requested = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        if background and flush_interval is not None:
+            self._writer = threading.Thread(
+                target=self._background_writer,
+                name=f"{self.__class__.__name__}Writer",
+                daemon=True,
+            )
+            self._writer.start()
+        _register_exporter(self)
 
-    def finalize(self):
-        if self._finalized:
-            return
-        if self._count:
-            self.output.write("\n")
-        self.output.write("]")
+    def _header(self) -> str:
+        return "["
+
+    def _footer(self) -> str:
+        return "\n]" if self._count else "]"
+
+    def _encode_entry(self, entry) -> str:
+        if self._count > 1:
+            return ",\n" + json.dumps(entry, default=json_default)
+        return "\n" + json.dumps(entry, default=json_default)
+
+    def _background_writer(self):
+        while not self._finalized:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            self.flush()
+
+    def _write_buffer(self):
+        if self._buffer:
+            # take the buffer before writing it, so that a flush from a signal handler that interrupts this one (on the
+            # same thread, since the lock is reentrant) does not write the same entries again
+            buffer, self._buffer = self._buffer, []
+            self._buffered_bytes = 0
+            self.output.write("".join(buffer))
         self.output.flush()
-        if self._was_path:
-            self.output.close()
-        self._finalized = True
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Writes all buffered entries to the output and flushes it"""
+        with self._lock:
+            if self._finalized:
+                return
+            self._write_buffer()
+
+    def finalize(self):
+        with self._lock:
+            if self._finalized:
+                return
+            self._buffer.append(self._footer())
+            self._write_buffer()
+            if self._was_path:
+                self.output.close()
+            self._finalized = True
+        _unregister_exporter(self)
+        if self._writer is not None:
+            self._flush_requested.set()
+            self._writer.join()
+            self._writer = None
+
+    def _should_flush(self) -> bool:
+        if (
+            self.max_buffered_entries is not None
+            and len(self._buffer) >= self.max_buffered_entries
+        ):
+            return True
+        elif (
+            self.max_buffered_bytes is not None
+            and self._buffered_bytes >= self.max_buffered_bytes
+        ):
+            return True
+        return (
+            self._writer is None
+            and self.flush_interval is not None
+            and time.monotonic() - self._last_flush >= self.flush_interval
+        )
 
     def write_entry(self, entry):
         if self._finalized:
             return
-        if self._count > 0:
-            self.output.write(",")
-        self._count += 1
-        self.output.write("\n")
-        json.dump(entry, self.output)
-        self.output.flush()
+        with self._lock:
+            if self._finalized:
+                return
+            self._count += 1
+            encoded = self._encode_entry(entry)
+            self._buffer.append(encoded)
+            self._buffered_bytes += len(encoded)
+            if self._should_flush():
+                self._write_buffer()
+
+
+class JSONLinesExporter(JSONExporter):
+    """Writes one JSON entry per line (JSON Lines), which can be streamed and appended to without repair"""
+
+    def _header(self) -> str:
+        return ""
+
+    def _footer(self) -> str:
+        return ""
+
+    def _encode_entry(self, entry) -> str:
+        return json.dumps(entry, default=json_default) + "\n"
+
+
+def make_exporter(
+    out_stream: Union[str, TextIO], export_format: Optional[str] = None, **kwargs
+) -> JSONExporter:
+    """Creates an exporter for `out_stream`.
+
+    :param out_stream: a path or stream to which to export
+    :param export_format: "json" for a JSON array, "jsonl" for JSON Lines, or None to infer it from the file extension
+    :param kwargs: additional keyword arguments for the exporter, such as its flush policy or compression
+    """
+    if export_format is None:
+        export_format = "json"
+        if isinstance(out_stream, str):
+            path = out_stream.lower()
+            if compression_from_path(path) is not None:
+                path = os.path.splitext(path)[0]
+            if path.endswith(JSON_LINES_SUFFIXES):
+                export_format = "jsonl"
+    if export_format == "json":
+        return JSONExporter(out_stream, **kwargs)
+    elif export_format == "jsonl":
+        return JSONLinesExporter(out_stream, **kwargs)
+    else:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+
+def read_json_entries(
+    in_stream: Union[str, TextIO], compression: Optional[str] = None
+) -> Iterator:
+    """Lazily reads the entries written by a `JSONExporter` or `JSONLinesExporter`, in constant memory.
+
+    Both formats are read line-by-line, so captures from interrupted runs (a JSON array missing its closing bracket,
+    a truncated last line, or a truncated compressed stream) still yield every complete entry.
+    """
+    if isinstance(in_stream, str):
+        stream = open_text_stream(in_stream, "r", compression)
+    else:
+        stream = in_stream
+    decode_error: Optional[ValueError] = None
+    try:
+        while True:
+            try:
+                line = stream.readline()
+            except EOFError:
+                # the compressed stream was truncated
+                break
+            if not line:
+                break
+            line = line.strip()
+            if line.endswith(","):
+                line = line[:-1]
+            if not line or line == "[" or line == "]":
+                continue
+            if decode_error is not None:
+                # only the last line of a capture is allowed to be incomplete
+                raise decode_error
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                decode_error = e
+                continue
+            yield entry
+    finally:
+        if stream is not in_stream:
+            stream.close()
 
 
 class JSONRPCExportPlugin(EthenoPlugin):
-    def __init__(self, out_stream: Union[str, TextIO]):
-        self._exporter = JSONExporter(out_stream)
+    def __init__(self, out_stream: Union[str, TextIO], **exporter_options):
+        """
+        :param out_stream: a path or stream to which to export the JSON RPC calls
+        :param exporter_options: additional keyword arguments for `make_exporter`, such as the export format,
+        compression, or flush policy
+        """
+        # flush on a timer, so that buffered calls are written while Etheno is idle rather than on the next call
+        exporter_options.setdefault("background", True)
+        self._exporter = make_exporter(out_stream, **exporter_options)
 
     def after_post(self, post_data, client_results):
-        self._exporter.write_entry([post_data, client_results])
+        # the timestamp lets `etheno replay --speed` reproduce the original timing
+        self._exporter.write_entry([post_data, client_results, time.time()])
 
     def finalize(self):
         self._exporter.finalize()
-        if hasattr(self._exporter.output, "name"):
-            self.logger.info(
-                f"Raw JSON RPC messages dumped to {self._exporter.output.name}"
-            )
+        if self._exporter.path is not None:
+            self.logger.info(f"Raw JSON RPC messages dumped to {self._exporter.path}")
 
 
 class EventSummaryPlugin(EthenoPlugin):
+    methods = frozenset(
+        (
+            "eth_sendTransaction",
+            "eth_sendRawTransaction",
+            "eth_getTransactionReceipt",
+            "evm_mine",
+            "evm_increaseTime",
+        )
+    )
+
     def __init__(self):
         self._transactions: Dict[
             int, Dict[str, object]
@@ -179,6 +462,10 @@ class EventSummaryPlugin(EthenoPlugin):
         elif post_data["method"] == "evm_increaseTime":
             self.handle_increase_block_timestamp(post_data["params"][0])
         elif post_data["method"] == "eth_getTransactionReceipt":
+            if not isinstance(result, dict) or result.get("result", None) is None:
+                # the transaction is still pending (e.g., with --non-blocking-receipts), so it is logged once a later
+                # request returns its receipt
+                return
             transaction_hash = post_data["params"][0]
             if transaction_hash not in self._transactions:
                 self.logger.error(
@@ -231,9 +518,10 @@ class EventSummaryPlugin(EthenoPlugin):
 
 
 class EventSummaryExportPlugin(EventSummaryPlugin):
-    def __init__(self, out_stream: Union[str, TextIO]):
+    def __init__(self, out_stream: Union[str, TextIO], **exporter_options):
         super().__init__()
-        self._exporter = JSONExporter(out_stream)
+        exporter_options.setdefault("background", True)
+        self._exporter = make_exporter(out_stream, **exporter_options)
 
     def run(self):
         for address in self.etheno.accounts:
@@ -307,7 +595,5 @@ class EventSummaryExportPlugin(EventSummaryPlugin):
     def finalize(self):
         super().handle_unlogged_transactions()
         self._exporter.finalize()
-        if hasattr(self._exporter.output, "name"):
-            self.logger.info(
-                f"Event summary JSON saved to {self._exporter.output.name}"
-            )
+        if self._exporter.path is not None:
+            self.logger.info(f"Event summary JSON saved to {self._exporter.path}")
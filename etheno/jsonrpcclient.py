@@ -4,13 +4,22 @@ import json
 import os
 
 from .client import RpcProxyClient
+from .datadir import DatadirCache
 from .genesis import make_accounts
 from .logger import PtyLogger
+from .readiness import ReadinessMonitor
 from .utils import format_hex_address, is_port_free
 
 
 class JSONRPCClient(RpcProxyClient):
-    def __init__(self, name, genesis, port=8546):
+    # The name of the client's executable
+    executable = None
+    # Directories of the datadir whose files the client never modifies once they are created
+    immutable_datadir_directories = ()
+    # Regular expressions matching lines that the client prints once it is accepting JSON RPC requests
+    ready_patterns = ()
+
+    def __init__(self, name, genesis, port=8546, datadir_cache: DatadirCache = None):
         super().__init__("http://localhost:%d/" % port)
         self._basename = name
         self.short_name = "%s@%d" % (name, port)
@@ -24,12 +33,18 @@ class JSONRPCClient(RpcProxyClient):
         self._accounts = []
         self._created_address_index = -1
         self._runscript = []
+        self.datadir_cache = datadir_cache
         # These are set in self.etheno_set():
         self.genesis_file = None
         self.passwords = None
         self.datadir = None
-        # This is set when self.start() is called:
+        self._datadir_initialized = False
+        # Ports reserved for the client other than its JSON RPC port (e.g., for P2P), which are unbound just before it
+        # is launched and released once it is running
+        self.port_reservations = []
+        # These are set when self.start() is called:
         self.instance = None
+        self.readiness = None
 
     def write_genesis(self, outfile):
         outfile.write(json.dumps(self.genesis).encode("utf-8"))
@@ -53,6 +68,35 @@ class JSONRPCClient(RpcProxyClient):
         ) as password_output:
             self.passwords = password_output.name
             self.write_passwords(password_output)
+        self._datadir_initialized = False
+
+    def initialize_datadir(self):
+        """Initializes the datadir for the genesis, before any accounts are imported"""
+        pass
+
+    def prepare_datadir(self, private_keys):
+        """Initializes the datadir and imports the accounts for `private_keys`, copying it from the cache if possible"""
+        private_keys = list(private_keys)
+        self._datadir_initialized = True
+        if self.datadir_cache is None:
+            self.initialize_datadir()
+            self.import_accounts(private_keys)
+            return
+        key = self.datadir_cache.key(
+            self._basename, self.genesis, private_keys, executable=self.executable
+        )
+        if self.datadir_cache.restore(
+            key, self.datadir, immutable=self.immutable_datadir_directories
+        ):
+            self.logger.info(
+                f"Copied the initialized datadir from {self.datadir_cache.path(key)}"
+            )
+            return
+        self.initialize_datadir()
+        self.import_accounts(private_keys)
+        self.datadir_cache.store(
+            key, self.datadir, immutable=self.immutable_datadir_directories
+        )
 
     def add_to_run_script(self, command):
         if isinstance(command, Sequence):
@@ -62,6 +106,10 @@ class JSONRPCClient(RpcProxyClient):
     def import_account(self, private_key):
         raise NotImplementedError()
 
+    def import_accounts(self, private_keys):
+        for private_key in private_keys:
+            self.import_account(private_key)
+
     @property
     def accounts(self):
         for addr, bal in self.genesis["alloc"].items():
@@ -100,26 +148,65 @@ class JSONRPCClient(RpcProxyClient):
         os.chmod(run_script, 0o755)
 
     def start(self, unlock_accounts=True):
+        self.launch(unlock_accounts)
+        self.wait_until_running()
+
+    def launch(self, unlock_accounts=True):
+        """Starts the client without waiting for it to start running"""
+        if not self._datadir_initialized:
+            # the accounts were imported without `prepare_datadir`
+            self._datadir_initialized = True
+            self.initialize_datadir()
         start_args = self.get_start_command(unlock_accounts)
+        for reservation in self.port_reservations:
+            reservation.unbind()
         self.instance = PtyLogger(self.logger, start_args, cwd=self.log_directory)
+        self.readiness = ReadinessMonitor(
+            self.port,
+            patterns=self.ready_patterns,
+            instance=self.instance,
+        )
         if self.log_directory:
             self.add_to_run_script(start_args)
             self.save_run_script()
         self.initialized()
         self.instance.start()
-        self.wait_until_running()
 
     def initialized(self):
         """Called once the client is completely intialized but before it is started"""
         pass
 
     def is_running(self):
+        if self.readiness is not None:
+            return self.readiness.probe()
         return not is_port_free(self.port)
 
+    def wait_until_running(self):
+        if self.readiness is None:
+            return super().wait_until_running()
+        try:
+            if not self.readiness.wait(
+                on_waiting=lambda _: self.logger.info(
+                    "Waiting for the client to start..."
+                )
+            ):
+                raise RuntimeError(
+                    f"{self.short_name} exited before it started accepting JSON RPC requests"
+                )
+        finally:
+            self.release_ports()
+
+    def release_ports(self):
+        for reservation in self.port_reservations:
+            reservation.release()
+        self.port_reservations = []
+
     def stop(self):
+        self.release_ports()
         if self.instance is not None:
             instance = self.instance
             self.instance = None
+            self.readiness = None
             instance.terminate()
             instance.wait()
             instance.close()
@@ -24,10 +24,16 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import functools
 import hashlib
+import atexit
 import hmac
 import json
+import os
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 from Crypto import Random
 from Crypto.Cipher import AES
@@ -62,14 +68,81 @@ def load_keyfile(path_or_file_obj):
 
 
 def create_keyfile_json(
-    private_key, password, version=3, kdf="pbkdf2", iterations=None
+    private_key, password, version=3, kdf="pbkdf2", iterations=None, profile=None
 ):
+    """Encrypts `private_key` with `password`.
+
+    `profile` is the name of one of the `KDF_PROFILES` (the default is "standard"), which sets the KDF's work
+    factors; `iterations`, if provided, overrides the profile's work factor (PBKDF2's `c` or scrypt's `n`).
+    """
     if version == 3:
-        return _create_v3_keyfile_json(private_key, password, kdf, iterations)
+        return _create_v3_keyfile_json(
+            private_key, password, kdf, iterations, profile=profile
+        )
     else:
         raise NotImplementedError("Not yet implemented")
 
 
+def _create_keyfile_json_star(args):
+    private_key, password, version, kdf, iterations, profile = args
+    return create_keyfile_json(private_key, password, version, kdf, iterations, profile)
+
+
+# The process pool shared by every call to `create_keyfiles_json` (e.g., from each Etheno instance's Geth and Parity
+# clients, which are started concurrently), which is only created once it is first needed
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _shared_executor() -> ProcessPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            atexit.register(shutdown_executor)
+        return _EXECUTOR
+
+
+def shutdown_executor():
+    """Shuts down the process pool shared by `create_keyfiles_json`, if it was created"""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+    if executor is not None:
+        executor.shutdown()
+        atexit.unregister(shutdown_executor)
+
+
+def create_keyfiles_json(
+    private_keys,
+    password,
+    version=3,
+    kdf="pbkdf2",
+    iterations=None,
+    profile=None,
+    processes=None,
+):
+    """Returns a list of keyfiles, one for each of `private_keys`.
+
+    If `processes` is None, the keyfiles are created in a process pool with a process per CPU that is shared by all
+    calls if there are at least `MIN_PARALLEL_KEYFILES` keys and the profile is not "testing"; otherwise, they are
+    created in this process. A `processes` greater than one creates them in a pool of its own with that many processes.
+    """
+    jobs = [
+        (private_key, password, version, kdf, iterations, profile)
+        for private_key in private_keys
+    ]
+    if processes is None:
+        if len(jobs) < MIN_PARALLEL_KEYFILES or profile == "testing":
+            processes = 1
+        else:
+            return list(_shared_executor().map(_create_keyfile_json_star, jobs))
+    if processes <= 1:
+        return [_create_keyfile_json_star(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_create_keyfile_json_star, jobs))
+
+
 def decode_keyfile_json(raw_keyfile_json, password):
     keyfile_json = normalize_keys(raw_keyfile_json)
     version = keyfile_json["version"]
@@ -109,41 +182,76 @@ DKLEN = 32
 SCRYPT_R = 1
 SCRYPT_P = 8
 
+# The work factors of each KDF, by profile. Etheno's keys are only ever used for testing, and clients have to run the
+# KDF again to unlock each account, so "light" (geth's light scrypt parameters) and "testing" (the cheapest parameters
+# that clients accept) trade the keyfiles' resistance to brute force for startup time.
+KDF_PROFILES = {
+    "standard": {
+        "pbkdf2": {"c": 1000000},
+        "scrypt": {"n": 262144, "r": SCRYPT_R, "p": SCRYPT_P},
+    },
+    "light": {
+        "pbkdf2": {"c": 10000},
+        "scrypt": {"n": 4096, "r": 8, "p": 6},
+    },
+    "testing": {
+        "pbkdf2": {"c": 1},
+        "scrypt": {"n": 2, "r": 1, "p": 1},
+    },
+}
+
+# The minimum number of keyfiles for which `create_keyfiles_json` starts a process pool by default
+MIN_PARALLEL_KEYFILES = 8
+
+
+def get_kdf_params(kdf, profile=None):
+    """Returns a copy of the work factors of `kdf` in the KDF profile named `profile` (by default, "standard")"""
+    if profile is None:
+        profile = "standard"
+    if profile not in KDF_PROFILES:
+        raise ValueError("Unknown KDF profile: {0}".format(profile))
+    if kdf not in KDF_PROFILES[profile]:
+        raise ValueError("Unsupported key derivation function: {0}".format(kdf))
+    return dict(KDF_PROFILES[profile][kdf])
+
 
-def _create_v3_keyfile_json(private_key, password, kdf, work_factor=None):
+def _create_v3_keyfile_json(private_key, password, kdf, work_factor=None, profile=None):
     salt = Random.get_random_bytes(32)
 
-    if work_factor is None:
-        work_factor = get_default_work_factor_for_kdf(kdf)
+    params = get_kdf_params(kdf, profile)
 
     if kdf == "pbkdf2":
+        if work_factor is not None:
+            params["c"] = work_factor
         derived_key = _pbkdf2_hash(
             password,
             hash_name="sha256",
             salt=salt,
-            iterations=work_factor,
+            iterations=params["c"],
             dklen=DKLEN,
         )
         kdfparams = {
-            "c": work_factor,
+            "c": params["c"],
             "dklen": DKLEN,
             "prf": "hmac-sha256",
             "salt": encode_hex_no_prefix(salt),
         }
     elif kdf == "scrypt":
+        if work_factor is not None:
+            params["n"] = work_factor
         derived_key = _scrypt_hash(
             password,
             salt=salt,
             buflen=DKLEN,
-            r=SCRYPT_R,
-            p=SCRYPT_P,
-            n=work_factor,
+            r=params["r"],
+            p=params["p"],
+            n=params["n"],
         )
         kdfparams = {
             "dklen": DKLEN,
-            "n": work_factor,
-            "r": SCRYPT_R,
-            "p": SCRYPT_P,
+            "n": params["n"],
+            "r": params["r"],
+            "p": params["p"],
             "salt": encode_hex_no_prefix(salt),
         }
     else:
@@ -220,7 +328,7 @@ def _derive_pbkdf_key(crypto, password):
     assert should_be_hmac == "hmac"
     iterations = kdf_params["c"]
 
-    derive_pbkdf_key = _pbkdf2_hash(password, hash_name, salt, iterations, dklen)
+    derive_pbkdf_key = _cached_pbkdf2_hash(password, hash_name, salt, iterations, dklen)
 
     return derive_pbkdf_key
 
@@ -233,7 +341,7 @@ def _derive_scrypt_key(crypto, password):
     n = kdf_params["n"]
     buflen = kdf_params["dklen"]
 
-    derived_scrypt_key = _scrypt_hash(
+    derived_scrypt_key = _cached_scrypt_hash(
         password,
         salt=salt,
         n=n,
@@ -269,6 +377,15 @@ def _pbkdf2_hash(password, hash_name, salt, iterations, dklen):
     return derived_key
 
 
+# Keys derived while decoding are cached by password and salt (and the KDF's parameters), so that decoding the same
+# keyfile again, e.g., to unlock an account, does not run the KDF again. Creating a keyfile always uses a new random
+# salt, so its derived keys are never looked up again and are not cached.
+DERIVED_KEY_CACHE_SIZE = 1024
+
+_cached_scrypt_hash = functools.lru_cache(maxsize=DERIVED_KEY_CACHE_SIZE)(_scrypt_hash)
+_cached_pbkdf2_hash = functools.lru_cache(maxsize=DERIVED_KEY_CACHE_SIZE)(_pbkdf2_hash)
+
+
 #
 # Encryption and Decryption
 #
@@ -288,13 +405,12 @@ def encrypt_aes_ctr(value, key, iv):
 #
 # Utility
 #
-def get_default_work_factor_for_kdf(kdf):
+def get_default_work_factor_for_kdf(kdf, profile=None):
+    params = get_kdf_params(kdf, profile)
     if kdf == "pbkdf2":
-        return 1000000
-    elif kdf == "scrypt":
-        return 262144
+        return params["c"]
     else:
-        raise ValueError("Unsupported key derivation function: {0}".format(kdf))
+        return params["n"]
 
 
 if __name__ == "__main__":
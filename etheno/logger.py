@@ -102,8 +102,8 @@ ETHENO_LOGGERS = {}
 _LOGGING_GETLOGGER = logging.getLogger
 
 
-def getLogger(name: str):
-    if name in ETHENO_LOGGERS:
+def getLogger(name: Optional[str] = None):
+    if name is not None and name in ETHENO_LOGGERS:
         # TODO: Only enable this if Etheno was run as a standalone application
         ret = ETHENO_LOGGERS[name]
     else:
@@ -127,12 +127,24 @@ class EthenoLogger:
         parent: Optional["EthenoLogger"] = None,
         cleanup_empty: bool = False,
         displayname: Optional[str] = None,
+        namespace: Optional[str] = None,
     ):
-        if name in ETHENO_LOGGERS:
+        if parent is not None:
+            namespace = parent.namespace
+        # loggers in different namespaces (e.g., those of different Etheno instances) may share names
+        self.namespace: Optional[str] = namespace
+        self.name: str = name
+        if namespace is None:
+            qualified_name = name
+        else:
+            qualified_name = f"{namespace}.{name}"
+        if qualified_name in ETHENO_LOGGERS:
             raise Exception(
-                f"An EthenoLogger instance for name {name} already exists: {ETHENO_LOGGERS[name]}"
+                f"An EthenoLogger instance for name {qualified_name} already exists: "
+                f"{ETHENO_LOGGERS[qualified_name]}"
             )
-        ETHENO_LOGGERS[name] = self
+        ETHENO_LOGGERS[qualified_name] = self
+        self.qualified_name: str = qualified_name
         self._directory: Optional[str] = None
         self.parent: Optional[EthenoLogger] = parent
         self.cleanup_empty: bool = cleanup_empty
@@ -149,7 +161,10 @@ class EthenoLogger:
                 )
             log_level = parent.log_level
         self._log_level: int = log_level
-        self._logger: logging.Logger = _LOGGING_GETLOGGER(name)
+        self._logger: logging.Logger = _LOGGING_GETLOGGER(qualified_name)
+        # every EthenoLogger has its own handlers, so records must not also be handled by the loggers' ancestors
+        # (which, for namespaced loggers, include the namespace's logger)
+        self._logger.propagate = False
         self._handlers: List[logging.Handler] = [logging.StreamHandler()]
         if log_level is not None:
             self.log_level = log_level
@@ -168,6 +183,9 @@ class EthenoLogger:
     def close(self):
         for child in self.children:
             child.close()
+        if ETHENO_LOGGERS.get(self.qualified_name, None) is self:
+            # allow the name to be reused, e.g., by a new Etheno instance in the same namespace
+            del ETHENO_LOGGERS[self.qualified_name]
         if self.cleanup_empty:
             # first, check any files that handlers have created:
             for h in self._handlers:
@@ -365,11 +383,32 @@ class StreamLogger(threading.Thread):
         self.log: Callable[
             [logging.Logger, Union[str, bytes]], Any
         ] = lambda lgr, message: lgr.info(message)
+        self._line_listeners: List[Callable[[Optional[str]], Any]] = []
+
+    def add_line_listener(self, listener: Callable[[Optional[str]], Any]):
+        """Calls `listener` with each line that is read from the streams, and then with None once they are closed"""
+        self._line_listeners.append(listener)
+
+    def remove_line_listener(self, listener: Callable[[Optional[str]], Any]):
+        self._line_listeners.remove(listener)
+
+    def _notify(self, line: Optional[str]):
+        for listener in list(self._line_listeners):
+            try:
+                listener(line)
+            except Exception:
+                self.logger.exception(f"Error in line listener {listener!r}")
 
     def is_done(self) -> bool:
         return self._done
 
     def run(self):
+        try:
+            self._read_lines()
+        finally:
+            self._notify(None)
+
+    def _read_lines(self):
         while not self.is_done():
             while True:
                 got_byte = False
@@ -380,8 +419,11 @@ class StreamLogger(threading.Thread):
                             if isinstance(byte, str):
                                 byte = byte.encode("utf-8")
                             if byte == self._newline_char:
-                                self.log(self.logger, self._buffers[i].decode())
+                                line = self._buffers[i].decode()
                                 self._buffers[i] = b""
+                                self.log(self.logger, line)
+                                if self._line_listeners:
+                                    self._notify(line)
                             else:
                                 self._buffers[i] += byte
                             got_byte = True
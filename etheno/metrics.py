@@ -0,0 +1,280 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+# The default Prometheus client buckets, extended down to 1ms since most JSON RPC calls to a local client are fast
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+# The maximum number of distinct methods that are labeled by name; since clients choose the method of a request, later
+# methods are counted under `OTHER_METHOD` so that a client sending arbitrary method names cannot grow the label sets
+# (and so `/metrics`) without bound
+MAX_METHOD_LABELS = 256
+OTHER_METHOD = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    labels = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    if labels:
+        return "{%s}" % labels
+    return ""
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = Lock()
+
+    def inc(self, labels: LabelValues, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in values:
+            lines.append(
+                f"{self.name}{_format_labels(self.labels, labels)} {_format_float(value)}"
+            )
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str):
+        self.name: str = name
+        self.documentation: str = documentation
+        self._value: float = 0.0
+
+    def set(self, value: float):
+        # a single assignment, so no lock is needed
+        self._value = value
+
+    def value(self) -> float:
+        return self._value
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_format_float(self._value)}",
+        ]
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labels: Tuple[str, ...] = tuple(labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # maps label values to [per-bucket counts (the last being +Inf), sum, count]; counts are not cumulative until
+        # they are rendered, so that an observation only has to increment a single bucket
+        self._values: Dict[LabelValues, list] = {}
+        self._lock = Lock()
+
+    def observe(self, labels: LabelValues, value: float):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels, None)
+            if state is None:
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._values[labels] = state
+            state[0][bucket] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, labels: LabelValues) -> int:
+        with self._lock:
+            state = self._values.get(labels, None)
+            return 0 if state is None else state[2]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (labels, (list(state[0]), state[1], state[2]))
+                for labels, state in self._values.items()
+            )
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bucket_labels = self.labels + ("le",)
+        for labels, (buckets, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels, labels + (_format_float(bound),))} "
+                    f"{cumulative}"
+                )
+            label_str = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_float(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class Metrics:
+    """Request, error, and latency metrics for an Etheno instance, rendered in the Prometheus text exposition format.
+
+    Recording an observation costs a bucket bisection and a short critical section, so metrics are cheap enough to
+    leave enabled; set `Etheno.metrics` to None to disable them entirely.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.requests = Counter(
+            "etheno_requests_total",
+            "JSON RPC requests handled by Etheno",
+            ("method",),
+        )
+        self.request_errors = Counter(
+            "etheno_request_errors_total",
+            "JSON RPC requests for which the master client returned an error",
+            ("method",),
+        )
+        self.request_duration = Histogram(
+            "etheno_request_duration_seconds",
+            "Time to handle a JSON RPC request, including all clients and plugins",
+            ("method",),
+            buckets,
+        )
+        self.client_requests = Counter(
+            "etheno_client_requests_total",
+            "JSON RPC requests sent to each client",
+            ("client", "method"),
+        )
+        self.client_errors = Counter(
+            "etheno_client_errors_total",
+            "JSON RPC requests for which a client returned an error",
+            ("client", "method"),
+        )
+        self.client_duration = Histogram(
+            "etheno_client_request_duration_seconds",
+            "Round trip time of JSON RPC requests sent to each client",
+            ("client", "method"),
+            buckets,
+        )
+        self.plugin_duration = Histogram(
+            "etheno_plugin_hook_duration_seconds",
+            "Time spent in each plugin's before_post and after_post hooks",
+            ("plugin", "hook"),
+            buckets,
+        )
+
+        self.requests_in_flight = Gauge(
+            "etheno_requests_in_flight",
+            "JSON RPC requests admitted by admission control that are being handled",
+        )
+        self.requests_queued = Gauge(
+            "etheno_requests_queued",
+            "JSON RPC requests waiting in the admission control queue",
+        )
+        self.queue_duration = Histogram(
+            "etheno_request_queue_seconds",
+            "Time that admitted JSON RPC requests waited in the admission control queue",
+            (),
+            buckets,
+        )
+        self.requests_shed = Counter(
+            "etheno_requests_shed_total",
+            "JSON RPC requests rejected by admission control, because the queue was full or the request waited too "
+            "long",
+            ("reason",),
+        )
+        self._methods: Set[str] = set()
+        self._methods_lock = Lock()
+
+    def method_label(self, method) -> str:
+        """Returns the label for `method`: its name, or `OTHER_METHOD` once `MAX_METHOD_LABELS` have been seen"""
+        if not isinstance(method, str):
+            return OTHER_METHOD
+        if method in self._methods:
+            return method
+        with self._methods_lock:
+            if method in self._methods:
+                return method
+            elif len(self._methods) < MAX_METHOD_LABELS:
+                self._methods.add(method)
+                return method
+        return OTHER_METHOD
+
+    def observe_request(self, method: str, seconds: float, error: bool = False):
+        labels = (self.method_label(method),)
+        self.requests.inc(labels)
+        if error:
+            self.request_errors.inc(labels)
+        self.request_duration.observe(labels, seconds)
+
+    def observe_client(
+        self, client: str, method: str, seconds: float, error: bool = False
+    ):
+        labels = (client, self.method_label(method))
+        self.client_requests.inc(labels)
+        if error:
+            self.client_errors.inc(labels)
+        self.client_duration.observe(labels, seconds)
+
+    def observe_plugin(self, plugin: str, hook: str, seconds: float):
+        self.plugin_duration.observe((plugin, hook), seconds)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (
+            self.requests,
+            self.request_errors,
+            self.request_duration,
+            self.client_requests,
+            self.client_errors,
+            self.client_duration,
+            self.plugin_duration,
+            self.requests_in_flight,
+            self.requests_queued,
+            self.queue_duration,
+            self.requests_shed,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -2,12 +2,16 @@ import atexit
 import json
 import os
 import tempfile
+from typing import Optional
 
 from .client import JSONRPCError
+from .datadir import DatadirCache
 from .genesis import geth_to_parity
 from .jsonrpcclient import JSONRPCClient
-from .keyfile import create_keyfile_json
-from .utils import find_open_port, format_hex_address, int_to_bytes
+from .utils import PORTS, find_open_port, format_hex_address
+
+# The keys are only used for testing, and Parity has to run the KDF again to unlock each of them when it starts
+KEYFILE_KDF_PROFILE = "testing"
 
 
 def make_config(genesis_path, base_path, port, accounts, password_file, **kwargs):
@@ -94,7 +98,7 @@ color = true
 """.format(
         genesis_path=genesis_path,
         base_path=base_path,
-        port=find_open_port(30303),
+        port=kwargs.get("p2p_port", None) or find_open_port(30303),
         rpc_port=port,
         log_path=kwargs.get("log_path", "%s/parity.log" % base_path),
         chainId=kwargs.get("chainId", 1),
@@ -109,8 +113,13 @@ color = true
 
 
 class ParityClient(JSONRPCClient):
-    def __init__(self, genesis, port=8546):
-        super().__init__("Parity", genesis, port)
+    executable = "parity"
+    immutable_datadir_directories = ("keys",)
+
+    def __init__(
+        self, genesis, port=8546, datadir_cache: Optional[DatadirCache] = None
+    ):
+        super().__init__("Parity", genesis, port, datadir_cache=datadir_cache)
         self._unlock_accounts = True
 
         self.config = None
@@ -119,9 +128,11 @@ class ParityClient(JSONRPCClient):
 
     def etheno_set(self):
         super().etheno_set()
-        self.import_account(self.miner_account.private_key)
+        p2p_port = PORTS.reserve(30303)
+        self.port_reservations.append(p2p_port)
         self.config = self.logger.make_constant_logged_file(
             make_config(
+                p2p_port=p2p_port.port,
                 genesis_path=self.logger.to_log_path(self.genesis_file),
                 base_path=self.logger.to_log_path(self.datadir),
                 port=self.port,
@@ -133,6 +144,9 @@ class ParityClient(JSONRPCClient):
             suffix=".toml",
         )
 
+    def initialize_datadir(self):
+        self.import_account(self.miner_account.private_key)
+
     def write_passwords(self, outfile):
         outfile.write(b"etheno")
 
@@ -144,19 +158,28 @@ class ParityClient(JSONRPCClient):
         outfile.write(json.dumps(parity_genesis).encode("utf-8"))
 
     def import_account(self, private_key):
-        keyfile = create_keyfile_json(int_to_bytes(private_key), b"etheno")
-        keyfile_json = json.dumps(keyfile)
+        self.import_accounts((private_key,))
+
+    def import_accounts(self, private_keys):
+        from .keyfile import create_keyfiles_json
+
+        keyfiles = create_keyfiles_json(
+            [private_key.to_bytes(32, byteorder="big") for private_key in private_keys],
+            b"etheno",
+            profile=KEYFILE_KDF_PROFILE,
+        )
         keysdir = os.path.join(self.datadir, "keys", "etheno")
         os.makedirs(keysdir, exist_ok=True)
-        output = tempfile.NamedTemporaryFile(
-            prefix="account", suffix=".key", dir=keysdir, delete=False
-        )
-        try:
-            output.write(keyfile_json.encode("utf-8"))
-        finally:
-            output.close()
-        if self.log_directory is None:
-            self._tempfiles.append(output)
+        for keyfile in keyfiles:
+            output = tempfile.NamedTemporaryFile(
+                prefix="account", suffix=".key", dir=keysdir, delete=False
+            )
+            try:
+                output.write(json.dumps(keyfile).encode("utf-8"))
+            finally:
+                output.close()
+            if self.log_directory is None:
+                self._tempfiles.append(output)
 
     def unlock_account(self, account):
         addr = format_hex_address(account, True)
@@ -196,6 +219,6 @@ class ParityClient(JSONRPCClient):
             "--jsonrpc-apis=all",
         ]
 
-    def start(self, unlock_accounts=True):
+    def launch(self, unlock_accounts=True):
         self._unlock_accounts = unlock_accounts
-        super().start(unlock_accounts=unlock_accounts)
+        super().launch(unlock_accounts=unlock_accounts)
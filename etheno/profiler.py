@@ -0,0 +1,117 @@
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.01
+
+# Threads without an explicit name are named like "Thread-42 (process_request_thread)"; dropping the counter merges
+# the stacks of, e.g., all of werkzeug's per-request threads
+_NUMBERED_THREAD_NAME = re.compile(r"^Thread-\d+ \((.+)\)$")
+
+
+def thread_label(name: str) -> str:
+    match = _NUMBERED_THREAD_NAME.match(name)
+    if match is None:
+        return name
+    return match.group(1)
+
+
+class SamplingProfiler:
+    """A statistical profiler that periodically samples the stacks of all of Etheno's threads.
+
+    Each sample walks every thread's current frame (via `sys._current_frames`), so the profiled code is never
+    instrumented and the overhead is bounded by the sampling interval rather than by the amount of work being done.
+    Stacks are aggregated in the "folded" format used by flamegraph.pl, speedscope, and inferno: one line per unique
+    stack, with the thread name as the root frame, followed by the number of samples in which it was observed.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval: float = interval
+        self.samples: int = 0
+        self._stacks: Dict[Tuple[str, ...], int] = {}
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="EthenoProfiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code, None)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        """Records the current stack of every thread other than the profiler's own"""
+        own_ident = threading.get_ident()
+        names = {
+            thread.ident: thread_label(thread.name) for thread in threading.enumerate()
+        }
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"Thread-{ident}"))
+            stack.reverse()
+            stacks.append(tuple(stack))
+        with self._lock:
+            for stack in stacks:
+                self._stacks[stack] = self._stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def _run(self):
+        next_sample = time.monotonic()
+        while not self._stop.is_set():
+            self.sample()
+            next_sample += self.interval
+            delay = next_sample - time.monotonic()
+            if delay < 0:
+                # we fell behind (e.g., the process was suspended), so do not try to catch up
+                next_sample = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def folded(self) -> str:
+        """Returns the samples so far in the folded stack format"""
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(
+            "%s %d\n" % (";".join(frame.replace(";", ":") for frame in stack), count)
+            for stack, count in stacks
+        )
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf8") as f:
+            f.write(self.folded())
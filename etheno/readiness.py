@@ -0,0 +1,146 @@
+import errno
+import re
+import select
+import socket
+import threading
+import time
+from typing import Callable, List, Optional, Pattern, Sequence, Tuple, Union
+
+from .logger import StreamLogger
+
+# How long to wait between connection probes; the delay doubles after each failed probe, up to the maximum
+MIN_PROBE_INTERVAL = 0.05
+MAX_PROBE_INTERVAL = 1.0
+
+
+Address = Tuple[int, tuple]
+
+
+def resolve(host: str, port: int) -> List[Address]:
+    """Returns the address family and socket address of each TCP address of `host`, or an empty list if it is unknown"""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return []
+    return [(family, sockaddr) for family, _, _, _, sockaddr in infos]
+
+
+def probe_address(family: int, sockaddr: tuple, timeout: float = 0.05) -> bool:
+    """Returns whether something is accepting connections on `sockaddr`, waiting at most `timeout` seconds"""
+    try:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+    except OSError:
+        return False
+    try:
+        sock.setblocking(False)
+        err = sock.connect_ex(sockaddr)
+        if err in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY):
+            _, writable, _ = select.select((), (sock,), (), timeout)
+            if not writable:
+                return False
+            err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        return err == 0
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def probe_port(
+    host: str,
+    port: int,
+    timeout: float = 0.05,
+    addresses: Optional[Sequence[Address]] = None,
+) -> bool:
+    """Returns whether something is accepting connections on `port` at any of `host`'s addresses (IPv4 or IPv6),
+    waiting at most `timeout` seconds for each address to find out. `addresses` skips resolving `host` again."""
+    if addresses is None:
+        addresses = resolve(host, port)
+    return any(
+        probe_address(family, sockaddr, timeout) for family, sockaddr in addresses
+    )
+
+
+class ReadinessMonitor:
+    """Detects when a client has started listening for JSON RPC requests.
+
+    A client is ready once it prints a line matching one of `patterns` (e.g., geth's "HTTP server started") or a probe
+    finds its port accepting connections. Lines are read from the client's `StreamLogger` as they are printed, so
+    waiters are woken as soon as the client reports that it is ready; between lines, the port is probed with an
+    exponential backoff. `ready` is the event that is set once the client is ready, and waiting stops early if
+    `is_done` reports that the client's process has exited.
+    """
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        patterns: Sequence[Union[str, Pattern]] = (),
+        instance: Optional[StreamLogger] = None,
+        is_done: Optional[Callable[[], bool]] = None,
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        # resolved on the first probe, and again until the host resolves (e.g., a container that is still starting)
+        self._addresses: List[Address] = []
+        self.ready = threading.Event()
+        self._changed = threading.Event()
+        self._stream_closed: bool = False
+        if is_done is None and instance is not None:
+            is_done = instance.is_done
+        self._is_done: Optional[Callable[[], bool]] = is_done
+        if instance is not None:
+            instance.add_line_listener(self._on_line)
+
+    def _on_line(self, line: Optional[str]):
+        if line is None:
+            self._stream_closed = True
+        elif any(pattern.search(line) for pattern in self.patterns):
+            self.ready.set()
+        self._changed.set()
+
+    @property
+    def exited(self) -> bool:
+        """Whether the client's process has exited"""
+        return self._stream_closed or (self._is_done is not None and self._is_done())
+
+    def probe(self) -> bool:
+        if self.ready.is_set():
+            return True
+        if not self._addresses:
+            self._addresses = resolve(self.host, self.port)
+        if probe_port(self.host, self.port, addresses=self._addresses):
+            self.ready.set()
+            return True
+        return False
+
+    def wait(
+        self,
+        timeout: Optional[float] = None,
+        on_waiting: Optional[Callable[[float], None]] = None,
+    ) -> bool:
+        """Blocks until the client is ready, returning False if it exits or `timeout` seconds pass first.
+
+        If provided, `on_waiting` is called about every five seconds with the number of seconds waited so far.
+        """
+        started = time.monotonic()
+        next_report = 5.0
+        interval = MIN_PROBE_INTERVAL
+        while not self.probe():
+            if self.exited:
+                # it may have started listening before the process that launched it exited
+                return self.probe()
+            waited = time.monotonic() - started
+            if timeout is not None and waited >= timeout:
+                return False
+            if on_waiting is not None and waited >= next_report:
+                on_waiting(waited)
+                next_report += 5.0
+            delay = interval
+            if timeout is not None:
+                delay = min(delay, timeout - waited)
+            self._changed.wait(delay)
+            self._changed.clear()
+            interval = min(interval * 2, MAX_PROBE_INTERVAL)
+        return True
@@ -0,0 +1,148 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .client import SelfPostingClient
+
+DEFAULT_INTERVAL = 1.0
+
+
+class _TrackedTransaction:
+    def __init__(self, master_receipt: Dict[str, Any]):
+        self.master_receipt: Dict[str, Any] = master_receipt
+        # the receipt from each client that has been checked, or None if the client has not mined it yet
+        self.receipts: Dict[SelfPostingClient, Optional[Dict[str, Any]]] = {}
+
+    @property
+    def pending(self) -> bool:
+        return any(receipt is None for receipt in self.receipts.values())
+
+
+class ReceiptTracker:
+    """Tracks transactions that the master client has mined until every other client has mined them, too.
+
+    This is what lets Etheno answer `eth_getTransactionReceipt` without blocking: a receipt is only returned once all
+    clients have mined the transaction, and until then the request gets a null receipt, as though the transaction were
+    still pending. Rather than a request thread sleeping for each pending receipt, all of the clients that have not
+    mined a transaction yet are kept in one table, which a single thread polls every `interval` seconds. Requests for
+    a receipt only read the table, except the first, which checks each client once so that transactions that are
+    mined immediately (e.g., by Ganache) are returned without delay.
+    """
+
+    def __init__(
+        self,
+        etheno,
+        interval: float = DEFAULT_INTERVAL,
+        max_transactions: int = 10000,
+    ):
+        self.etheno = etheno
+        self.interval: float = interval
+        self.max_transactions: int = max_transactions
+        # transactions by the master client's transaction hash, in the order they were first requested
+        self._transactions: Dict[str, _TrackedTransaction] = {}
+        self._lock = threading.Lock()
+        # notified whenever a receipt is recorded or a transaction is forgotten
+        self._changed = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(
+        self, tx_hash: str, client: SelfPostingClient
+    ) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Returns whether `client` is being tracked for the transaction, and its receipt if it has mined it"""
+        with self._lock:
+            transaction = self._transactions.get(tx_hash, None)
+            if transaction is None or client not in transaction.receipts:
+                return False, None
+            return True, transaction.receipts[client]
+
+    def track(
+        self,
+        tx_hash: str,
+        client: SelfPostingClient,
+        master_receipt: Dict[str, Any],
+        receipt: Optional[Dict[str, Any]],
+    ):
+        """Records the result of checking `client` for the transaction, and keeps polling it if it was not mined"""
+        with self._lock:
+            transaction = self._transactions.get(tx_hash, None)
+            if transaction is None:
+                while len(self._transactions) >= self.max_transactions:
+                    # forget the oldest transaction; if it is requested again, its clients are simply checked again
+                    del self._transactions[next(iter(self._transactions))]
+                transaction = _TrackedTransaction(master_receipt)
+                self._transactions[tx_hash] = transaction
+            transaction.receipts[client] = receipt
+            self._changed.notify_all()
+            if receipt is None and self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="EthenoReceiptTracker", daemon=True
+                )
+                self._thread.start()
+
+    def pending(self, tx_hash: str) -> bool:
+        """Returns whether any client has yet to mine the transaction"""
+        with self._lock:
+            transaction = self._transactions.get(tx_hash, None)
+            return transaction is not None and transaction.pending
+
+    def wait(self, tx_hash: str, timeout: Optional[float] = None) -> bool:
+        """Blocks until no client has yet to mine the transaction, returning False if `timeout` seconds pass first"""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: self._stop.is_set()
+                or tx_hash not in self._transactions
+                or not self._transactions[tx_hash].pending,
+                timeout,
+            )
+
+    def forget(self, tx_hash: str):
+        with self._lock:
+            self._transactions.pop(tx_hash, None)
+            self._changed.notify_all()
+
+    def poll(self):
+        """Checks each client that has not mined a tracked transaction yet"""
+        with self._lock:
+            pending = [
+                (tx_hash, transaction.master_receipt, client)
+                for tx_hash, transaction in self._transactions.items()
+                for client, receipt in transaction.receipts.items()
+                if receipt is None
+            ]
+        for tx_hash, master_receipt, client in pending:
+            if self._stop.is_set():
+                return
+            # the chain synchronizer compares the client's receipt to the master client's
+            self.etheno.rpc_client_result = master_receipt
+            try:
+                receipt = client.transaction_mined(tx_hash)
+            except Exception as e:
+                self.etheno.logger.warning(
+                    f"Error checking whether {client} mined transaction {tx_hash}: {e!r}"
+                )
+                continue
+            if receipt is None:
+                continue
+            with self._lock:
+                transaction = self._transactions.get(tx_hash, None)
+                if transaction is not None and client in transaction.receipts:
+                    transaction.receipts[client] = receipt
+                    self._changed.notify_all()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+            with self._lock:
+                if not any(
+                    transaction.pending for transaction in self._transactions.values()
+                ):
+                    self._thread = None
+                    return
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._changed.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
@@ -0,0 +1,418 @@
+import argparse
+import copy
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from . import logger
+from .capture import MAGIC, CaptureReader
+from .client import JSONRPCError, RpcHttpProxy, RpcProxyClient
+from .jsonrpc import read_json_entries
+from .synchronization import AddressSynchronizingClient, _decode_value, _remap_params
+from .utils import percentile
+
+TRANSACTION_METHODS = ("eth_sendTransaction", "eth_sendRawTransaction")
+
+
+class CapturedCall:
+    def __init__(
+        self,
+        request: Dict[str, Any],
+        results: List[Any],
+        timestamp: Optional[float] = None,
+    ):
+        self.request: Dict[str, Any] = request
+        self.results: List[Any] = results
+        self.timestamp: Optional[float] = timestamp
+
+    @property
+    def recorded_result(self) -> Optional[Dict[str, Any]]:
+        """The result that the master client returned when the call was captured"""
+        if self.results and isinstance(self.results[0], dict):
+            return self.results[0]
+        return None
+
+
+def read_capture(path: str) -> Iterator[CapturedCall]:
+    """Streams the calls from a capture, which may be an `rpc.json` style export or an indexed binary capture"""
+    with open(path, "rb") as f:
+        is_binary_capture = f.read(len(MAGIC)) == MAGIC
+    if is_binary_capture:
+        with CaptureReader(path) as reader:
+            for record in reader:
+                yield CapturedCall(
+                    record["request"], record["results"], record["timestamp"]
+                )
+    else:
+        for entry in read_json_entries(path):
+            # exports from older versions of Etheno have no timestamp
+            timestamp = entry[2] if len(entry) > 2 else None
+            yield CapturedCall(entry[0], entry[1], timestamp)
+
+
+def is_error(result) -> bool:
+    return (
+        result is None
+        or isinstance(result, JSONRPCError)
+        or (isinstance(result, dict) and "error" in result)
+    )
+
+
+class ReplayReport:
+    def __init__(self):
+        self.calls: int = 0
+        self.errors: int = 0
+        self.divergences: int = 0
+        self.remapped: int = 0
+        self.elapsed: float = 0.0
+        self.latencies: Dict[str, List[float]] = {}
+
+    def add(self, method: str, latency: float):
+        self.calls += 1
+        self.latencies.setdefault(method, []).append(latency)
+
+    @staticmethod
+    def _summarize(latencies: List[float]) -> Dict[str, Optional[float]]:
+        latencies = sorted(latencies)
+        return {
+            "count": len(latencies),
+            "p50_ms": _to_ms(percentile(latencies, 50)),
+            "p90_ms": _to_ms(percentile(latencies, 90)),
+            "p99_ms": _to_ms(percentile(latencies, 99)),
+            "max_ms": _to_ms(latencies[-1] if latencies else None),
+        }
+
+    @property
+    def throughput(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.calls / self.elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "divergences": self.divergences,
+            "remapped_identifiers": self.remapped,
+            "elapsed_seconds": self.elapsed,
+            "requests_per_second": self.throughput,
+            "latency": self._summarize(
+                [latency for values in self.latencies.values() for latency in values]
+            ),
+            "methods": {
+                method: self._summarize(values)
+                for method, values in sorted(self.latencies.items())
+            },
+        }
+
+    def __str__(self):
+        summary = self.to_dict()
+        ret = (
+            f"Replayed {self.calls} calls in {self.elapsed:.3f}s ({self.throughput:.1f} requests/s) with "
+            f"{self.errors} errors and {self.divergences} calls whose success differed from the capture\n"
+        )
+        ret += "    %-40s %8s %10s %10s %10s\n" % (
+            "method",
+            "count",
+            "p50 ms",
+            "p99 ms",
+            "max ms",
+        )
+        for method, stats in list(summary["methods"].items()) + [
+            ("TOTAL", summary["latency"])
+        ]:
+            ret += "    %-40s %8d %10.3f %10.3f %10.3f\n" % (
+                method,
+                stats["count"],
+                stats["p50_ms"] or 0.0,
+                stats["p99_ms"] or 0.0,
+                stats["max_ms"] or 0.0,
+            )
+        return ret
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    if seconds is None:
+        return None
+    return seconds * 1000.0
+
+
+class ReplayEngine:
+    def __init__(
+        self,
+        post: Callable[[Dict[str, Any]], Any],
+        speed: float = 0.0,
+        remap: bool = True,
+        wait_for_receipts: bool = True,
+        receipt_timeout: float = 60.0,
+        parent_logger: Optional[logger.EthenoLogger] = None,
+    ):
+        """
+        :param post: the function to which to send each request, such as `Etheno.post` or `RpcHttpProxy.post`
+        :param speed: a time compression factor (e.g., 10.0 replays ten times faster than the calls were captured);
+        0 replays as fast as possible. If it is not 0, `replay` raises a `ValueError` for a call without a timestamp.
+        :param remap: whether to replace transaction hashes, contract addresses, and filter IDs from the capture
+        with the fresh values returned during the replay
+        :param wait_for_receipts: whether to poll for a transaction receipt that was available in the capture but
+        is not available yet during the replay
+        """
+        self.post = post
+        self.speed: float = speed
+        self.remap: bool = remap
+        self.wait_for_receipts: bool = wait_for_receipts
+        self.receipt_timeout: float = receipt_timeout
+        self.mapping: Dict[int, int] = {}
+        self.filter_mapping: Dict[str, str] = {}
+        self.remapped_count: int = 0
+        if parent_logger is None:
+            self.logger = logger.EthenoLogger("Replay", log_level=logger.INFO)
+        else:
+            self.logger = logger.EthenoLogger("Replay", parent=parent_logger)
+
+    def _remap_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if "params" not in request or not (self.mapping or self.filter_mapping):
+            return request
+        request = dict(request)
+        method = request["method"]
+        request["params"] = _remap_params(
+            self,
+            copy.deepcopy(request["params"]),
+            self.mapping,
+            method,
+            remap_data=True,
+        )
+        if (
+            ("filter" in method.lower() and "get" in method.lower())
+            or method == "eth_uninstallFilter"
+        ) and request["params"]:
+            old_id = request["params"][0]
+            if old_id in self.filter_mapping:
+                request["params"] = [self.filter_mapping[old_id]] + request["params"][
+                    1:
+                ]
+        return request
+
+    def _record_mapping(self, recorded, fresh):
+        old_decoded = _decode_value(recorded)
+        new_decoded = _decode_value(fresh)
+        if (
+            old_decoded is not None
+            and new_decoded is not None
+            and old_decoded != new_decoded
+        ):
+            self.logger.debug("Mapping %x to %x" % (old_decoded, new_decoded))
+            self.mapping[old_decoded] = new_decoded
+            self.remapped_count += 1
+
+    def _update_mappings(
+        self, method: str, recorded: Dict[str, Any], fresh: Dict[str, Any]
+    ):
+        recorded_result = recorded.get("result", None)
+        fresh_result = fresh.get("result", None)
+        if recorded_result is None or fresh_result is None:
+            return
+        if method in TRANSACTION_METHODS:
+            self._record_mapping(recorded_result, fresh_result)
+        elif method == "eth_getTransactionReceipt":
+            if isinstance(recorded_result, dict) and isinstance(fresh_result, dict):
+                recorded_address = recorded_result.get("contractAddress", None)
+                fresh_address = fresh_result.get("contractAddress", None)
+                if recorded_address and fresh_address:
+                    self._record_mapping(recorded_address, fresh_address)
+        elif "filter" in method.lower() and "new" in method.lower():
+            if recorded_result != fresh_result:
+                self.filter_mapping[recorded_result] = fresh_result
+                self.remapped_count += 1
+
+    def _post(self, request: Dict[str, Any], recorded: Optional[Dict[str, Any]]):
+        ret = self.post(request)
+        if (
+            self.wait_for_receipts
+            and request["method"] == "eth_getTransactionReceipt"
+            and recorded is not None
+            and recorded.get("result", None)
+        ):
+            deadline = time.monotonic() + self.receipt_timeout
+            while (
+                isinstance(ret, dict)
+                and ret.get("result", 0) is None
+                and time.monotonic() < deadline
+            ):
+                time.sleep(0.05)
+                ret = self.post(request)
+        return ret
+
+    def replay(
+        self, calls: Iterable[CapturedCall], limit: Optional[int] = None
+    ) -> ReplayReport:
+        report = ReplayReport()
+        self.remapped_count = 0
+        first_timestamp: Optional[float] = None
+        start = time.perf_counter()
+        for i, call in enumerate(calls):
+            if limit is not None and i >= limit:
+                break
+            if self.speed > 0:
+                if call.timestamp is None:
+                    raise ValueError(
+                        f"Call #{i} has no timestamp, so it cannot be replayed at a speed; only exports and captures "
+                        "from this version of Etheno record timestamps"
+                    )
+                if first_timestamp is None:
+                    first_timestamp = call.timestamp
+                delay = (call.timestamp - first_timestamp) / self.speed - (
+                    time.perf_counter() - start
+                )
+                if delay > 0:
+                    time.sleep(delay)
+            request = call.request
+            if self.remap:
+                request = self._remap_request(request)
+            recorded = call.recorded_result
+            call_start = time.perf_counter()
+            try:
+                ret = self._post(request, recorded)
+            except JSONRPCError as e:
+                ret = e
+            report.add(request["method"], time.perf_counter() - call_start)
+            if isinstance(ret, JSONRPCError):
+                ret = ret.result
+            if is_error(ret):
+                report.errors += 1
+            if recorded is not None and is_error(recorded) != is_error(ret):
+                report.divergences += 1
+                self.logger.warning(
+                    f"Call #{i} {request} returned {ret} but the capture recorded {recorded}"
+                )
+            if self.remap and recorded is not None and isinstance(ret, dict):
+                self._update_mappings(request["method"], recorded, ret)
+        report.elapsed = time.perf_counter() - start
+        report.remapped = self.remapped_count
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="etheno replay",
+        description="Replays a JSON RPC capture recorded by Etheno (`rpc.json`, `--dump-jsonrpc`, or `--capture`) "
+        "either through Etheno's multiplexer or directly to a JSON RPC client.",
+    )
+    parser.add_argument(
+        "capture",
+        type=str,
+        help="Path to the capture to replay",
+    )
+    parser.add_argument(
+        "client",
+        type=str,
+        nargs="*",
+        help="JSON RPC client URLs to multiplex the replay to; the first is used as the master unless --master "
+        "is provided",
+    )
+    parser.add_argument(
+        "-s",
+        "--master",
+        type=str,
+        default=None,
+        help="A JSON RPC client to use as the master",
+    )
+    parser.add_argument(
+        "--direct",
+        type=str,
+        default=None,
+        help="Send the replayed calls straight to this JSON RPC URL (such as a running Etheno instance) rather "
+        "than through an in-process Etheno multiplexer",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="Time compression factor relative to the capture's timestamps (exports from older versions of Etheno "
+        "do not record timestamps and cannot be replayed at a speed); 0 replays as fast as possible (default=0)",
+    )
+    parser.add_argument(
+        "--no-remap",
+        action="store_false",
+        dest="remap",
+        default=True,
+        help="Do not replace transaction hashes, contract addresses, and filter IDs from the capture with the "
+        "values returned during the replay",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only replay the first LIMIT calls",
+    )
+    parser.add_argument(
+        "--differential",
+        action="store_true",
+        default=False,
+        help="Run differential testing on the clients while replaying",
+    )
+    parser.add_argument(
+        "--log-dir",
+        type=str,
+        default=None,
+        help="Path to a directory in which to save all log output",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        help="Path to which to save a machine-readable JSON report of the replay; `-` prints it to STDOUT",
+    )
+
+    if argv is None:
+        argv = sys.argv
+
+    args = parser.parse_args(argv[1:])
+
+    from .etheno import ETHENO
+
+    if args.log_dir:
+        ETHENO.logger.save_to_directory(args.log_dir)
+
+    if args.direct is not None:
+        if args.master or args.client:
+            parser.error("--direct cannot be combined with --master or client URLs")
+        post = RpcHttpProxy(args.direct).post
+    else:
+        clients = list(args.client)
+        if args.master is None:
+            if not clients:
+                parser.error(
+                    "Either --direct, --master, or at least one client URL is required"
+                )
+            args.master = clients.pop(0)
+        ETHENO.master_client = AddressSynchronizingClient(RpcProxyClient(args.master))
+        for client in clients:
+            ETHENO.add_client(AddressSynchronizingClient(RpcProxyClient(client)))
+        if args.differential and clients:
+            from .differentials import DifferentialTester
+
+            ETHENO.add_plugin(DifferentialTester())
+        post = ETHENO.post
+
+    engine = ReplayEngine(
+        post, speed=args.speed, remap=args.remap, parent_logger=ETHENO.logger
+    )
+    try:
+        report = engine.replay(read_capture(args.capture), limit=args.limit)
+    except ValueError as e:
+        engine.logger.error(str(e))
+        return 1
+    finally:
+        if args.direct is None:
+            for plugin in ETHENO.plugins:
+                plugin.shutdown()
+    engine.logger.info(str(report))
+
+    if args.report == "-":
+        print(json.dumps(report.to_dict(), indent=2))
+    elif args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+    return 0 if report.divergences == 0 else 1
@@ -1,3 +1,4 @@
+import os
 import signal
 
 
@@ -16,3 +17,22 @@ def add_handler(signal_type, handler):
 
 def add_sigint_handler(handler):
     add_handler(signal.SIGINT, handler)
+
+
+def add_termination_handler(handler):
+    """
+    Calls `handler` when the process receives SIGTERM or SIGHUP, before the signal's previous disposition takes effect.
+    Unlike `add_handler`, a default disposition is preserved, so the process still terminates afterward.
+    """
+    for signal_type in (signal.SIGTERM, signal.SIGHUP):
+        current_handler = signal.getsignal(signal_type)
+
+        def new_handler(sig_type, frame, current_handler=current_handler):
+            handler(sig_type, frame)
+            if current_handler == signal.SIG_DFL or current_handler is None:
+                signal.signal(sig_type, signal.SIG_DFL)
+                os.kill(os.getpid(), sig_type)
+            elif current_handler != signal.SIG_IGN:
+                current_handler(sig_type, frame)
+
+        signal.signal(signal_type, new_handler)
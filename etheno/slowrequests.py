@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .client import JSONRPCError
+from .etheno import EthenoPlugin
+from .jsonrpc import json_default
+from . import tracing
+
+# (client, seconds, result) for the master client and each secondary client, in the order they were called
+ClientTimings = List[Tuple[Any, float, Any]]
+
+
+def _result_size(result) -> Optional[int]:
+    if result is None:
+        return None
+    return len(json.dumps(result, default=json_default))
+
+
+class SlowRequestJournal(EthenoPlugin):
+    """Keeps the slowest requests and saves each one that exceeds a threshold to the log directory.
+
+    Only requests that take at least `threshold` seconds are considered. Of those, the slowest `capacity` requests
+    in the last `window` seconds are kept, each with the full request, the time taken by each client, and the size of
+    each client's result. A request is saved to `SlowRequestJournal/slow_<method>.json` in the log directory (if there
+    is one) when it enters the slowest requests, and deleted once it is no longer one of them, so there are at most
+    `capacity` such files; the slowest requests are saved to `slowest.json` when the journal is finalized.
+    """
+
+    def __init__(self, threshold: float, capacity: int = 20, window: float = 300.0):
+        self.threshold: float = threshold
+        self.capacity: int = capacity
+        self.window: float = window
+        # a min-heap of (seconds, sequence number, entry), so the fastest of the slowest requests is evicted first
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        # the files saved for the slowest requests, by sequence number, and the files of requests that have since
+        # been evicted, which are deleted so that there are never more than `capacity` of them
+        self._files: Dict[int, str] = {}
+        self._stale_files: List[str] = []
+
+    def added(self):
+        self.etheno.slow_requests = self
+
+    def shutdown(self):
+        super().shutdown()
+        if self.etheno is not None and self.etheno.slow_requests is self:
+            self.etheno.slow_requests = None
+
+    def _expire(self, now: float):
+        if self._slowest and any(
+            now - entry["received"] > self.window for _, _, entry in self._slowest
+        ):
+            kept = []
+            for item in self._slowest:
+                if now - item[2]["received"] <= self.window:
+                    kept.append(item)
+                else:
+                    self._evict(item)
+            self._slowest = kept
+            heapq.heapify(self._slowest)
+
+    def _evict(self, item: Tuple[float, int, Dict[str, Any]]):
+        """Marks the file saved for a request that is no longer one of the slowest to be deleted; must be called with
+        the lock held"""
+        path = self._files.pop(item[1], None)
+        if path is not None:
+            self._stale_files.append(path)
+
+    def _delete_stale_files(self):
+        with self._lock:
+            stale, self._stale_files = self._stale_files, []
+        for path in stale:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _admits(self, seconds: float, now: float) -> bool:
+        """Whether a request that took `seconds` is one of the slowest; must be called with the lock held"""
+        self._expire(now)
+        return len(self._slowest) < self.capacity or seconds > self._slowest[0][0]
+
+    def observe(
+        self, data: Dict[str, Any], seconds: float, timings: Optional[ClientTimings]
+    ):
+        """Called by Etheno after handling each request"""
+        if seconds < self.threshold:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._admits(seconds, now):
+                return
+        # serializing the results to measure them can take a while, so it is done without holding the lock, and only
+        # for requests that are slow enough to be kept
+        entry = {
+            "received": now - seconds,
+            "method": data.get("method", None),
+            "duration_ms": seconds * 1000.0,
+            "trace_id": tracing.current_trace_id(),
+            "request": data,
+            "clients": [
+                {
+                    "client": str(client),
+                    "duration_ms": client_seconds * 1000.0,
+                    "error": isinstance(result, JSONRPCError),
+                    "result_bytes": _result_size(result),
+                }
+                for client, client_seconds, result in timings or ()
+            ],
+        }
+        with self._lock:
+            # a slower request may have been kept in the meantime
+            if not self._admits(seconds, now):
+                return
+            sequence = next(self._sequence)
+            item = (seconds, sequence, entry)
+            if len(self._slowest) >= self.capacity:
+                self._evict(heapq.heapreplace(self._slowest, item))
+            else:
+                heapq.heappush(self._slowest, item)
+        self.logger.warning(
+            f"{entry['method']} took {entry['duration_ms']:.1f}ms: "
+            + ", ".join(
+                f"{c['client']} {c['duration_ms']:.1f}ms" for c in entry["clients"]
+            )
+        )
+        if self.etheno.logger.directory is not None:
+            path = self.logger.make_constant_logged_file(
+                json.dumps(entry, indent=2, default=json_default),
+                prefix=f"slow_{re.sub(r'[^A-Za-z0-9_]', '_', str(entry['method']))}",
+                suffix=".json",
+            )
+            with self._lock:
+                if any(kept == sequence for _, kept, _ in self._slowest):
+                    self._files[sequence] = path
+                else:
+                    # it was evicted while it was being saved
+                    self._stale_files.append(path)
+            self.logger.debug(f"Saved slow request to {path}")
+        self._delete_stale_files()
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        """Returns the slowest requests in the current window, slowest first"""
+        with self._lock:
+            self._expire(time.time())
+            return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def finalize(self):
+        if self.etheno is None or self.etheno.logger.directory is None:
+            return
+        slowest = self.slowest()
+        if not slowest:
+            return
+        # finalize can be called more than once, so overwrite the previous summary
+        path = os.path.join(self.log_directory, "slowest.json")
+        with open(path, "w") as f:
+            json.dump(slowest, f, indent=2, default=json_default)
+        self.logger.info(f"Saved the {len(slowest)} slowest requests to {path}")
@@ -0,0 +1,98 @@
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+
+from . import logger
+from .client import EthenoClient
+from .utils import PortReservation
+
+
+class _ManagedClient:
+    def __init__(
+        self,
+        client: EthenoClient,
+        launch: Callable[[], None],
+        prepare: Optional[Callable[[], None]] = None,
+        reservations: Sequence[PortReservation] = (),
+    ):
+        self.client: EthenoClient = client
+        self.launch: Callable[[], None] = launch
+        self.prepare: Optional[Callable[[], None]] = prepare
+        self.reservations: Sequence[PortReservation] = reservations
+        self.error: Optional[BaseException] = None
+        self.duration: float = 0.0
+
+    def run(self):
+        start_time = time.monotonic()
+        try:
+            if self.prepare is not None:
+                self.prepare()
+            for reservation in self.reservations:
+                reservation.unbind()
+            self.launch()
+            self.client.wait_until_running()
+        except BaseException as e:
+            self.error = e
+        finally:
+            # the client has bound its ports by now (or failed to start)
+            for reservation in self.reservations:
+                reservation.release()
+            self.duration = time.monotonic() - start_time
+
+
+class StartupOrchestrator:
+    """Starts all of the clients that Etheno runs itself (Ganache, Geth, and Parity) at the same time.
+
+    Each client is prepared (e.g., its datadir is initialized and its accounts are imported), launched, and waited on
+    until it is running on its own thread, so the total startup time is that of the slowest client rather than the sum
+    of all of them. If any client fails to start, the others are shut down and the first error is raised.
+    """
+
+    def __init__(self, log: Optional[logger.EthenoLogger] = None):
+        self.logger: Optional[logger.EthenoLogger] = log
+        self._clients: List[_ManagedClient] = []
+
+    def add(
+        self,
+        client: EthenoClient,
+        launch: Callable[[], None],
+        prepare: Optional[Callable[[], None]] = None,
+        reservations: Sequence[PortReservation] = (),
+    ):
+        """Adds a client to start: `prepare` and then `launch` are called, followed by `client.wait_until_running`.
+
+        `reservations` are the ports reserved for the client, which are unbound just before it is launched and released
+        once it is running.
+        """
+        self._clients.append(_ManagedClient(client, launch, prepare, reservations))
+
+    def start(self):
+        """Starts all of the clients, and blocks until they are all running"""
+        clients, self._clients = self._clients, []
+        if not clients:
+            return
+        threads = [
+            threading.Thread(
+                target=managed.run,
+                name=f"EthenoStartup({managed.client.short_name})",
+                daemon=True,
+            )
+            for managed in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failed = [managed for managed in clients if managed.error is not None]
+        if failed:
+            for managed in clients:
+                try:
+                    managed.client.shutdown()
+                except Exception:
+                    pass
+            raise failed[0].error
+        if self.logger is not None:
+            for managed in clients:
+                self.logger.debug(
+                    f"Started {managed.client.short_name} in {managed.duration:.2f}s"
+                )
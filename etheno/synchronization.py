@@ -1,8 +1,6 @@
+import asyncio
 import time
 
-import eth_utils
-from web3.auto import w3
-
 from .client import (
     EthenoClient,
     SelfPostingClient,
@@ -12,6 +10,7 @@ from .client import (
     QUANTITY,
     transaction_receipt_succeeded,
 )
+from . import tracing
 from .utils import decode_hex, format_hex_address, int_to_bytes
 
 
@@ -72,6 +71,41 @@ def _remap_params(client, params, mapping, method, remap_data=False):
     return params
 
 
+class _Sleep:
+    def __init__(self, seconds: float):
+        self.seconds: float = seconds
+
+
+def _run_steps(steps, post):
+    """Runs a `ChainSynchronizer._synchronize` generator, posting its requests with `post`"""
+    try:
+        step = next(steps)
+        while True:
+            if isinstance(step, _Sleep):
+                with tracing.span("sleep", seconds=step.seconds):
+                    time.sleep(step.seconds)
+                step = next(steps)
+            else:
+                step = steps.send(post(step))
+    except StopIteration as e:
+        return e.value
+
+
+async def _arun_steps(steps, apost):
+    """Runs a `ChainSynchronizer._synchronize` generator, posting its requests with the coroutine `apost`"""
+    try:
+        step = next(steps)
+        while True:
+            if isinstance(step, _Sleep):
+                with tracing.span("sleep", seconds=step.seconds):
+                    await asyncio.sleep(step.seconds)
+                step = next(steps)
+            else:
+                step = steps.send(await apost(step))
+    except StopIteration as e:
+        return e.value
+
+
 class ChainSynchronizer(object):
     def __init__(self, client):
         if not isinstance(client, SelfPostingClient):
@@ -81,7 +115,13 @@ class ChainSynchronizer(object):
         self.mapping = {}
         self.filter_mapping = {}
         self._old_post = getattr(client, "post")
+        # the client's coroutine equivalent of `post`, if it has one
+        self._old_apost = getattr(client, "apost") if client.supports_async else None
         self._old_create_account = getattr(client, "create_account")
+        self._old_transaction_mined = getattr(client, "transaction_mined")
+        self._old_atransaction_mined = (
+            getattr(client, "atransaction_mined") if client.supports_async else None
+        )
         self._client = client
 
     def create_account(self, balance=0, address=None):
@@ -99,8 +139,41 @@ class ChainSynchronizer(object):
         return new_address
 
     def post(self, data, *args, **kwargs):
+        return _run_steps(
+            self._synchronize(data),
+            lambda request: self._old_post(request, *args, **kwargs),
+        )
+
+    async def apost(self, data):
+        """The coroutine equivalent of `post`, which is only installed if the client supports `apost`"""
+        return await _arun_steps(self._synchronize(data), self._old_apost)
+
+    def transaction_mined(self, tx_hash):
+        """Checks whether this client has mined the transaction with the master client's hash `tx_hash`, without
+        waiting; the master client's receipt for the transaction must be the current `rpc_client_result`"""
+        if self._client == self._client.etheno.master_client:
+            return self._old_transaction_mined(tx_hash)
+        request = self._client.etheno.get_transaction_receipt_request(tx_hash)
+        return _run_steps(self._synchronize(request, wait=False), self._old_post)
+
+    async def atransaction_mined(self, tx_hash):
+        """The coroutine equivalent of `transaction_mined`, which is only installed if the client supports `apost`"""
         if self._client == self._client.etheno.master_client:
-            return self._old_post(data, *args, **kwargs)
+            return await self._old_atransaction_mined(tx_hash)
+        request = self._client.etheno.get_transaction_receipt_request(tx_hash)
+        return await _arun_steps(
+            self._synchronize(request, wait=False), self._old_apost
+        )
+
+    def _synchronize(self, data, wait: bool = True):
+        """Synchronizes a request with the master client's chain, independent of how requests are sent.
+
+        This is a generator that yields each request that should be posted to the client (and is sent back the
+        response), or a `_Sleep` for the caller to wait; it returns the final response. If `wait` is False, it returns
+        None rather than waiting for this client to mine a transaction whose receipt is requested.
+        """
+        if self._client == self._client.etheno.master_client:
+            return (yield data)
 
         method = data["method"]
 
@@ -112,13 +185,14 @@ class ChainSynchronizer(object):
             elif _decode_value(data["params"][0]) not in self.mapping:
                 # we don't know about this transaction receipt, which probably means that the transaction failed
                 # on this client. So return the receipt here, because below we will block on a result:
-                return self._old_post(data, *args, **kwargs)
+                return (yield data)
 
         uninstalling_filter = None
         if "params" in data:
-            data["params"] = _remap_params(
-                self._client, data["params"], self.mapping, method, remap_data=True
-            )
+            with tracing.span("remap_params", client=self._client, method=method):
+                data["params"] = _remap_params(
+                    self._client, data["params"], self.mapping, method, remap_data=True
+                )
             if (
                 "filter" in method.lower() and "get" in method.lower()
             ) or method == "eth_uninstallFilter":
@@ -137,7 +211,7 @@ class ChainSynchronizer(object):
                     data["params"] = [self.filter_mapping[old_id]]
                 if method == "eth_uninstallFilter":
                     uninstalling_filter = old_id
-        ret = self._old_post(data, *args, **kwargs)
+        ret = yield data
         if uninstalling_filter is not None:
             if ret["result"]:
                 # the uninstall succeeded, so we no longer need to keep the mapping:
@@ -181,11 +255,13 @@ class ChainSynchronizer(object):
             # by this point we know that the master client has already successfully mined the transaction and returned a receipt
             # so make sure that we block until this client has also mined the transaction and returned a receipt
             while transaction_receipt_succeeded(ret) is None:
+                if not wait:
+                    return None
                 self._client.logger.info(
                     "Waiting to mine transaction %s..." % data["params"][0]
                 )
-                time.sleep(5.0)
-                ret = self._old_post(data, *args, **kwargs)
+                yield _Sleep(5.0)
+                ret = yield data
             # update the mapping with the address if a new contract was created
             if "contractAddress" in ret["result"] and ret["result"]["contractAddress"]:
                 master_address = _decode_value(
@@ -222,6 +298,24 @@ def AddressSynchronizingClient(etheno_client):
         "post",
         ChainSynchronizer.post.__get__(synchronizer, ChainSynchronizer),
     )
+    setattr(
+        etheno_client,
+        "transaction_mined",
+        ChainSynchronizer.transaction_mined.__get__(synchronizer, ChainSynchronizer),
+    )
+    if synchronizer._old_apost is not None:
+        setattr(
+            etheno_client,
+            "apost",
+            ChainSynchronizer.apost.__get__(synchronizer, ChainSynchronizer),
+        )
+        setattr(
+            etheno_client,
+            "atransaction_mined",
+            ChainSynchronizer.atransaction_mined.__get__(
+                synchronizer, ChainSynchronizer
+            ),
+        )
 
     return etheno_client
 
@@ -272,6 +366,10 @@ class RawTransactionSynchronizer(ChainSynchronizer):
                         "Error: eth_sendTransaction sent from unknown address %s:\n%s"
                         % (from_str, data)
                     )
+            # the signing libraries are slow to import, so they are only loaded once there is a transaction to sign
+            import eth_utils
+            from web3.auto import w3
+
             params["chainId"] = self._client.get_net_version()
             # Workaround for a bug in web3.eth.account:
             # the signTransaction function checks to see if the 'from' field is present, and if so it validates that it
@@ -284,7 +382,10 @@ class RawTransactionSynchronizer(ChainSynchronizer):
                 params["to"] = eth_utils.address.to_checksum_address(params["to"])
             transaction_count = self._client.get_transaction_count(from_address)
             params["nonce"] = transaction_count
-            signed_txn = w3.eth.account.signTransaction(params, private_key=private_key)
+            with tracing.span("sign_transaction", client=self._client):
+                signed_txn = w3.eth.account.signTransaction(
+                    params, private_key=private_key
+                )
             return super().post(
                 {
                     "id": 1,
@@ -314,5 +415,12 @@ def RawTransactionClient(etheno_client, accounts):
             synchronizer, RawTransactionSynchronizer
         ),
     )
+    setattr(
+        etheno_client,
+        "transaction_mined",
+        RawTransactionSynchronizer.transaction_mined.__get__(
+            synchronizer, RawTransactionSynchronizer
+        ),
+    )
 
     return etheno_client
@@ -1,62 +1,115 @@
 #!/usr/bin/env python3
 
+import queue
 import threading
-from threading import Condition
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, List
 
 
 def is_main_thread():
     return isinstance(threading.current_thread(), threading._MainThread)
 
 
+# queued to make the main thread's `run` loop return
+_QUIT = object()
+
+
+class _Call(object):
+    def __init__(self, obj: Callable[..., Any], args, kwargs):
+        self.future: Future = Future()
+        self.obj = obj
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.obj.__call__(*self.args, **self.kwargs)
+        except BaseException as e:
+            self.future.set_exception(e)
+            if not isinstance(e, Exception):
+                # e.g., a KeyboardInterrupt
+                raise
+        else:
+            self.future.set_result(result)
+
+
 class MainThreadController(object):
+    """Runs calls submitted from any thread on the main thread.
+
+    Calls are put on a queue that `run` drains on the main thread. `invoke` waits for the call's result, while `submit`
+    and `submit_all` return a `concurrent.futures.Future` for each call's result without waiting. The main thread blocks on the queue until a call (or `quit`)
+    arrives, so calls are dispatched as soon as they are submitted rather than on the next poll.
+    """
+
     def __init__(self):
         if not is_main_thread():
             raise Exception("A controller can only be created from the main thread")
-        self._main_wake_up = Condition()
-        self._main_wake_up.acquire()
-        self._obj = None
-        self._caller_wake_up = None
-        self._args = None
-        self._kwargs = None
-        self._return = None
+        # SimpleQueue.put is reentrant, so it can be called from a signal handler
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
         self._quit = False
+        # held while queueing calls, so that none are queued after `run` has cancelled the pending ones
+        self._lock = threading.Lock()
 
-    def invoke(self, obj, *args, **kwargs):
+    def _enqueue(self, item) -> bool:
+        with self._lock:
+            if self._quit:
+                return False
+            self._queue.put(item)
+            return True
+
+    def _execute(self, calls: List[_Call]):
         if is_main_thread():
-            return obj.__call__(*args, **kwargs)
-        released = False
-        self._main_wake_up.acquire()
-        try:
-            self._caller_wake_up = Condition()
-            with self._caller_wake_up:
-                self._obj = obj
-                self._args = args
-                self._kwargs = kwargs
-                # tell the main thread to wake up
-                self._main_wake_up.notify_all()
-                self._main_wake_up.release()
-                released = True
-                self._caller_wake_up.wait()
-                # tell the main thread that we received the result:
-                self._caller_wake_up.notify_all()
-                ret = self._return
-                return ret
-        finally:
-            self._obj = None
-            self._args = None
-            self._kwargs = None
-            self._caller_wake_up = None
-            self._return = None
-            if not released:
-                self._main_wake_up.release()
+            # waiting on the main thread from the main thread would deadlock, so just make the calls
+            for call in calls:
+                call.run()
+        elif not self._enqueue(calls):
+            self._fail(calls)
+
+    def invoke(self, obj, *args, **kwargs):
+        """Calls `obj(*args, **kwargs)` on the main thread and returns its result"""
+        return self.submit(obj, *args, **kwargs).result()
+
+    def submit(self, obj, *args, **kwargs) -> Future:
+        """Calls `obj(*args, **kwargs)` on the main thread, returning a future for its result"""
+        call = _Call(obj, args, kwargs)
+        self._execute([call])
+        return call.future
+
+    def submit_all(self, calls: Iterable[Callable[[], Any]]) -> List[Future]:
+        """Calls each of `calls` on the main thread, in order, returning a future for each of their results.
+
+        The calls are queued together, so the main thread runs them back to back.
+        """
+        batch = [_Call(obj, (), {}) for obj in calls]
+        if batch:
+            self._execute(batch)
+        return [call.future for call in batch]
 
     def quit(self):
-        self._main_wake_up.acquire()
-        try:
-            self._quit = True
-            self._main_wake_up.notify_all()
-        finally:
-            self._main_wake_up.release()
+        self._quit = True
+        self._queue.put(_QUIT)
+
+    @staticmethod
+    def _fail(calls: List[_Call]):
+        for call in calls:
+            if not call.future.done():
+                call.future.set_exception(
+                    RuntimeError(
+                        "The main thread controller quit before the call was run"
+                    )
+                )
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is _QUIT:
+                continue
+            self._fail(item)
 
     def run(self):
         if not is_main_thread():
@@ -64,26 +117,26 @@ class MainThreadController(object):
         from . import signals
 
         def signal_handler(signal, frame):
-            self._quit = True
+            self.quit()
 
         signals.add_sigint_handler(signal_handler)
-        while True:
-            try:
-                self._main_wake_up.wait(1.0)
-            except KeyboardInterrupt:
+        try:
+            while not self._quit:
+                item = None
+                try:
+                    item = self._queue.get()
+                    if item is _QUIT:
+                        continue
+                    for call in item:
+                        call.run()
+                except KeyboardInterrupt:
+                    self._quit = True
+                    if item is not None and item is not _QUIT:
+                        self._fail(item)
+        finally:
+            with self._lock:
                 self._quit = True
-            if self._quit:
-                return
-            elif self._caller_wake_up is None:
-                # we timed out
-                continue
-            with self._caller_wake_up:
-                self._return = self._obj.__call__(*self._args, **self._kwargs)
-                self._caller_wake_up.notify_all()
-                # wait for the calling thread to confirm it received the result
-                while not self._caller_wake_up.wait(1.0):
-                    if self._quit:
-                        return
+                self._cancel_pending()
 
 
 class MainThreadWrapper(object):
@@ -121,6 +174,7 @@ if __name__ == "__main__":
 
     def dostuff(mtoc):
         print(mtoc.do_stuff())
+        controller.quit()
 
     from threading import Thread
 
@@ -0,0 +1,171 @@
+import itertools
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, TextIO, Union
+
+# The trace of the request being handled, which is tracked per request thread (or per request task in the asyncio
+# server)
+_TRACER: ContextVar = ContextVar("etheno_tracer", default=None)
+_TRACE_ID: ContextVar = ContextVar("etheno_trace_id", default=None)
+# If set, the track (displayed as a thread) that spans are recorded on instead of the current thread; requests
+# handled concurrently on the same thread, as in the asyncio server, each get their own track so their spans nest
+_TRACK: ContextVar = ContextVar("etheno_trace_track", default=None)
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000.0
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]):
+        self.tracer: Tracer = tracer
+        self.name: str = name
+        self.args: Dict[str, Any] = args
+        self.start: float = 0.0
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = _now_us()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, end - self.start, self.args)
+        return False
+
+
+class Trace(Span):
+    """The root span of a request, which makes the request's trace id current for the thread handling it"""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        args: Dict[str, Any],
+        own_track: bool = False,
+    ):
+        super().__init__(tracer, name, args)
+        self.trace_id: int = next(tracer._trace_ids)
+        self.own_track: bool = own_track
+
+    def __enter__(self):
+        self._tokens = (
+            _TRACER.set(self.tracer),
+            _TRACE_ID.set(self.trace_id),
+            _TRACK.set(self.trace_id if self.own_track else None),
+        )
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            tracer_token, trace_id_token, track_token = self._tokens
+            _TRACK.reset(track_token)
+            _TRACE_ID.reset(trace_id_token)
+            _TRACER.reset(tracer_token)
+
+
+class Tracer:
+    """Records timed spans for each request as Chrome trace events.
+
+    The output is a JSON array of trace events that can be opened in `chrome://tracing`, Perfetto
+    (https://ui.perfetto.dev), or speedscope. Each request handled by Etheno gets its own trace id, which is included
+    in the arguments of all of its spans; spans are nested by time on the thread that handled the request.
+    """
+
+    def __init__(self, out_stream: Union[str, TextIO], **exporter_options):
+        # imported here because jsonrpc depends on the Etheno core, which in turn uses this module
+        from .jsonrpc import make_exporter
+
+        exporter_options.setdefault("background", True)
+        self._exporter = make_exporter(out_stream, "json", **exporter_options)
+        self._trace_ids = itertools.count(1)
+        self._pid: int = os.getpid()
+        self._named_threads = set()
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        return self._exporter.path
+
+    def trace(self, name: str, own_track: bool = False, **args) -> Trace:
+        """Starts a new trace in the current context; use as a context manager around handling a request.
+
+        If `own_track` is True, the trace's spans are recorded on their own track rather than on the current thread's.
+        """
+        return Trace(self, name, args, own_track=own_track)
+
+    def record(self, name: str, start: float, duration: float, args: Dict[str, Any]):
+        track = _TRACK.get()
+        if track is None:
+            tid = threading.get_ident()
+            thread_name = threading.current_thread().name
+        else:
+            tid = track
+            thread_name = f"request {track}"
+        if tid not in self._named_threads:
+            with self._lock:
+                if tid not in self._named_threads:
+                    self._named_threads.add(tid)
+                    self._exporter.write_entry(
+                        {
+                            "name": "thread_name",
+                            "ph": "M",
+                            "pid": self._pid,
+                            "tid": tid,
+                            "args": {"name": thread_name},
+                        }
+                    )
+        # span arguments may be objects such as clients, which are only converted to strings if they are recorded
+        args = {
+            key: value if isinstance(value, _JSON_SCALARS) else str(value)
+            for key, value in args.items()
+        }
+        args["trace_id"] = _TRACE_ID.get()
+        self._exporter.write_entry(
+            {
+                "name": name,
+                "cat": "etheno",
+                "ph": "X",
+                "ts": start,
+                "dur": duration,
+                "pid": self._pid,
+                "tid": tid,
+                "args": args,
+            }
+        )
+
+    def flush(self):
+        self._exporter.flush()
+
+    def finalize(self):
+        self._exporter.finalize()
+
+
+def current_trace_id() -> Optional[int]:
+    """Returns the id of the trace for the request the current thread is handling, or None if it is not being traced"""
+    return _TRACE_ID.get()
+
+
+def span(name: str, **args):
+    """Returns a context manager that times a span of the current thread's trace, or does nothing if there is none"""
+    tracer = _TRACER.get()
+    if tracer is None:
+        return _NULL_SPAN
+    return Span(tracer, name, args)
@@ -2,10 +2,17 @@ import math
 import os
 import socket
 import tempfile
-from typing import Optional, Union
+import threading
+from typing import Optional, Sequence, Union
 from urllib.request import urlopen
 from urllib.error import HTTPError, URLError
 
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
 
 class ConstantTemporaryFile:
     def __init__(self, constant_content, **kwargs):
@@ -72,6 +79,14 @@ def format_hex_address(
     return addr
 
 
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Returns the `q`th percentile (0 <= q <= 100) of an already sorted sequence using the nearest-rank method"""
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
 def webserver_is_up(url: str) -> bool:
     try:
         return urlopen(url).getcode()
@@ -83,15 +98,150 @@ def webserver_is_up(url: str) -> bool:
 
 
 def is_port_free(port: int) -> bool:
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    return sock.connect_ex(("127.0.0.1", port)) != 0
+    """Returns whether nothing is accepting connections on `port`"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(("127.0.0.1", port)) != 0
+
+
+# Lock files that keep Etheno processes from handing the same port to different clients
+PORT_LOCK_DIRECTORY = os.path.join(tempfile.gettempdir(), "etheno-ports")
+
+
+class PortReservation:
+    """A port that has been reserved by binding a socket to it, and by locking its lock file.
+
+    The socket is unbound with `unbind` just before the port is handed to the client that will listen on it; the lock
+    is held until `release` is called, once the client has bound the port, so that no other Etheno process reserves
+    the port in the meantime.
+    """
+
+    def __init__(
+        self, allocator: "PortAllocator", port: int, sock: socket.socket, lock
+    ):
+        self.allocator: PortAllocator = allocator
+        self.port: int = port
+        self._socket: Optional[socket.socket] = sock
+        self._lock = lock
+
+    @property
+    def released(self) -> bool:
+        return self._socket is None and self._lock is None
+
+    def unbind(self):
+        """Closes the socket bound to the port, so that the client it was reserved for can bind it"""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def release(self):
+        """Unbinds the port, if it is still bound, and allows it to be reserved again"""
+        self.unbind()
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+        self.allocator._released(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def __int__(self):
+        return self.port
+
+    def __repr__(self):
+        return f"{type(self).__name__}(port={self.port})"
+
+
+class PortAllocator:
+    """Reserves ports by binding them, so that concurrent clients and concurrent Etheno processes never get the same port.
+
+    Unlike probing whether something is listening on a port, binding a port both checks that it is available and keeps
+    it that way until the reservation is released. Reserved ports are tracked in this process and, where `fcntl` is
+    available, with a lock file per port in `lock_directory`, which other Etheno processes also check.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        lock_directory: Optional[str] = PORT_LOCK_DIRECTORY,
+    ):
+        self.host: str = host
+        self.lock_directory: Optional[str] = (
+            lock_directory if fcntl is not None else None
+        )
+        self._reserved = set()
+        self._mutex = threading.Lock()
+
+    def _lock(self, port: int):
+        """Returns an open, locked lock file for `port`, or None if another process holds it"""
+        os.makedirs(self.lock_directory, exist_ok=True)
+        # the lock files are never deleted, since deleting a lock file that another process has opened would let two
+        # processes hold "the" lock for the same port at once
+        lock = open(os.path.join(self.lock_directory, f"{port}.lock"), "a")
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return None
+        return lock
+
+    def _try_reserve(self, port: int) -> Optional[PortReservation]:
+        if port in self._reserved:
+            return None
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind((self.host, port))
+        except OSError:
+            sock.close()
+            return None
+        port = sock.getsockname()[1]
+        if port in self._reserved:
+            sock.close()
+            return None
+        lock = None
+        if self.lock_directory is not None:
+            lock = self._lock(port)
+            if lock is None:
+                sock.close()
+                return None
+        self._reserved.add(port)
+        return PortReservation(self, port, sock, lock)
+
+    def reserve(self, starting_port: Optional[int] = None) -> PortReservation:
+        """Reserves the first available port at or above `starting_port`, or any available port if it is None"""
+        with self._mutex:
+            if starting_port is None:
+                for _ in range(100):
+                    reservation = self._try_reserve(0)
+                    if reservation is not None:
+                        return reservation
+            else:
+                for port in range(starting_port, 65536):
+                    reservation = self._try_reserve(port)
+                    if reservation is not None:
+                        return reservation
+        raise OSError(f"Could not reserve a port starting at {starting_port}")
+
+    def _released(self, reservation: PortReservation):
+        with self._mutex:
+            self._reserved.discard(reservation.port)
+
+
+PORTS = PortAllocator()
 
 
 def find_open_port(starting_port: int = 1025) -> int:
-    for port in range(starting_port, 65536):
-        if is_port_free(port):
-            return port
-    return -1
+    """Returns the first port at or above `starting_port` that can currently be bound, or -1 if there is none.
+
+    The port is not reserved, so prefer `PORTS.reserve` when the port will be handed to a client.
+    """
+    try:
+        with PORTS.reserve(starting_port) as reservation:
+            return reservation.port
+    except OSError:
+        return -1
 
 
 def clear_directory(path: str):
@@ -7,6 +7,7 @@ setup(
     author="Trail of Bits",
     version="0.3.2",
     packages=find_packages(),
+    package_data={"etheno.benchmarks": ["baselines/*.json"]},
     python_requires=">=3.7",
     install_requires=[
         "ptyprocess",
@@ -24,6 +25,7 @@ setup(
         "eth-rlp<0.3.0",
         "setuptools",
     ],
+    extras_require={"zstd": ["zstandard"]},
     entry_points={"console_scripts": ["etheno = etheno.__main__:main"]},
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -0,0 +1,49 @@
+from typing import Any, Dict, Optional, Set
+
+import pytest
+
+from etheno.benchmarks.mockserver import MockChain
+from etheno.client import SelfPostingClient
+from etheno.etheno import Etheno
+
+
+class FakeRpc:
+    """Answers JSON RPC requests from a `MockChain` in-process; receipts for transactions in `unmined` are null"""
+
+    def __init__(self, name: str = "FakeRpc", chain: Optional[MockChain] = None):
+        self.name: str = name
+        self.chain: MockChain = MockChain() if chain is None else chain
+        self.unmined: Set[str] = set()
+        self.hold: bool = False
+
+    def post(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.chain.handle(data["method"], data.get("params", []))
+        if data["method"] == "eth_sendTransaction" and self.hold:
+            self.unmined.add(result)
+        elif data["method"] == "eth_getTransactionReceipt":
+            if data["params"][0].lower() in self.unmined:
+                result = None
+        return {"jsonrpc": "2.0", "id": data.get("id", None), "result": result}
+
+    def mine(self):
+        self.unmined.clear()
+
+    def __str__(self):
+        return self.name
+
+    __repr__ = __str__
+
+
+class FakeClient(SelfPostingClient):
+    def create_account(self, balance: int = 0, address: Optional[int] = None):
+        # every FakeRpc has the same accounts
+        return address
+
+
+@pytest.fixture
+def etheno():
+    instance = Etheno()
+    yield instance
+    if instance.receipt_tracker is not None:
+        instance.receipt_tracker.stop()
+    instance.logger.close()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from etheno.admission import LIMIT_EXCEEDED, AdmissionController, Overloaded
+from etheno.metrics import Metrics
+
+
+def test_sheds_when_the_queue_is_full():
+    metrics = Metrics()
+    admission = AdmissionController(max_concurrent=1, metrics=metrics)
+    admission.acquire()
+    with pytest.raises(Overloaded) as e:
+        admission.acquire()
+    assert e.value.reason == "queue_full"
+    assert metrics.requests_shed.value(("queue_full",)) == 1
+    admission.release()
+    admission.acquire()
+    assert admission.in_flight == 1
+
+
+def test_sheds_after_the_queue_timeout():
+    admission = AdmissionController(max_concurrent=1, max_queued=1, queue_timeout=0.05)
+    admission.acquire()
+    with pytest.raises(Overloaded) as e:
+        admission.acquire()
+    assert e.value.reason == "queue_timeout"
+    assert admission.queued == 0
+    assert admission.in_flight == 1
+
+
+def test_released_slots_are_handed_to_waiters_in_order():
+    admission = AdmissionController(max_concurrent=1, max_queued=3)
+    admission.acquire()
+    admitted = []
+
+    def request(i: int):
+        admission.acquire()
+        admitted.append(i)
+        admission.release()
+
+    threads = []
+    for i in range(3):
+        thread = threading.Thread(target=request, args=(i,))
+        thread.start()
+        threads.append(thread)
+        # queue them in order
+        while admission.queued < i + 1:
+            time.sleep(0.001)
+    admission.release()
+    for thread in threads:
+        thread.join(5.0)
+    assert admitted == [0, 1, 2]
+    assert admission.in_flight == 0
+    assert admission.queued == 0
+
+
+def test_cancelled_async_waiters_leave_the_queue():
+    admission = AdmissionController(max_concurrent=1, max_queued=1)
+
+    async def main():
+        await admission.aacquire()
+        waiter = asyncio.ensure_future(admission.aacquire())
+        await asyncio.sleep(0.01)
+        assert admission.queued == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.queued == 0
+        admission.release()
+
+    asyncio.run(main())
+    assert admission.in_flight == 0
+
+
+def test_jsonrpc_shed_response():
+    admission = AdmissionController(max_concurrent=1, jsonrpc_errors=True)
+    status, headers, body = admission.shed_response(
+        Overloaded("queue_full"), {"id": 7}, was_list=True
+    )
+    assert status == 200
+    assert ("Retry-After", "1") in headers
+    (response,) = json.loads(body)
+    assert response["id"] == 7
+    assert response["error"]["code"] == LIMIT_EXCEEDED
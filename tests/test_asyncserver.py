@@ -0,0 +1,138 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from etheno.asynchttp import AsyncRpcHttpProxy, read_headers, read_line
+from etheno.asyncserver import AsyncEthenoServer
+from etheno.etheno import EthenoPlugin
+
+from conftest import FakeClient, FakeRpc
+
+
+@pytest.fixture
+def server(etheno):
+    etheno.master_client = FakeClient(FakeRpc("master"))
+    server = AsyncEthenoServer(etheno, "127.0.0.1", 0, etheno.app.wsgi_app, workers=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(5.0)
+
+
+def _port(server) -> int:
+    return server._server.sockets[0].getsockname()[1]
+
+
+def _exchange(server, request: bytes) -> bytes:
+    with socket.create_connection(("127.0.0.1", _port(server)), timeout=5.0) as sock:
+        sock.sendall(request)
+        response = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                return response
+            response += chunk
+
+
+def _jsonrpc_body(method: str) -> bytes:
+    return json.dumps({"id": 1, "jsonrpc": "2.0", "method": method}).encode()
+
+
+def _jsonrpc_request(method: str) -> bytes:
+    body = _jsonrpc_body(method)
+    return (
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        b"Connection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body)
+    )
+
+
+def test_request_line_too_long(server):
+    response = _exchange(server, b"GET /" + b"a" * (2 << 20) + b" HTTP/1.1\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 431 ")
+
+
+def test_header_line_too_long(server):
+    response = _exchange(
+        server, b"GET / HTTP/1.1\r\nX-Long: " + b"a" * (2 << 20) + b"\r\n\r\n"
+    )
+    assert response.startswith(b"HTTP/1.1 431 ")
+
+
+def test_plugin_hooks_run_off_the_event_loop(server, etheno):
+    threads = {}
+
+    class RecordingPlugin(EthenoPlugin):
+        def before_post(self, post_data):
+            threads["before_post"] = threading.current_thread()
+
+        def after_post(self, post_data, client_results):
+            threads["after_post"] = threading.current_thread()
+
+    etheno.add_plugin(RecordingPlugin())
+    response = _exchange(server, _jsonrpc_request("eth_blockNumber"))
+    assert response.startswith(b"HTTP/1.1 200 ")
+    assert b'"result"' in response
+    # the server's executor threads, rather than the event loop's thread
+    assert threads["before_post"].name.startswith("EthenoWorker")
+    assert threads["after_post"].name.startswith("EthenoWorker")
+
+
+def test_request_body_too_large(server):
+    server.max_body_size = 1024
+    body = b"x" * 2048
+    response = _exchange(
+        server,
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Length: %d\r\n\r\n%s"
+        % (len(body), body),
+    )
+    assert response.startswith(b"HTTP/1.1 413 ")
+
+
+def test_responses_without_framing_are_read_until_eof():
+    async def respond(reader, writer):
+        await read_line(reader)
+        await read_headers(reader)
+        await reader.readexactly(len(_jsonrpc_body("eth_blockNumber")))
+        # no Content-Length or chunked encoding, so the body ends when the connection closes
+        writer.write(
+            b'HTTP/1.1 200 OK\r\n\r\n{"id": 1, "jsonrpc": "2.0", "result": "0x1"}'
+        )
+        await writer.drain()
+        writer.close()
+
+    async def main():
+        backend = await asyncio.start_server(respond, "127.0.0.1", 0)
+        port = backend.sockets[0].getsockname()[1]
+        proxy = AsyncRpcHttpProxy(f"http://127.0.0.1:{port}/")
+        try:
+            return await proxy.post(json.loads(_jsonrpc_body("eth_blockNumber")))
+        finally:
+            proxy.close()
+            backend.close()
+            await backend.wait_closed()
+
+    assert asyncio.run(main())["result"] == "0x1"
+
+
+class SlowRpc(FakeRpc):
+    def post(self, data):
+        time.sleep(0.2)
+        return super().post(data)
+
+
+def test_secondary_clients_are_posted_to_concurrently(etheno):
+    etheno.master_client = FakeClient(FakeRpc("master"))
+    for i in range(4):
+        etheno.add_client(FakeClient(SlowRpc(f"secondary{i}")))
+    start = time.monotonic()
+    ret = asyncio.run(
+        etheno.apost({"id": 1, "jsonrpc": "2.0", "method": "eth_blockNumber"})
+    )
+    assert ret["result"] == "0x0"
+    # posting to the four clients one at a time would take at least 0.8 seconds
+    assert time.monotonic() - start < 0.6
@@ -0,0 +1,62 @@
+import os
+
+from etheno.capture import CaptureReader, CaptureWriter, index_path
+
+TX_HASH = "0x" + "ab" * 32
+# clients may return hashes in either case
+UPPER_TX_HASH = "0x" + "AB" * 32
+
+
+def _write_capture(path: str) -> CaptureWriter:
+    writer = CaptureWriter(path)
+    writer.write({"id": 1, "method": "eth_blockNumber"}, [{"result": "0x1"}])
+    writer.write(
+        {"id": 2, "method": "eth_sendTransaction", "params": [{}]},
+        [{"result": UPPER_TX_HASH}],
+    )
+    writer.write(
+        {"id": 3, "method": "eth_getTransactionReceipt", "params": [TX_HASH]},
+        [{"result": None}],
+    )
+    return writer
+
+
+def test_lookups(tmp_path):
+    path = str(tmp_path / "rpc.cap")
+    _write_capture(path).finalize()
+    assert os.path.exists(index_path(path))
+    with CaptureReader(path) as reader:
+        assert len(reader) == 3
+        assert reader[1]["request"]["id"] == 2
+        assert [r["seq"] for r in reader] == [0, 1, 2]
+        assert sorted(reader.methods) == [
+            "eth_blockNumber",
+            "eth_getTransactionReceipt",
+            "eth_sendTransaction",
+        ]
+        assert [r["seq"] for r in reader.by_method("eth_blockNumber")] == [0]
+        assert [r["seq"] for r in reader.by_tx_hash(UPPER_TX_HASH)] == [1, 2]
+
+
+def test_index_is_rebuilt_for_an_unfinalized_capture(tmp_path):
+    path = str(tmp_path / "rpc.cap")
+    writer = _write_capture(path)
+    writer.flush()
+    # e.g., Etheno was killed: there is no index, and the last record is truncated
+    with open(path, "ab") as f:
+        f.write(b"\x10\x00\x00\x00{")
+    with CaptureReader(path) as reader:
+        assert len(reader) == 3
+        assert [r["seq"] for r in reader.by_tx_hash(TX_HASH)] == [1, 2]
+    writer.finalize()
+
+
+def test_non_string_methods(tmp_path):
+    path = str(tmp_path / "rpc.cap")
+    writer = CaptureWriter(path)
+    writer.write({"id": 1, "method": ["eth_blockNumber"]}, [{"result": None}])
+    writer.write({"id": 2, "method": 7}, [{"result": None}])
+    writer.finalize()
+    with CaptureReader(path) as reader:
+        assert sorted(reader.methods) == ["7", "['eth_blockNumber']"]
+        assert [r["seq"] for r in reader.by_method("7")] == [1]
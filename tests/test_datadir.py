@@ -0,0 +1,48 @@
+import os
+
+from etheno.datadir import DatadirCache
+
+
+def _make_datadir(path):
+    os.makedirs(os.path.join(path, "keystore"))
+    os.makedirs(os.path.join(path, "chaindata"))
+    with open(os.path.join(path, "keystore", "key"), "w") as f:
+        f.write("key")
+    with open(os.path.join(path, "chaindata", "db"), "w") as f:
+        f.write("db")
+
+
+def test_key_depends_on_genesis_and_accounts():
+    key = DatadirCache.key("Geth", {"chainId": 1}, [1, 2])
+    assert key == DatadirCache.key("Geth", {"chainId": 1}, [2, 1])
+    assert key != DatadirCache.key("Geth", {"chainId": 2}, [1, 2])
+    assert key != DatadirCache.key("Geth", {"chainId": 1}, [1, 3])
+    assert key.startswith("geth-")
+
+
+def test_store_and_restore(tmp_path):
+    cache = DatadirCache(str(tmp_path / "cache"))
+    datadir = str(tmp_path / "datadir")
+    _make_datadir(datadir)
+    key = DatadirCache.key("Geth", {}, [1])
+    restored = str(tmp_path / "restored")
+    assert not cache.restore(key, restored)
+
+    cache.store(key, datadir, immutable=("keystore",))
+    assert key in cache
+    assert cache.restore(key, restored, immutable=("keystore",))
+    for name in ("keystore/key", "chaindata/db"):
+        with open(os.path.join(restored, name)) as f:
+            assert f.read() == name.split("/")[1]
+    cached = cache.path(key)
+    # immutable files are hardlinked, and everything else is a separate copy
+    assert os.path.samefile(
+        os.path.join(cached, "keystore", "key"),
+        os.path.join(restored, "keystore", "key"),
+    )
+    assert not os.path.samefile(
+        os.path.join(cached, "chaindata", "db"),
+        os.path.join(restored, "chaindata", "db"),
+    )
+    # no temporary directories are left behind
+    assert os.listdir(cache.directory) == [key]
@@ -0,0 +1,47 @@
+import threading
+
+from etheno.dispatcher import AfterPostDispatcher
+
+
+def test_synchronous_calls_do_not_overtake_queued_calls():
+    dispatcher = AfterPostDispatcher()
+    plugin = object()
+    release = threading.Event()
+    calls = []
+
+    def first():
+        release.wait(5)
+        calls.append("queued")
+
+    dispatcher.submit(plugin, first)
+    with dispatcher._lock:
+        # enter synchronous mode without draining, as if another thread submitted while the drain was in progress
+        dispatcher._synchronous += 1
+    submitter = threading.Thread(
+        target=dispatcher.submit, args=(plugin, lambda: calls.append("synchronous"))
+    )
+    submitter.start()
+    submitter.join(0.2)
+    # the synchronous call waits behind the queued one rather than running inline
+    assert submitter.is_alive()
+    assert calls == []
+    release.set()
+    submitter.join(5)
+    assert calls == ["queued", "synchronous"]
+    dispatcher.stop()
+
+
+def test_hooks_that_post_while_synchronous_do_not_deadlock():
+    dispatcher = AfterPostDispatcher()
+    plugin = object()
+    calls = []
+
+    def hook():
+        # e.g., a plugin's after_post hook that posts a request of its own
+        dispatcher.submit(plugin, lambda: calls.append("nested"))
+        calls.append("hook")
+
+    with dispatcher.synchronous():
+        dispatcher.submit(plugin, hook)
+        assert calls == ["nested", "hook"]
+    dispatcher.stop()
@@ -0,0 +1,68 @@
+import gc
+import io
+import json
+import signal
+import time
+
+from etheno import jsonrpc
+from etheno.jsonrpc import JSONExporter, JSONRPCExportPlugin
+
+
+def test_exporters_share_one_termination_handler():
+    first = JSONExporter(io.StringIO())
+    handler = signal.getsignal(signal.SIGTERM)
+    others = [JSONExporter(io.StringIO()) for _ in range(10)]
+    assert signal.getsignal(signal.SIGTERM) is handler
+    for exporter in [first] + others:
+        exporter.finalize()
+    assert not any(e in jsonrpc._LIVE_EXPORTERS for e in [first] + others)
+
+
+def test_live_exporters_are_flushed():
+    output = io.StringIO()
+    exporter = JSONExporter(output, flush_interval=None, max_buffered_entries=None)
+    exporter.write_entry({"id": 1})
+    assert output.getvalue() == ""
+    jsonrpc._flush_live_exporters(signal.SIGTERM, None)
+    assert output.getvalue() == '[\n{"id": 1}'
+    exporter.finalize()
+
+
+def test_exporters_are_not_kept_alive():
+    exporter = JSONExporter(io.StringIO())
+    assert exporter in jsonrpc._LIVE_EXPORTERS
+    count = len(jsonrpc._LIVE_EXPORTERS)
+    del exporter
+    gc.collect()
+    assert len(jsonrpc._LIVE_EXPORTERS) == count - 1
+
+
+def test_export_plugin_flushes_while_idle():
+    output = io.StringIO()
+    plugin = JSONRPCExportPlugin(output, flush_interval=0.05)
+    plugin.after_post({"id": 1}, [{"result": "0x1"}])
+    deadline = time.monotonic() + 5.0
+    while '"id": 1' not in output.getvalue() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert '"id": 1' in output.getvalue()
+    plugin._exporter.finalize()
+
+
+def test_signal_flush_while_the_main_thread_holds_the_locks():
+    class InterruptedOutput(io.StringIO):
+        def write(self, text):
+            # a signal handler that runs while the exporter is writing
+            if not interrupted:
+                interrupted.append(True)
+                with jsonrpc._LIVE_EXPORTERS_LOCK:
+                    jsonrpc._flush_live_exporters(signal.SIGTERM, None)
+            return super().write(text)
+
+    interrupted = []
+    output = InterruptedOutput()
+    exporter = JSONExporter(output, flush_interval=None, max_buffered_entries=None)
+    exporter.write_entry({"id": 1})
+    exporter.flush()
+    exporter.finalize()
+    assert interrupted
+    assert json.loads(output.getvalue()) == [{"id": 1}]
@@ -0,0 +1,41 @@
+from etheno import keyfile
+from etheno.keyfile import (
+    MIN_PARALLEL_KEYFILES,
+    create_keyfiles_json,
+    decode_keyfile_json,
+    shutdown_executor,
+)
+
+
+def test_keyfiles_share_one_process_pool():
+    keys = [bytes([i + 1]) * 32 for i in range(MIN_PARALLEL_KEYFILES)]
+    try:
+        first = create_keyfiles_json(keys, b"etheno", profile="light")
+        executor = keyfile._EXECUTOR
+        assert executor is not None
+        second = create_keyfiles_json(keys, b"etheno", profile="light")
+        assert keyfile._EXECUTOR is executor
+    finally:
+        shutdown_executor()
+    assert keyfile._EXECUTOR is None
+    for keyfiles in (first, second):
+        assert [decode_keyfile_json(k, b"etheno") for k in keyfiles] == keys
+
+
+def test_few_keyfiles_are_created_in_process():
+    keyfiles = create_keyfiles_json([b"\x01" * 32], b"etheno", profile="testing")
+    assert keyfile._EXECUTOR is None
+    assert decode_keyfile_json(keyfiles[0], b"etheno") == b"\x01" * 32
+
+
+def test_only_decoding_is_cached():
+    keyfile._cached_scrypt_hash.cache_clear()
+    created = create_keyfiles_json(
+        [b"\x02" * 32], b"etheno", kdf="scrypt", profile="testing"
+    )[0]
+    # the key derived to create the keyfile has a random salt, so it is not cached
+    assert keyfile._cached_scrypt_hash.cache_info().currsize == 0
+    for _ in range(2):
+        assert decode_keyfile_json(created, b"etheno") == b"\x02" * 32
+    info = keyfile._cached_scrypt_hash.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
@@ -0,0 +1,25 @@
+from etheno import metrics as metrics_module
+from etheno.metrics import OTHER_METHOD, Metrics
+
+
+def test_method_labels_are_bounded(monkeypatch):
+    monkeypatch.setattr(metrics_module, "MAX_METHOD_LABELS", 2)
+    metrics = Metrics()
+    for method in ("eth_blockNumber", "eth_chainId", "made_up_1", "made_up_2"):
+        metrics.observe_request(method, 0.001)
+        metrics.observe_client("master", method, 0.001)
+    # methods that were already labeled keep their labels
+    metrics.observe_request("eth_blockNumber", 0.001)
+
+    assert metrics.requests.value(("eth_blockNumber",)) == 2
+    assert metrics.requests.value(("eth_chainId",)) == 1
+    assert metrics.requests.value((OTHER_METHOD,)) == 2
+    assert metrics.client_requests.value(("master", OTHER_METHOD)) == 2
+    assert metrics.request_duration.count((OTHER_METHOD,)) == 2
+    assert "made_up" not in metrics.render()
+
+
+def test_non_string_methods_are_other():
+    metrics = Metrics()
+    metrics.observe_request(None, 0.001)
+    assert metrics.requests.value((OTHER_METHOD,)) == 1
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from etheno.benchmarks.micro import compare, load_baseline, relative, save_baseline
+
+
+def test_baseline_is_relative_to_calibration(tmp_path):
+    path = str(tmp_path / "micro.json")
+    # the same code on a machine that is twice as slow
+    fast = relative({"a": 100.0, "b": 1000.0}, calibration_ns=50.0)
+    slow = relative({"a": 200.0, "b": 2000.0}, calibration_ns=100.0)
+    save_baseline(path, fast)
+    with open(path) as f:
+        assert "results" not in json.load(f)
+    baseline = load_baseline(path)
+    assert baseline == {"a": 2.0, "b": 20.0}
+    _, regressions = compare(slow, baseline, 0.25)
+    assert regressions == []
+    _, regressions = compare({"a": 3.0, "b": 20.0}, baseline, 0.25)
+    assert regressions == ["a"]
+
+
+def test_absolute_baselines_are_rejected(tmp_path):
+    path = tmp_path / "micro.json"
+    path.write_text(json.dumps({"results": {"a": 100.0}}))
+    with pytest.raises(ValueError):
+        load_baseline(str(path))
@@ -0,0 +1,22 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import Request, urlopen
+
+from etheno.benchmarks.mockserver import MockJSONRPCServer
+
+
+def _post(url: str, method: str):
+    body = json.dumps({"id": 1, "jsonrpc": "2.0", "method": method}).encode()
+    request = Request(url, body, {"Content-Type": "application/json"})
+    with urlopen(request, timeout=5.0) as response:
+        return json.load(response)
+
+
+def test_concurrent_requests_are_all_counted():
+    with MockJSONRPCServer() as server:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(
+                executor.map(lambda _: _post(server.url, "eth_blockNumber"), range(200))
+            )
+        assert all("result" in result for result in results)
+        assert server.request_count == 200
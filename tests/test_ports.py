@@ -0,0 +1,53 @@
+import socket
+
+import pytest
+
+from etheno.utils import PortAllocator, find_open_port, fcntl
+
+
+def _can_bind(port: int) -> bool:
+    with socket.socket() as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+        return True
+
+
+def test_reserved_ports_stay_bound_until_unbound(tmp_path):
+    allocator = PortAllocator(lock_directory=str(tmp_path))
+    with allocator.reserve() as reservation:
+        assert not _can_bind(reservation.port)
+        assert allocator.reserve(reservation.port).port != reservation.port
+        reservation.unbind()
+        assert _can_bind(reservation.port)
+    assert reservation.released
+
+
+def test_released_ports_can_be_reserved_again(tmp_path):
+    allocator = PortAllocator(lock_directory=str(tmp_path))
+    reservation = allocator.reserve()
+    port = reservation.port
+    reservation.unbind()
+    # unbound but still reserved, e.g., while a client is starting
+    assert allocator.reserve(port).port != port
+    reservation.release()
+    with allocator.reserve(port) as again:
+        assert again.port == port
+
+
+@pytest.mark.skipif(fcntl is None, reason="port lock files need fcntl")
+def test_allocators_sharing_lock_files_do_not_share_ports(tmp_path):
+    # stand-ins for two Etheno processes
+    first = PortAllocator(lock_directory=str(tmp_path))
+    second = PortAllocator(lock_directory=str(tmp_path))
+    with first.reserve() as reservation:
+        reservation.unbind()
+        with second.reserve(reservation.port) as other:
+            assert other.port != reservation.port
+
+
+def test_find_open_port():
+    port = find_open_port(20000)
+    assert port >= 20000
+    assert _can_bind(port)
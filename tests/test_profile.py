@@ -0,0 +1,43 @@
+import time
+
+from etheno import etheno as etheno_module
+from etheno.profiler import SamplingProfiler
+
+
+def test_profile_route_requires_profiler(etheno):
+    etheno.register_views()
+    response = etheno.app.test_client().get("/profile?seconds=0.01")
+    assert response.status_code == 404
+
+
+def _profiled_client(etheno):
+    etheno.profiler = SamplingProfiler(interval=0.001)
+    etheno.register_views()
+    return etheno.app.test_client()
+
+
+def test_on_demand_profile(etheno):
+    response = _profiled_client(etheno).get("/profile?seconds=0.05")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+
+
+def test_on_demand_profile_is_clamped(etheno, monkeypatch):
+    monkeypatch.setattr(etheno_module, "MAX_ON_DEMAND_PROFILE_SECONDS", 0.05)
+    client = _profiled_client(etheno)
+    start = time.monotonic()
+    assert client.get("/profile?seconds=100000").status_code == 200
+    assert time.monotonic() - start < 5.0
+
+
+def test_one_on_demand_profile_at_a_time(etheno):
+    client = _profiled_client(etheno)
+    with etheno.on_demand_profile_lock:
+        assert client.get("/profile?seconds=0.01").status_code == 409
+    assert client.get("/profile?seconds=0.01").status_code == 200
+
+
+def test_invalid_seconds(etheno):
+    client = _profiled_client(etheno)
+    assert client.get("/profile?seconds=-1").status_code == 400
+    assert client.get("/profile?seconds=soon").status_code == 400
@@ -0,0 +1,49 @@
+import socket
+
+import pytest
+
+from etheno.client import RpcProxyClient
+from etheno.readiness import ReadinessMonitor, probe_port
+
+
+def _listen(family: int, host: str) -> socket.socket:
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.bind((host, 0))
+    sock.listen()
+    return sock
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_probe_ipv4():
+    with _listen(socket.AF_INET, "127.0.0.1") as sock:
+        port = sock.getsockname()[1]
+        assert probe_port("127.0.0.1", port)
+        assert ReadinessMonitor(port, host="127.0.0.1").wait(timeout=1.0)
+    assert not probe_port("127.0.0.1", port)
+
+
+@pytest.mark.skipif(not socket.has_ipv6, reason="IPv6 is not supported")
+def test_probe_ipv6():
+    try:
+        sock = _listen(socket.AF_INET6, "::1")
+    except OSError:
+        pytest.skip("IPv6 loopback is not available")
+    with sock:
+        port = sock.getsockname()[1]
+        assert probe_port("::1", port)
+        assert ReadinessMonitor(port, host="::1").wait(timeout=1.0)
+
+
+def test_probe_unknown_host():
+    assert not probe_port("host.invalid", 80)
+
+
+def test_remote_client_startup_times_out():
+    client = RpcProxyClient(f"http://127.0.0.1:{_closed_port()}/", startup_timeout=0.2)
+    with pytest.raises(TimeoutError):
+        client.wait_until_running()
@@ -0,0 +1,118 @@
+import threading
+import time
+
+from etheno.differentials import DifferentialTester
+from etheno.jsonrpc import EventSummaryPlugin
+from etheno.receipts import ReceiptTracker
+
+from conftest import FakeClient, FakeRpc
+
+
+def _send(etheno, sender):
+    return etheno.post(
+        {
+            "id": 1,
+            "jsonrpc": "2.0",
+            "method": "eth_sendTransaction",
+            "params": [{"from": sender, "to": sender, "value": "0x1"}],
+        }
+    )["result"]
+
+
+def _receipt(etheno, tx_hash):
+    return etheno.post(
+        {
+            "id": 2,
+            "jsonrpc": "2.0",
+            "method": "eth_getTransactionReceipt",
+            "params": [tx_hash],
+        }
+    )
+
+
+def _setup(etheno, interval=0.01):
+    master = FakeRpc("master")
+    secondary = FakeRpc("secondary")
+    secondary.hold = True
+    etheno.master_client = FakeClient(master)
+    etheno.add_client(FakeClient(secondary))
+    etheno.receipt_tracker = ReceiptTracker(etheno, interval=interval)
+    return master, secondary
+
+
+def test_pending_receipt_is_null_until_all_clients_mine(etheno):
+    _, secondary = _setup(etheno)
+    tx_hash = _send(etheno, secondary.chain.accounts[0])
+
+    assert _receipt(etheno, tx_hash)["result"] is None
+    assert etheno.receipt_tracker.pending(tx_hash)
+
+    secondary.mine()
+    assert etheno.receipt_tracker.wait(tx_hash, timeout=5.0)
+    assert _receipt(etheno, tx_hash)["result"]["transactionHash"] == tx_hash
+    assert not etheno.receipt_tracker.pending(tx_hash)
+
+
+def test_pending_receipt_with_event_summary(etheno):
+    _, secondary = _setup(etheno)
+    summary = EventSummaryPlugin()
+    etheno.add_plugin(summary)
+    tx_hash = _send(etheno, secondary.chain.accounts[0])
+
+    # a null receipt is the normal response while a client has yet to mine the transaction
+    assert _receipt(etheno, tx_hash)["result"] is None
+    assert not summary._transactions[tx_hash]["is_logged"]
+
+    secondary.mine()
+    etheno.receipt_tracker.wait(tx_hash, timeout=5.0)
+    assert _receipt(etheno, tx_hash)["result"] is not None
+    assert summary._transactions[tx_hash]["is_logged"]
+
+
+def test_wait_times_out_while_pending(etheno):
+    _, secondary = _setup(etheno, interval=60.0)
+    tx_hash = _send(etheno, secondary.chain.accounts[0])
+    _receipt(etheno, tx_hash)
+    assert not etheno.receipt_tracker.wait(tx_hash, timeout=0.05)
+
+
+def test_stop_wakes_waiters(etheno):
+    _, secondary = _setup(etheno, interval=60.0)
+    tx_hash = _send(etheno, secondary.chain.accounts[0])
+    _receipt(etheno, tx_hash)
+    results = []
+    waiter = threading.Thread(
+        target=lambda: results.append(etheno.receipt_tracker.wait(tx_hash))
+    )
+    waiter.start()
+    etheno.receipt_tracker.stop()
+    waiter.join(5.0)
+    assert results == [True]
+
+
+def test_oldest_transactions_are_forgotten(etheno):
+    _, secondary = _setup(etheno, interval=60.0)
+    etheno.receipt_tracker.max_transactions = 2
+    hashes = [_send(etheno, secondary.chain.accounts[0]) for _ in range(3)]
+    for tx_hash in hashes:
+        _receipt(etheno, tx_hash)
+    assert not etheno.receipt_tracker.pending(hashes[0])
+    assert etheno.receipt_tracker.pending(hashes[1])
+    assert etheno.receipt_tracker.pending(hashes[2])
+
+
+def test_differential_tester_waits_on_tracker(etheno, tmp_path):
+    etheno.logger.save_to_directory(str(tmp_path))
+    _, secondary = _setup(etheno, interval=0.01)
+    tester = DifferentialTester()
+    etheno.add_plugin(tester)
+    tx_hash = _send(etheno, secondary.chain.accounts[0])
+
+    timer = threading.Timer(0.2, secondary.mine)
+    timer.start()
+    start = time.monotonic()
+    tester.finalize()
+    # woken by the tracker as soon as the client mines the transaction, rather than after sleeping
+    assert time.monotonic() - start < 2.0
+    assert tx_hash not in tester._unprocessed_transactions
+    timer.join()
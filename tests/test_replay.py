@@ -0,0 +1,56 @@
+import json
+import time
+
+import pytest
+
+from etheno.jsonrpc import JSONRPCExportPlugin
+from etheno.replay import CapturedCall, ReplayEngine, read_capture
+
+
+def _post(request):
+    return {"jsonrpc": "2.0", "id": request.get("id", None), "result": "0x0"}
+
+
+def _request(i: int):
+    return {"id": i, "jsonrpc": "2.0", "method": "eth_blockNumber"}
+
+
+def _replay(calls, **kwargs):
+    engine = ReplayEngine(_post, remap=False, **kwargs)
+    try:
+        return engine.replay(calls)
+    finally:
+        engine.logger.close()
+
+
+def test_exports_record_timestamps(tmp_path):
+    path = str(tmp_path / "rpc.json")
+    plugin = JSONRPCExportPlugin(path)
+    before = time.time()
+    plugin.after_post(_request(1), [_post(_request(1))])
+    plugin._exporter.finalize()
+    (call,) = read_capture(path)
+    assert call.request == _request(1)
+    assert before <= call.timestamp <= time.time()
+
+
+def test_speed_compresses_the_original_timing():
+    calls = [
+        CapturedCall(_request(1), [_post(_request(1))], 100.0),
+        CapturedCall(_request(2), [_post(_request(2))], 100.4),
+    ]
+    start = time.monotonic()
+    report = _replay(calls, speed=2.0)
+    assert report.divergences == 0
+    assert 0.2 <= time.monotonic() - start < 0.4
+
+
+def test_speed_requires_timestamps(tmp_path):
+    # an export from an older version of Etheno
+    path = tmp_path / "rpc.json"
+    path.write_text("[\n%s\n]" % json.dumps([_request(1), [_post(_request(1))]]))
+    (call,) = read_capture(str(path))
+    assert call.timestamp is None
+    _replay([call])
+    with pytest.raises(ValueError):
+        _replay([call], speed=2.0)
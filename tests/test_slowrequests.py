@@ -0,0 +1,35 @@
+from etheno import slowrequests
+from etheno.slowrequests import SlowRequestJournal
+
+
+def _journal(etheno, capacity: int) -> SlowRequestJournal:
+    journal = SlowRequestJournal(threshold=0.1, capacity=capacity)
+    etheno.add_plugin(journal)
+    return journal
+
+
+def test_results_are_measured_without_the_lock(etheno, monkeypatch):
+    journal = _journal(etheno, capacity=2)
+    measured = []
+
+    def result_size(result):
+        assert not journal._lock.locked()
+        measured.append(result)
+        return 1
+
+    monkeypatch.setattr(slowrequests, "_result_size", result_size)
+    for i, seconds in enumerate((0.5, 0.4, 0.3, 0.05, 0.6)):
+        journal.observe({"method": f"m{i}"}, seconds, [("client", seconds, i)])
+    # below the threshold (0.05) or faster than both of the slowest requests (0.3), so never measured
+    assert measured == [0, 1, 4]
+    assert [entry["method"] for entry in journal.slowest()] == ["m4", "m0"]
+    assert journal.slowest()[0]["clients"][0]["result_bytes"] == 1
+
+
+def test_evicted_requests_are_deleted(etheno, tmp_path):
+    etheno.logger.save_to_directory(str(tmp_path))
+    journal = _journal(etheno, capacity=2)
+    for i, seconds in enumerate((0.2, 0.3, 0.4, 0.5, 0.6)):
+        journal.observe({"method": f"m{i}"}, seconds, [("client", seconds, i)])
+    saved = sorted(path.name for path in tmp_path.rglob("slow_*.json"))
+    assert saved == ["slow_m3.json", "slow_m4.json"]
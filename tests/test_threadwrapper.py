@@ -0,0 +1,59 @@
+import signal
+import threading
+
+import pytest
+
+from etheno.threadwrapper import MainThreadController
+
+
+@pytest.fixture
+def controller():
+    sigint = signal.getsignal(signal.SIGINT)
+    yield MainThreadController()
+    signal.signal(signal.SIGINT, sigint)
+
+
+def test_calls_run_on_the_main_thread(controller):
+    futures = []
+
+    def submit():
+        futures.append(controller.submit(threading.current_thread))
+        futures.extend(controller.submit_all([lambda: 1, lambda: 1 / 0, lambda: 3]))
+        futures[0].result(5.0)
+        controller.quit()
+
+    thread = threading.Thread(target=submit)
+    thread.start()
+    controller.run()
+    thread.join(5.0)
+    assert futures[0].result() is threading.main_thread()
+    assert futures[1].result() == 1
+    with pytest.raises(ZeroDivisionError):
+        futures[2].result()
+    assert futures[3].result() == 3
+
+
+def test_calls_from_the_main_thread_run_immediately(controller):
+    assert controller.invoke(lambda x: x * 2, 21) == 42
+    assert controller.submit(lambda x: x * 2, 21).result(0) == 42
+
+
+def test_calls_after_quitting_fail(controller):
+    controller.quit()
+    controller.run()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(controller.submit(int)))
+    thread.start()
+    thread.join(5.0)
+    with pytest.raises(RuntimeError):
+        results[0].result(0)
+
+
+def test_instances_share_the_controller_created_on_import(etheno):
+    from etheno import etheno as etheno_module
+
+    assert isinstance(etheno_module._CONTROLLER, MainThreadController)
+    assert etheno.controller is etheno_module._CONTROLLER
+    # an instance that is not running the controller does not quit it when it shuts down
+    etheno.shutdown()
+    assert not etheno.controller._quit